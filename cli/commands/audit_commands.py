@@ -0,0 +1,56 @@
+import click
+from functools import partial
+from services.factories import get_audit_service
+from services.auth_service import require_departement
+from cli.output import Column, format_option, stream_records
+
+AUDIT_COLUMNS = [
+    Column("occurred_at", "Date", width=19,
+           display=lambda v: v.strftime("%Y-%m-%d %H:%M:%S")),
+    Column("entity", "Entité", width=8),
+    Column("entity_id", "ID", width=8, align=">"),
+    Column("action", "Action"),
+    Column("actor", "Par"),
+    Column("message", "Message"),
+    Column("details", "Détails", table=False),
+]
+
+
+@click.group()
+def audit():
+    pass
+
+
+@audit.command()
+@require_departement("Gestion")
+@format_option
+@click.option("--entity", type=click.Choice(("user", "contract", "event")),
+              default=None, help="Type de l'entité concernée")
+@click.option("--id", "entity_id", type=int, default=None,
+              help="ID de l'entité (avec --entity)")
+@click.option("--since", type=click.DateTime(), default=None,
+              help="Événements à partir de cette date")
+@click.option("--until", type=click.DateTime(), default=None,
+              help="Événements avant cette date (exclue)")
+@click.option("--actor", default=None,
+              help="Événements faits par cet utilisateur")
+@click.option("--limit", type=click.IntRange(min=1), default=None,
+              help="Nombre maximal d'événements")
+def query(output_format, entity, entity_id, since, until, actor, limit):
+    """Rechercher dans le journal d'audit local, par date.
+
+    Par exemple, qui a signé le contrat 42 :
+    --entity contract --id 42.
+    """
+    if entity_id is not None and entity is None:
+        raise click.UsageError("--id s'utilise avec --entity")
+
+    # Seuls les filtres renseignés sont transmis au service
+    filters = {name: value for name, value in (
+        ("entity", entity), ("entity_id", entity_id), ("since", since),
+        ("until", until), ("actor", actor)) if value is not None}
+    audit_service = get_audit_service()
+    stream_records(partial(audit_service.iter_entries, limit=limit,
+                           **filters),
+                   AUDIT_COLUMNS, output_format,
+                   empty_message="Aucun événement trouvé")
@@ -1,7 +1,5 @@
 import click
-from sqlalchemy.orm import Session
-from services.auth_service import AuthService
-from database.database import engine
+from services.factories import get_auth_service
 
 
 @click.group()
@@ -14,9 +12,12 @@ def auth():
 @click.option("--password", prompt=True, help="Mot de passe", hide_input=True)
 def login(username, password):
 
-    auth_service = AuthService()
+    from sqlalchemy.orm import Session
+    from database.database import get_engine
 
-    with Session(engine) as session:
+    auth_service = get_auth_service()
+
+    with Session(get_engine()) as session:
         success, token, message = auth_service.login(
             session, username, password)
 
@@ -29,7 +30,7 @@ def login(username, password):
 @auth.command()
 def logout():
 
-    auth_service = AuthService()
+    auth_service = get_auth_service()
     success, message = auth_service.logout()
 
     click.echo(message)
@@ -0,0 +1,42 @@
+import json
+import click
+from services.auth_service import require_auth, get_current_user_info
+
+
+@click.group()
+def batch():
+    pass
+
+
+@batch.command()
+@require_auth
+@click.argument("file", type=click.File("r", encoding="utf-8"), default="-")
+@click.option("--transaction-size", type=click.IntRange(min=1), default=100,
+              show_default=True,
+              help="Nombre d'opérations validées dans une même transaction")
+@click.pass_context
+def run(ctx, file, transaction_size):
+    """Exécuter les opérations d'un fichier NDJSON (- : entrée standard).
+
+    Une opération par ligne, par exemple
+    {"op": "update_event", "event_id": 3, "location": "Lyon"}.
+    Opérations : create_client, create_contract, sign_contract,
+    record_payment, create_event, update_event ; les dates sont au format
+    ISO (2025-06-01T18:00:00). Le résultat de chaque opération est écrit
+    en NDJSON une fois sa transaction validée.
+    """
+    from services.batch import BatchRunner
+    from services.client_import import parse_ndjson
+
+    runner = BatchRunner(get_current_user_info(),
+                         transaction_size=transaction_size)
+    total = failed = 0
+    for result in runner.run(parse_ndjson(file)):
+        total += 1
+        failed += not result["success"]
+        click.echo(json.dumps(result, ensure_ascii=False))
+
+    click.echo(f"{total} opérations : {total - failed} réussies, "
+               f"{failed} en échec", err=True)
+    if failed:
+        ctx.exit(1)
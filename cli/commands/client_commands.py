@@ -1,12 +1,33 @@
 
 import click
-from tabulate import tabulate
-from services.client_services import ClientService
+from services.factories import get_client_service
+from cli.pagination import pagination_options, show_pages
+from cli.output import (
+    Column,
+    STREAM_FORMATS,
+    format_option,
+    page_renderer,
+    stream_records
+)
 from services.auth_service import (
     require_departement,
     require_auth,
     get_current_user_info)
 
+CLIENT_COLUMNS = [
+    Column("id", "ID", width=8, align=">"),
+    Column("fullname", "Nom"),
+    Column("email", "Email"),
+    Column("phone_number", "Telephone", width=20),
+    Column("commercial", "Commercial",
+           lambda row: f"{row.commercial_first_name} "
+                       f"{row.commercial_last_name}({row.commercial_id})",
+           record=False),
+    Column("commercial_id", "Commercial", table=False),
+    Column("commercial_first_name", "Prénom du commercial", table=False),
+    Column("commercial_last_name", "Nom du commercial", table=False),
+]
+
 
 @click.group
 def client():
@@ -29,7 +50,7 @@ def create():
     email = click.prompt("email", type=str)
     phone_number = click.prompt("phone number", type=str)
 
-    client_services = ClientService()
+    client_services = get_client_service()
     success, message = client_services.create_client(
         fullname=fullname,
         contact=contact,
@@ -43,30 +64,21 @@ def create():
 
 @client.command(name="get-clients")
 @require_auth
-def get():
-
-    client_service = ClientService()
-    success, clients, message = client_service.get_clients()
+@pagination_options
+@format_option
+def get(limit, after, interactive, output_format):
 
-    if success and clients:
+    client_service = get_client_service()
 
-        headers = ["ID", "Nom", "Email", "Telephone", "Commercial"]
-        rows = []
-        for row in clients:
-            commercial = f"{row.commercial_first_name} " \
-                f"{row.commercial_last_name}" \
-                f"({row.commercial_id})"
-            rows.append([
-                row.id,
-                row.fullname,
-                row.email,
-                row.phone_number,
-                f"{commercial}"
-            ])
+    if limit is None and after is None and not interactive:
+        stream_records(client_service.iter_clients, CLIENT_COLUMNS,
+                       output_format, empty_message="Aucun client trouvé")
+        return
 
-        click.echo(tabulate(rows, headers=headers, tablefmt="grid"))
-    else:
-        click.echo(message)
+    show_pages(client_service.get_clients, client_service.next_cursor,
+               page_renderer(CLIENT_COLUMNS, output_format),
+               limit=limit, after=after, interactive=interactive,
+               err=output_format in STREAM_FORMATS)
 
 
 @client.command(name="update-client")
@@ -100,7 +112,7 @@ def update(client_id, fullname, email, phone_number, commercial_id):
         "commercial_id": commercial_id
     }
 
-    client_service = ClientService()
+    client_service = get_client_service()
     success, message = client_service.update_client(
         client_id=client_id,
         user_id=user.get("user_id"),
@@ -109,3 +121,50 @@ def update(client_id, fullname, email, phone_number, commercial_id):
     )
 
     click.echo(message)
+
+
+@client.command(name="import")
+@require_departement("Gestion", "Commercial")
+@click.argument("file", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "fmt", type=click.Choice(["csv", "ndjson"]),
+              default=None,
+              help="Format du fichier, déduit de l'extension par défaut")
+@click.option("--errors", "errors_path", type=click.Path(dir_okay=False),
+              default=None,
+              help="Fichier des lignes rejetées (FILE.errors.<format>)")
+@click.option("--batch-size", type=click.IntRange(min=1), default=1000,
+              help="Nombre de lignes validées par lot")
+@click.option("--commercial-id", type=int, default=None,
+              help="Commercial des nouveaux clients sans commercial_id "
+                   "(l'utilisateur connecté s'il est commercial)")
+def import_clients(file, fmt, errors_path, batch_size, commercial_id):
+    """Importer des clients depuis un fichier CSV ou NDJSON.
+
+    Colonnes : fullname, contact, email, phone_number et commercial_id
+    (--commercial-id par défaut, pour les nouveaux clients). Un client dont
+    l'email existe déjà est mis à jour, sans changer de commercial ; un
+    commercial ne peut mettre à jour que ses propres clients.
+    """
+    from services.client_import import (
+        guess_format, read_records, RejectedRowsWriter)
+
+    user = get_current_user_info()
+    is_commercial = user.get("departement", "").lower() == "commercial"
+    if commercial_id is None and is_commercial:
+        commercial_id = user["user_id"]
+    fmt = fmt or guess_format(file)
+    errors_path = errors_path or f"{file}.errors.{fmt}"
+
+    client_service = get_client_service()
+    with RejectedRowsWriter(errors_path, fmt) as rejected:
+        success, stats, message = client_service.import_clients(
+            read_records(file, fmt),
+            default_commercial_id=commercial_id,
+            on_error=rejected.write,
+            batch_size=batch_size,
+            owner_id=user["user_id"] if is_commercial else None
+        )
+
+    click.echo(message)
+    if rejected.count:
+        click.echo(f"Lignes rejetées : {errors_path}")
@@ -1,6 +1,14 @@
 import click
-from tabulate import tabulate
-from services.contract_services import ContractService
+from functools import partial
+from services.factories import get_contract_service
+from cli.pagination import pagination_options, show_pages
+from cli.output import (
+    Column,
+    STREAM_FORMATS,
+    format_option,
+    page_renderer,
+    stream_records
+)
 from services.auth_service import (
     require_auth,
     require_departement,
@@ -8,6 +16,26 @@ from services.auth_service import (
 )
 
 
+def _euros(amount):
+    return f"{amount:.2f} €"
+
+
+CONTRACT_COLUMNS = [
+    Column("id", "ID", width=8, align=">"),
+    Column("client", "Client", lambda row: row.fullname),
+    Column("title", "Title"),
+    Column("created_at", "Date de création",
+           display=lambda d: d.strftime("%Y-%m-%d") if d else "N/A",
+           width=16),
+    Column("status", "Signé", display=lambda s: "Oui" if s else "Non",
+           width=5),
+    Column("amount", "Montant", display=_euros, align=">"),
+    Column("paid_amount", "Payé", display=_euros, align=">"),
+    Column("balance", "Solde", lambda row: row.amount - row.paid_amount,
+           display=_euros, align=">"),
+]
+
+
 @click.group
 def contract():
     pass
@@ -28,7 +56,7 @@ def create():
     client_id = click.prompt("Client ID", type=int)
     amount = click.prompt("Amount", type=float)
 
-    contract_service = ContractService()
+    contract_service = get_contract_service()
     success, message = contract_service.create_contract(
         title=title,
         client_id=client_id,
@@ -53,7 +81,7 @@ def update(contract_id, sign, paid_amount):
         click.echo("vous devez être connecté")
         return
 
-    contract_service = ContractService()
+    contract_service = get_contract_service()
     success, message = contract_service.update_contract(
         contract_id=contract_id,
         user_id=user["user_id"],
@@ -67,91 +95,61 @@ def update(contract_id, sign, paid_amount):
 
 @contract.command(name="list")
 @require_auth
-def get_contract_list():
-
-    contract_service = ContractService()
-    success, contracts, message = contract_service.get_contract_list()
-    if success and contracts:
-        headers = ["ID", "Client", "Title",
-                   "Date de création", "Signé", "Montant", "Solde"]
-        rows = []
-
-        for row in contracts:
-            solde = row.amount-row.paid_amount
-            rows.append([
-                row.id,
-                row.fullname,
-                row.title,
-                row.created_at.strftime(
-                    "%Y-%m-%d") if row.created_at else "N/A",
-                "Oui" if row.status else "Non",
-                f"{row.amount:.2f} €",
-                f"{solde:.2f} €"
-            ])
-
-        click.echo(tabulate(rows, headers=headers, tablefmt="grid"))
-        click.echo(message)
-
-    else:
-        click.echo(message)
+@pagination_options
+@format_option
+@click.option("--client-id", type=int, default=None,
+              help="Contrats de ce client")
+@click.option("--min-balance", type=float, default=None,
+              help="Contrats dont le reste à payer dépasse ce montant")
+@click.option("--from", "created_from", type=click.DateTime(), default=None,
+              help="Contrats créés à partir de cette date")
+@click.option("--to", "created_to", type=click.DateTime(), default=None,
+              help="Contrats créés avant cette date (exclue)")
+def get_contract_list(limit, after, interactive, output_format, client_id,
+                      min_balance, created_from, created_to):
+    """Lister les contrats, triés par date de création.
+
+    Les filtres se combinent et sont appliqués par la base, par exemple
+    --client-id 12 --min-balance 10000.
+    """
+    # Seuls les filtres renseignés sont transmis au service
+    filters = {name: value for name, value in (
+        ("client_id", client_id), ("min_balance", min_balance),
+        ("created_from", created_from), ("created_to", created_to))
+        if value is not None}
+    contract_service = get_contract_service()
+
+    if limit is None and after is None and not interactive:
+        stream_records(partial(contract_service.iter_contract_list,
+                               **filters),
+                       CONTRACT_COLUMNS, output_format,
+                       empty_message="Aucun contrats trouvés")
+        return
+
+    show_pages(partial(contract_service.get_contract_list, **filters),
+               contract_service.next_cursor,
+               page_renderer(CONTRACT_COLUMNS, output_format,
+                             show_message=True),
+               limit=limit, after=after, interactive=interactive,
+               err=output_format in STREAM_FORMATS)
 
 
 @contract.command(name="contracts-not-sign")
 @require_departement("Commercial")
-def get_not_sign_contracts():
-    contract_service = ContractService()
-    success, contracts, message = contract_service.get_contract_list_not_sign()
-    if success and contracts:
-        headers = ["ID", "Client", "Title",
-                   "Date de création", "Signé", "Montant", "Solde"]
-        rows = []
-
-        for row in contracts:
-            solde = row.amount-row.paid_amount
-            rows.append([
-                row.id,
-                row.fullname,
-                row.title,
-                row.created_at.strftime(
-                    "%Y-%m-%d") if row.created_at else "N/A",
-                "Oui" if row.status else "Non",
-                f"{row.amount:.2f} €",
-                f"{solde:.2f} €"
-            ])
-
-        click.echo(tabulate(rows, headers=headers, tablefmt="grid"))
-        click.echo(message)
-
-    else:
-        click.echo(message)
+@format_option
+def get_not_sign_contracts(output_format):
+    contract_service = get_contract_service()
+    stream_records(contract_service.iter_contract_list_not_sign,
+                   CONTRACT_COLUMNS, output_format,
+                   empty_message="Aucun contrats non signés trouvés")
 
 
 @contract.command(name="contracts-not-paid")
 @require_departement("Commercial", "Gestion")
-def get_contracts_not_fully_paid():
-    contract_service = ContractService()
-    success, contracts, message = contract_service\
-        .get_contract_list_not_fully_paid()
-    if success and contracts:
-        headers = ["ID", "Client", "Title",
-                   "Date de création", "Signé", "Montant", "Solde"]
-        rows = []
-
-        for row in contracts:
-            solde = row.amount-row.paid_amount
-            rows.append([
-                row.id,
-                row.fullname,
-                row.title,
-                row.created_at.strftime(
-                    "%Y-%m-%d") if row.created_at else "N/A",
-                "Oui" if row.status else "Non",
-                f"{row.amount:.2f} €",
-                f"{solde:.2f} €"
-            ])
-
-        click.echo(tabulate(rows, headers=headers, tablefmt="grid"))
-        click.echo(message)
-
-    else:
-        click.echo(message)
+@format_option
+def get_contracts_not_fully_paid(output_format):
+    contract_service = get_contract_service()
+    stream_records(contract_service.iter_contract_list_not_fully_paid,
+                   CONTRACT_COLUMNS, output_format,
+                   empty_message="Tous les contrats ont étés entièrement "
+                                 "payés")
@@ -0,0 +1,80 @@
+import os
+import subprocess
+import sys
+import click
+
+
+@click.group()
+def daemon():
+    pass
+
+
+@daemon.command()
+@click.option("--detach", is_flag=True,
+              help="Lance le démon en arrière-plan et rend la main")
+@click.pass_context
+def start(ctx, detach):
+    """Démarrer le démon qui exécute les commandes epic.
+
+    Tant qu'il tourne, ``python main.py ...`` lui transmet ses commandes au
+    lieu de démarrer Python, SQLAlchemy et le pool à chaque appel.
+    """
+    from cli.daemon_client import control, get_socket_path
+
+    path = get_socket_path()
+    if control("ping", path) is not None:
+        click.echo(f"Le démon tourne déjà ({path})")
+        return
+
+    if detach:
+        main_py = os.path.join(os.path.dirname(os.path.dirname(
+            os.path.dirname(os.path.abspath(__file__)))), "main.py")
+        subprocess.Popen([sys.executable, main_py, "daemon", "start"],
+                         stdin=subprocess.DEVNULL,
+                         stdout=subprocess.DEVNULL,
+                         stderr=subprocess.DEVNULL,
+                         start_new_session=True)
+        click.echo(f"Démon lancé en arrière-plan ({path})")
+        return
+
+    from cli.daemon_server import EpicDaemon
+    from cli.commands.shell_commands import warm_up
+
+    from services.outbox import get_outbox_drainer
+
+    warm_up()
+    # Rattrape les effets de bord laissés en attente par les commandes
+    # précédentes ; le démon livre ensuite ceux des siennes au fil de l'eau
+    get_outbox_drainer().wake()
+    server = EpicDaemon(path, ctx.find_root().command)
+    click.echo(f"Démon à l'écoute sur {path} (Ctrl+C pour arrêter)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    click.echo("Démon arrêté")
+
+
+@daemon.command()
+def stop():
+    """Arrêter le démon"""
+    from cli.daemon_client import control
+
+    if control("stop") is None:
+        click.echo("Le démon ne tourne pas")
+    else:
+        click.echo("Démon arrêté")
+
+
+@daemon.command()
+def status():
+    """Afficher l'état du démon"""
+    from cli.daemon_client import control, get_socket_path
+
+    state = control("ping")
+    if state is None:
+        click.echo("Le démon ne tourne pas")
+    else:
+        click.echo(f"Démon {state} sur {get_socket_path()}")
@@ -0,0 +1,75 @@
+import click
+
+
+@click.group()
+def db():
+    pass
+
+
+@db.command(name="pool-stats")
+@click.option("--ping", is_flag=True,
+              help="Exécute un SELECT 1 avant d'afficher les statistiques")
+def pool_stats_command(ping):
+    """Afficher la configuration et l'utilisation du pool de connexions"""
+
+    from sqlalchemy import text
+    from database.database import get_engine
+    from database.pool import get_pool_mode, pool_stats
+
+    engine = get_engine()
+    if ping:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+    pool = engine.pool
+    click.echo(f"Mode du pool : {get_pool_mode()} "
+               f"({type(pool).__name__})")
+    click.echo(f"Etat : {pool.status()}")
+
+    stats = pool_stats.snapshot()
+    click.echo(f"Connexions ouvertes : {stats['connects']}")
+    click.echo(f"Checkouts : {stats['checkouts']}")
+    click.echo(f"Checkins : {stats['checkins']}")
+    click.echo(f"Invalidations : {stats['invalidations']}")
+    click.echo(f"Attentes : {stats['waits']} "
+               f"({stats['wait_time'] * 1000:.1f} ms)")
+    click.echo(f"Overflow max atteint : {stats['max_overflow_seen']}")
+
+
+@db.command(name="ensure-indexes")
+@click.option("--dry-run", is_flag=True,
+              help="Liste les index manquants sans les créer")
+@click.option("--no-concurrently", is_flag=True,
+              help="Construit les index avec verrou (base hors ligne)")
+def ensure_indexes_command(dry_run, no_concurrently):
+    """Créer les index déclarés dans le schéma qui manquent en base.
+
+    Les tables ajoutées au schéma depuis la création de la base (journal
+    d'audit, outbox) sont créées d'abord, avec leurs index.
+    """
+
+    from database.database import get_engine
+    from database.indexes import (ensure_indexes, ensure_tables,
+                                  get_missing_indexes, get_missing_tables)
+
+    engine = get_engine()
+    if dry_run:
+        tables = get_missing_tables(engine)
+        missing = get_missing_indexes(engine)
+        if not tables and not missing:
+            click.echo("Tous les index sont présents.")
+        for table in tables:
+            click.echo(f"Table manquante : {table.name}")
+        for index in missing:
+            click.echo(f"Index manquant : {index.name} "
+                       f"({index.table.name})")
+        return
+
+    tables = ensure_tables(engine)
+    if tables:
+        click.echo(f"Tables créées : {', '.join(tables)}")
+    created = ensure_indexes(engine, concurrently=not no_concurrently)
+    if created:
+        click.echo(f"Index créés : {', '.join(created)}")
+    else:
+        click.echo("Tous les index sont présents.")
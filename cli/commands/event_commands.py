@@ -1,10 +1,30 @@
 import click
 from datetime import datetime
-from services.event_services import EventService
+from functools import partial
+from services.factories import get_event_service
+from cli.pagination import pagination_options, show_pages
+from cli.output import (
+    Column,
+    STREAM_FORMATS,
+    format_option,
+    page_renderer,
+    stream_records
+)
 from services.auth_service import (
     require_departement, require_auth
 )
 
+EVENT_COLUMNS = [
+    Column("id", "ID", width=8, align=">"),
+    Column("contract_id", "Contrat", table=False),
+    Column("start_date", "Date de début", width=19),
+    Column("end_date", "Date de fin", width=19),
+    Column("attendees", "Participants", align=">"),
+    Column("location", "Lieu"),
+    Column("support_contact_id", "Support", table=False),
+    Column("notes", "Notes", table=False),
+]
+
 
 @click.group()
 def event():
@@ -40,7 +60,7 @@ def create(contract_id,
     if support_id == "":
         support_id = None
 
-    event_service = EventService()
+    event_service = get_event_service()
     success, message = event_service.create_event(
         contract_id=contract_id,
         start_date=start,
@@ -179,7 +199,7 @@ def event_update(event_id):
             return
 
     # Appel du service
-    event_service = EventService()
+    event_service = get_event_service()
     success, message = event_service.update_event(event_id, **update_data)
 
     click.echo(message)
@@ -187,41 +207,61 @@ def event_update(event_id):
 
 @event.command(name="assigned-events")
 @require_departement("Gestion", "Support")
-def get_assign_events_by_support_contact_id():
+@format_option
+def get_assign_events_by_support_contact_id(output_format):
 
-    event_service = EventService()
+    event_service = get_event_service()
     success, events, message = event_service.get_events_by_support_contact_id()
 
-    if success:
-        if events:
-            for event in events:
-                print(f"Evenement ID: {event.id} "
-                      f"date de début: {event.start_date}"
-                      f"Date de fin : {event.end_date}"
-                      f"nombre de personnes : {event.attendees}"
-                      f"Lieu: {event.location}")
-        else:
-            click.echo("Aucun événément affecté")
-    else:
-        click.echo(message)
+    if success and not events and output_format not in STREAM_FORMATS:
+        click.echo("Aucun événément affecté")
+        return
+    page_renderer(EVENT_COLUMNS, output_format)(success, events, message)
 
 
 @event.command(name="list")
 @require_auth
-def get_events():
-
-    event_service = EventService()
-    success, events, message = event_service.get_event_list()
-
-    if success:
-        if events:
-            for event in events:
-                print(f"Evenement ID: {event.id} "
-                      f"date de début: {event.start_date}"
-                      f"Date de fin : {event.end_date}"
-                      f"nombre de personnes : {event.attendees}"
-                      f"Lieu: {event.location}")
-        else:
-            click.echo("Aucun événément affecté")
-    else:
-        click.echo(message)
+@pagination_options
+@format_option
+@click.option("--support-id", type=int, default=None,
+              help="Évènements assignés à ce membre du support")
+@click.option("--unassigned", is_flag=True,
+              help="Évènements sans membre du support")
+@click.option("--from", "start_from", type=click.DateTime(), default=None,
+              help="Évènements débutant à partir de cette date")
+@click.option("--to", "start_to", type=click.DateTime(), default=None,
+              help="Évènements débutant avant cette date (exclue)")
+@click.option("--contract-id", type=int, default=None,
+              help="Évènements de ce contrat")
+def get_events(limit, after, interactive, output_format, support_id,
+               unassigned, start_from, start_to, contract_id):
+    """Lister les évènements, triés par date de début.
+
+    Les filtres se combinent et sont appliqués par la base, par exemple
+    les évènements sans support du mois : --unassigned --from 2025-06-01
+    --to 2025-07-01.
+    """
+    if support_id is not None and unassigned:
+        raise click.UsageError(
+            "--support-id et --unassigned ne peuvent pas être combinés")
+
+    # Seuls les filtres renseignés sont transmis au service
+    filters = {name: value for name, value in (
+        ("support_id", support_id), ("unassigned", unassigned),
+        ("start_from", start_from), ("start_to", start_to),
+        ("contract_id", contract_id)) if value not in (None, False)}
+    event_service = get_event_service()
+
+    if limit is None and after is None and not interactive:
+        # Sans pagination, les lignes sont lues par lots côté serveur et
+        # affichées au fil de l'eau
+        stream_records(partial(event_service.iter_event_list, **filters),
+                       EVENT_COLUMNS, output_format,
+                       empty_message="Aucun événement trouvé")
+        return
+
+    show_pages(partial(event_service.get_event_list, **filters),
+               event_service.next_cursor,
+               page_renderer(EVENT_COLUMNS, output_format),
+               limit=limit, after=after, interactive=interactive,
+               err=output_format in STREAM_FORMATS)
@@ -0,0 +1,45 @@
+import click
+
+
+@click.group()
+def outbox():
+    pass
+
+
+@outbox.command()
+def status():
+    """Afficher les effets de bord en attente de livraison"""
+
+    from database.database import get_engine
+    from database.dao.outbox_dao import OutboxDAO
+
+    pending = OutboxDAO(get_engine()).pending()
+    if not pending:
+        click.echo("Aucun envoi en attente.")
+        return
+    for row in pending:
+        click.echo(f"{row.destination} : {row.count} en attente depuis "
+                   f"{row.oldest:%Y-%m-%d %H:%M:%S} "
+                   f"({row.max_attempts} tentatives au plus)")
+
+
+@outbox.command()
+@click.option("--timeout", type=click.FloatRange(min=0), default=None,
+              help="Durée maximale en secondes, sans limite par défaut")
+def drain(timeout):
+    """Livrer les effets de bord en attente (journal d'audit, Sentry).
+
+    Les commandes livrent elles-mêmes ce qu'elles produisent ; celle-ci
+    rattrape ce qui n'a pas pu l'être, par exemple depuis une tâche cron.
+    """
+
+    import time
+    from services.outbox import get_outbox_drainer
+
+    drainer = get_outbox_drainer()
+    deadline = None if timeout is None else time.monotonic() + timeout
+    complete = drainer.drain(deadline)
+    click.echo(f"Livrés : {drainer.stats['delivered']}, "
+               f"en échec : {drainer.stats['failed']}")
+    if not complete:
+        raise click.exceptions.Exit(1)
@@ -0,0 +1,156 @@
+import os
+import shlex
+import click
+
+PROMPT = "epic> "
+EXIT_COMMANDS = ("exit", "quit")
+
+
+def get_history_file():
+    """Fichier d'historique du shell (EPIC_HISTORY_FILE, ~/.epic_history
+    par défaut)"""
+    return os.getenv("EPIC_HISTORY_FILE",
+                     os.path.join(os.path.expanduser("~"), ".epic_history"))
+
+
+def warm_up():
+    """Crée l'engine et ouvre une première connexion du pool, pour que la
+    première commande ne paie pas ce coût"""
+    from sqlalchemy import text
+    from database.database import get_engine
+
+    try:
+        with get_engine().connect() as conn:
+            conn.execute(text("SELECT 1"))
+    except Exception as e:
+        click.echo(f"Base de données injoignable : {e}")
+
+
+def run_line(root, line):
+    """Exécute une ligne du shell avec les commandes du groupe ``root``.
+
+    Returns:
+        bool: False si la ligne demande de quitter le shell
+    """
+    try:
+        args = shlex.split(line)
+    except ValueError as e:
+        click.echo(f"Ligne invalide : {e}")
+        return True
+
+    if not args:
+        return True
+    if args[0] in EXIT_COMMANDS:
+        return False
+    if args[0] == "shell":
+        click.echo("Vous êtes déjà dans le shell epic")
+        return True
+
+    try:
+        root.main(args, prog_name="epic", standalone_mode=False)
+    except click.exceptions.Abort:
+        click.echo("Abandon")
+    except click.ClickException as e:
+        e.show()
+    except SystemExit:
+        pass
+    except Exception as e:
+        # Une erreur inattendue (base injoignable...) ne ferme pas le shell
+        from services.sentry_service import log_exception
+        click.echo(f"Erreur : {e}", err=True)
+        log_exception(e, {"operation": "shell", "command": line})
+    return True
+
+
+def complete(root, text, words):
+    """Propose les sous-commandes et options qui complètent ``text``.
+
+    Args:
+        root (click.Group): groupe racine
+        text (str): mot en cours de saisie
+        words (list): mots déjà saisis avant ``text``
+    """
+    ctx = click.Context(root, info_name="epic")
+    command = root
+    for word in words:
+        if not isinstance(command, click.Group):
+            break
+        sub = command.get_command(ctx, word)
+        if sub is None:
+            break
+        command = sub
+
+    if isinstance(command, click.Group):
+        candidates = list(command.list_commands(ctx))
+        if command is root:
+            candidates += list(EXIT_COMMANDS)
+    else:
+        candidates = [opt for param in command.params
+                      for opt in getattr(param, "opts", [])
+                      if opt.startswith("-")]
+    return sorted(c for c in candidates if c.startswith(text))
+
+
+def _setup_readline(root):
+    try:
+        import readline
+    except ImportError:
+        # Windows : pas d'historique ni de complétion
+        return None
+
+    history_file = get_history_file()
+    try:
+        readline.read_history_file(history_file)
+    except OSError:
+        pass
+
+    def completer(text, state):
+        try:
+            words = shlex.split(
+                readline.get_line_buffer()[:readline.get_begidx()])
+        except ValueError:
+            return None
+        matches = complete(root, text, words)
+        return matches[state] if state < len(matches) else None
+
+    readline.set_completer(completer)
+    readline.set_completer_delims(" \t")
+    readline.parse_and_bind("tab: complete")
+    return readline
+
+
+@click.command()
+@click.option("--no-warmup", is_flag=True,
+              help="Ne pas ouvrir de connexion au démarrage")
+@click.pass_context
+def shell(ctx, no_warmup):
+    """Enchaîner des commandes epic dans un même processus.
+
+    L'engine, le pool de connexions, l'utilisateur connecté et les caches
+    restent chargés d'une commande à l'autre. Tapez une commande sans le
+    préfixe ``epic`` (``client get-clients``), ``--help`` pour l'aide et
+    ``exit`` pour quitter.
+    """
+    root = ctx.find_root().command
+    if not no_warmup:
+        warm_up()
+
+    readline = _setup_readline(root)
+    try:
+        while True:
+            try:
+                line = input(PROMPT)
+            except EOFError:
+                click.echo()
+                break
+            except KeyboardInterrupt:
+                click.echo()
+                continue
+            if not run_line(root, line):
+                break
+    finally:
+        if readline is not None:
+            try:
+                readline.write_history_file(get_history_file())
+            except OSError:
+                pass
@@ -1,10 +1,22 @@
 import click
-from services.user_services import UserService
+from services.factories import get_user_service
 from services.departement_services import (get_departement_choice,
                                            get_departement_id_by_name)
 from services.auth_service import (
     require_departement,
 )
+from cli.output import Column, STREAM_FORMATS, format_option, stream_records
+
+# Colonnes des formats json, ndjson et csv (jamais le mot de passe)
+USER_COLUMNS = [
+    Column("id", "ID"),
+    Column("employee_number", "Matricule"),
+    Column("username", "Nom d'utilisateur"),
+    Column("email", "Email"),
+    Column("first_name", "Prénom"),
+    Column("last_name", "Nom"),
+    Column("departement_id", "Département"),
+]
 
 
 @click.group()
@@ -57,7 +69,7 @@ def create():
                     n'a pas été trouvé.")
         return
 
-    user_service = UserService()
+    user_service = get_user_service()
     success, message = user_service.create_user(
         username=username,
         email=email,
@@ -155,7 +167,7 @@ def update(user_id):
         update_data["departement_id"] = departement_id
 
     # Appel du service
-    user_service = UserService()
+    user_service = get_user_service()
     success, message = user_service.update_user(user_id, **update_data)
 
     click.echo(message)
@@ -163,9 +175,14 @@ def update(user_id):
 
 @user.command()
 @require_departement("Gestion")
-def list():
+@format_option
+def list(output_format):
     """Afficher la liste de tous les utilisateurs"""
-    user_service = UserService()
+    user_service = get_user_service()
+    if output_format in STREAM_FORMATS:
+        stream_records(user_service.iter_users, USER_COLUMNS, output_format)
+        return
+
     users = user_service.get_users()
 
     if not users:
@@ -0,0 +1,223 @@
+"""Client léger du démon epic.
+
+Ce module n'importe que la bibliothèque standard : ``main.py`` l'utilise
+avant tout autre import pour transmettre la commande au démon quand il
+tourne, sans charger Click, SQLAlchemy ni les services.
+
+Protocole : des trames ``type (1 octet) + longueur (4 octets) + contenu``.
+Le client envoie une trame ``r`` (requête JSON : argv, cwd) ou ``c``
+(contrôle : ping, stop). Le démon répond par des trames ``o`` (stdout),
+``e`` (stderr), ``i`` / ``p`` (saisie visible / masquée demandée, le contenu
+est l'invite) et termine par ``x`` (code de sortie). Le client répond à
+``i`` / ``p`` par ``d`` (ligne saisie) ou ``z`` (fin de l'entrée).
+"""
+import json
+import os
+import socket
+import stat
+import struct
+import sys
+import tempfile
+
+# Commandes toujours exécutées dans le processus courant
+LOCAL_COMMANDS = ("daemon", "shell")
+
+
+def get_socket_path():
+    """Chemin du socket du démon : EPIC_DAEMON_SOCKET, sinon un fichier
+    propre à l'utilisateur dans XDG_RUNTIME_DIR, sinon dans un dossier
+    privé (0700) du dossier temporaire"""
+    path = os.getenv("EPIC_DAEMON_SOCKET")
+    if path:
+        return path
+    runtime_dir = os.getenv("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return os.path.join(runtime_dir, f"epic-{_uid()}.sock")
+    return os.path.join(_private_dir(), "daemon.sock")
+
+
+def _uid():
+    return os.getuid() if hasattr(os, "getuid") else os.getlogin()
+
+
+def _private_dir():
+    return os.path.join(tempfile.gettempdir(), f"epic-{_uid()}")
+
+
+def prepare_socket_dir(path):
+    """Crée le dossier privé du socket (0700) quand ``path`` est le chemin
+    par défaut du dossier temporaire.
+
+    Raises:
+        PermissionError: le dossier appartient à un autre utilisateur ou
+            est accessible à d'autres
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    if directory != _private_dir():
+        return
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    info = os.lstat(directory)
+    if (not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or
+            info.st_mode & 0o077):
+        raise PermissionError(f"{directory} n'est pas un dossier privé de "
+                              f"l'utilisateur courant")
+
+
+def _owned_by_us(path):
+    """Vrai si ``path`` est un socket de l'utilisateur courant : un autre
+    utilisateur local pourrait sinon créer le socket à notre place et
+    recevoir les commandes et les mots de passe saisis"""
+    if not hasattr(os, "getuid"):
+        return True
+    try:
+        info = os.lstat(path)
+    except OSError:
+        return False
+    return stat.S_ISSOCK(info.st_mode) and info.st_uid == os.getuid()
+
+
+def _peer_is_us(sock):
+    """Vrai si le processus à l'autre bout du socket est de l'utilisateur
+    courant (SO_PEERCRED, Linux ; non vérifiable ailleurs)"""
+    if not hasattr(socket, "SO_PEERCRED"):
+        return True
+    creds = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED,
+                            struct.calcsize("3i"))
+    _, uid, _ = struct.unpack("3i", creds)
+    return uid == os.getuid()
+
+
+def send_frame(sock, kind, payload=b""):
+    if isinstance(payload, str):
+        payload = payload.encode("utf-8")
+    sock.sendall(kind.encode("ascii") + struct.pack(">I", len(payload)) +
+                 payload)
+
+
+def _recv_exact(sock, size):
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("connexion au démon interrompue")
+        data += chunk
+    return data
+
+
+def recv_frame(sock):
+    """Lit une trame, renvoie (type, contenu en octets)"""
+    header = _recv_exact(sock, 5)
+    kind = header[:1].decode("ascii")
+    (size,) = struct.unpack(">I", header[1:])
+    return kind, _recv_exact(sock, size)
+
+
+def connect(path=None):
+    """Ouvre une connexion au démon, None s'il ne tourne pas ou si le
+    socket n'appartient pas à l'utilisateur courant"""
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    path = path or get_socket_path()
+    if not os.path.lexists(path):
+        return None
+    if not _owned_by_us(path):
+        sys.stderr.write(f"Socket {path} ignoré : il n'appartient pas à "
+                         f"l'utilisateur courant\n")
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+        trusted = _peer_is_us(sock)
+    except OSError:
+        sock.close()
+        return None
+    if not trusted:
+        sock.close()
+        sys.stderr.write(f"Démon {path} ignoré : il tourne sous un autre "
+                         f"utilisateur\n")
+        return None
+    return sock
+
+
+def control(action, path=None):
+    """Envoie une commande de contrôle au démon.
+
+    Returns:
+        str: la réponse du démon, None s'il ne tourne pas
+    """
+    sock = connect(path)
+    if sock is None:
+        return None
+    with sock:
+        send_frame(sock, "c", json.dumps({"action": action}))
+        kind, payload = recv_frame(sock)
+        return payload.decode("utf-8")
+
+
+def _answer_prompt(sock, kind, prompt):
+    try:
+        if kind == "p":
+            import getpass
+            line = getpass.getpass(prompt)
+        else:
+            sys.stdout.write(prompt)
+            sys.stdout.flush()
+            line = sys.stdin.readline()
+            if not line:
+                raise EOFError
+            line = line.rstrip("\n")
+    except (EOFError, KeyboardInterrupt):
+        send_frame(sock, "z")
+        return
+    send_frame(sock, "d", line)
+
+
+def _stdin_redirected():
+    """Vrai si l'entrée standard est un tube ou un fichier : le démon lit
+    la sienne, pas celle de l'appelant. Un terminal ou /dev/null n'ont
+    rien à transmettre."""
+    try:
+        mode = os.fstat(sys.stdin.fileno()).st_mode
+    except (AttributeError, OSError, ValueError):
+        return False
+    return stat.S_ISFIFO(mode) or stat.S_ISREG(mode) or stat.S_ISSOCK(mode)
+
+
+def forward(argv, path=None):
+    """Exécute ``epic argv`` dans le démon et recopie sa sortie.
+
+    Returns:
+        int: code de sortie de la commande, None si elle doit s'exécuter
+            dans le processus courant (démon absent, EPIC_NO_DAEMON,
+            commande locale, ou commande qui lit l'entrée standard)
+    """
+    if os.getenv("EPIC_NO_DAEMON") or (argv and argv[0] in LOCAL_COMMANDS):
+        return None
+    if "-" in argv or _stdin_redirected():
+        return None
+    sock = connect(path)
+    if sock is None:
+        return None
+
+    with sock:
+        try:
+            return _run_remote(sock, argv)
+        except ConnectionError as e:
+            sys.stderr.write(f"Erreur : {e}\n")
+            return 1
+
+
+def _run_remote(sock, argv):
+    send_frame(sock, "r", json.dumps({"argv": argv, "cwd": os.getcwd()}))
+    while True:
+        kind, payload = recv_frame(sock)
+        if kind == "o":
+            sys.stdout.buffer.write(payload)
+            sys.stdout.flush()
+        elif kind == "e":
+            sys.stderr.buffer.write(payload)
+            sys.stderr.flush()
+        elif kind in ("i", "p"):
+            _answer_prompt(sock, kind, payload.decode("utf-8"))
+        elif kind == "x":
+            return int(payload)
@@ -0,0 +1,142 @@
+import io
+import json
+import os
+import socketserver
+import sys
+import threading
+import traceback
+import click
+import click.termui
+from cli.daemon_client import (send_frame, recv_frame, prepare_socket_dir,
+                               LOCAL_COMMANDS)
+
+
+class _FrameWriter(io.RawIOBase):
+    """Flux binaire qui envoie chaque écriture au client dans une trame"""
+
+    def __init__(self, sock, kind):
+        self.sock = sock
+        self.kind = kind
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        send_frame(self.sock, self.kind, bytes(data))
+        return len(data)
+
+
+def _text_stream(sock, kind):
+    return io.TextIOWrapper(_FrameWriter(sock, kind), encoding="utf-8",
+                            line_buffering=True, write_through=True)
+
+
+def _remote_prompt(sock, kind):
+    """Fonction de saisie Click qui demande la ligne au client"""
+    def prompt(text=""):
+        sys.stdout.flush()
+        send_frame(sock, kind, text)
+        answer, payload = recv_frame(sock)
+        if answer != "d":
+            raise EOFError
+        return payload.decode("utf-8")
+    return prompt
+
+
+def run_request(root, sock, argv, cwd):
+    """Exécute ``epic argv`` dans le répertoire ``cwd`` du client, sa sortie
+    et ses saisies passant par le socket.
+
+    Returns:
+        int: code de sortie
+    """
+    from services.auth_service import clear_auth_context
+    from services.sentry_service import trace_command
+
+    saved = (sys.stdout, sys.stderr, click.termui.visible_prompt_func,
+             click.termui.hidden_prompt_func, os.getcwd())
+    sys.stdout = _text_stream(sock, "o")
+    sys.stderr = _text_stream(sock, "e")
+    click.termui.visible_prompt_func = _remote_prompt(sock, "i")
+    click.termui.hidden_prompt_func = _remote_prompt(sock, "p")
+    try:
+        os.chdir(cwd)
+        # Le .token lu dépend du répertoire du client
+        clear_auth_context()
+        if argv and argv[0] in LOCAL_COMMANDS:
+            click.echo(f"La commande {argv[0]} ne s'exécute pas dans le "
+                       f"démon", err=True)
+            return 1
+        try:
+            with trace_command(argv, long_run=True):
+                root.main(argv, prog_name="epic")
+        except SystemExit as e:
+            if e.code is None:
+                return 0
+            return e.code if isinstance(e.code, int) else 1
+        return 0
+    except Exception:
+        traceback.print_exc()
+        return 1
+    finally:
+        (sys.stdout, sys.stderr, click.termui.visible_prompt_func,
+         click.termui.hidden_prompt_func, cwd) = saved
+        os.chdir(cwd)
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        try:
+            kind, payload = recv_frame(self.request)
+        except ConnectionError:
+            return
+        message = json.loads(payload)
+
+        if kind == "c":
+            if message.get("action") == "stop":
+                send_frame(self.request, "x", "arrêt")
+                # shutdown attend la fin de serve_forever : autre thread
+                threading.Thread(target=self.server.shutdown).start()
+            else:
+                send_frame(self.request, "x",
+                           f"actif (pid {os.getpid()}, "
+                           f"{self.server.requests} commandes)")
+            return
+
+        self.server.requests += 1
+        try:
+            code = run_request(self.server.root, self.request,
+                               message.get("argv", []),
+                               message.get("cwd", os.getcwd()))
+            send_frame(self.request, "x", str(code))
+        except ConnectionError:
+            # Client parti en cours de commande
+            pass
+
+
+class EpicDaemon(socketserver.UnixStreamServer):
+    """Serveur qui exécute les commandes epic reçues sur un socket UNIX.
+
+    Les commandes sont traitées l'une après l'autre dans le même
+    processus : l'engine, le pool, les caches et les modules importés
+    restent chauds d'une commande à l'autre.
+    """
+
+    def __init__(self, path, root):
+        self.root = root
+        self.requests = 0
+        prepare_socket_dir(path)
+        if os.path.lexists(path):
+            os.unlink(path)
+        old_umask = os.umask(0o177)
+        try:
+            super().__init__(path, _Handler)
+        finally:
+            os.umask(old_umask)
+
+    def server_close(self):
+        super().server_close()
+        try:
+            os.unlink(self.server_address)
+        except OSError:
+            pass
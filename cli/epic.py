@@ -1,21 +1,60 @@
 import click
-from cli.commands.user_commands import user
-from cli.commands.auth_commands import auth
-from cli.commands.client_commands import client
-from cli.commands.contract_commands import contract
-from cli.commands.event_commands import event
+from cli.lazy_group import LazyGroup
 
+COMMANDS = {
+    "auth": ("cli.commands.auth_commands:auth",
+             "Connexion et déconnexion"),
+    "user": ("cli.commands.user_commands:user",
+             "Gestion des collaborateurs"),
+    "client": ("cli.commands.client_commands:client",
+               "Gestion des clients"),
+    "contract": ("cli.commands.contract_commands:contract",
+                 "Gestion des contrats"),
+    "event": ("cli.commands.event_commands:event",
+              "Gestion des évènements"),
+    "db": ("cli.commands.db_commands:db",
+           "Maintenance de la base de données"),
+    "shell": ("cli.commands.shell_commands:shell",
+              "Enchaîner des commandes dans un même processus"),
+    "daemon": ("cli.commands.daemon_commands:daemon",
+               "Démon qui garde les services chargés entre les commandes"),
+    "batch": ("cli.commands.batch_commands:batch",
+              "Exécuter des opérations en lot depuis un fichier"),
+    "audit": ("cli.commands.audit_commands:audit",
+              "Consulter le journal d'audit"),
+    "outbox": ("cli.commands.outbox_commands:outbox",
+               "Livraison des effets de bord en attente"),
+}
 
-@click.group()
-def epic():
-    pass
 
+def _print_stats(stats):
+    for line in stats.report_lines():
+        click.echo(line, err=True)
+
+
+@click.group(cls=LazyGroup, lazy_subcommands=COMMANDS)
+@click.option("--stats", is_flag=True,
+              help="Affiche en sortie le temps passé en base : requêtes, "
+                   "méthodes DAO, connexions")
+@click.pass_context
+def epic(ctx, stats):
+    if stats:
+        from database.stats import collect_stats
+
+        # Le rapport est écrit à la fermeture du contexte, après la commande
+        ctx.with_resource(collect_stats(report=_print_stats))
+
+
+def register_command(name, import_path, help=None):
+    """Ajoute un module de commandes au CLI ``epic``.
+
+    Args:
+        name (str): nom de la sous-commande
+        import_path (str): chemin ``"module:attribut"`` de la commande Click
+        help (str, optional): aide courte affichée par ``epic --help``
+    """
+    epic.register(name, import_path, help)
 
-epic.add_command(auth)
-epic.add_command(user)
-epic.add_command(client)
-epic.add_command(contract)
-epic.add_command(event)
 
 if __name__ == "__main__":
     epic()
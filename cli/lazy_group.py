@@ -0,0 +1,80 @@
+import click
+from importlib import import_module
+
+PLUGIN_ENTRY_POINT_GROUP = "epic.commands"
+
+
+class LazyGroup(click.Group):
+    """Groupe Click qui n'importe le module d'une sous-commande qu'au
+    moment où elle est exécutée.
+
+    Les sous-commandes sont déclarées par leur chemin d'import
+    ``"module:attribut"``. Des modules supplémentaires peuvent être
+    enregistrés avec ``register`` ou publiés par un paquet tiers via le
+    point d'entrée ``epic.commands``.
+    """
+
+    def __init__(self, *args, lazy_subcommands=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # nom -> (chemin d'import, aide courte)
+        self.lazy_subcommands = {}
+        self._plugins_loaded = False
+        for name, spec in (lazy_subcommands or {}).items():
+            if isinstance(spec, tuple):
+                self.register(name, *spec)
+            else:
+                self.register(name, spec)
+
+    def register(self, name, import_path, help=None):
+        """Enregistre une sous-commande chargée à la demande"""
+        self.lazy_subcommands[name] = (import_path, help or "")
+
+    def list_commands(self, ctx):
+        self._load_plugins()
+        return sorted(set(super().list_commands(ctx)) |
+                      set(self.lazy_subcommands))
+
+    def get_command(self, ctx, cmd_name):
+        command = super().get_command(ctx, cmd_name)
+        if command is not None:
+            return command
+        if cmd_name not in self.lazy_subcommands:
+            self._load_plugins()
+        if cmd_name not in self.lazy_subcommands:
+            return None
+        return self._load_command(cmd_name)
+
+    def format_commands(self, ctx, formatter):
+        # Affiche l'aide sans importer les modules des sous-commandes
+        rows = []
+        for name in self.list_commands(ctx):
+            if name in self.commands:
+                command = self.commands[name]
+                if command.hidden:
+                    continue
+                rows.append((name, command.get_short_help_str()))
+            else:
+                rows.append((name, self.lazy_subcommands[name][1]))
+        if rows:
+            with formatter.section("Commands"):
+                formatter.write_dl(rows)
+
+    def _load_command(self, cmd_name):
+        import_path, _ = self.lazy_subcommands[cmd_name]
+        module_name, attr_name = import_path.split(":")
+        command = getattr(import_module(module_name), attr_name)
+        if not isinstance(command, click.Command):
+            raise click.ClickException(
+                f"{import_path} n'est pas une commande Click")
+        self.add_command(command, cmd_name)
+        return command
+
+    def _load_plugins(self):
+        if self._plugins_loaded:
+            return
+        self._plugins_loaded = True
+        from importlib.metadata import entry_points
+
+        for entry_point in entry_points(group=PLUGIN_ENTRY_POINT_GROUP):
+            self.lazy_subcommands.setdefault(
+                entry_point.name, (entry_point.value, ""))
@@ -0,0 +1,246 @@
+import csv
+import json
+import os
+import sys
+from datetime import date
+from itertools import chain, islice
+import click
+
+FORMATS = ("table", "json", "ndjson", "csv")
+# Formats lisibles par d'autres outils : une ligne écrite par enregistrement
+STREAM_FORMATS = ("json", "ndjson", "csv")
+
+# Nombre de lignes lues avant d'afficher le tableau, pour calculer la largeur
+# des colonnes sans largeur fixe
+TABLE_SAMPLE_SIZE = 50
+# Au-delà, le texte d'une cellule est tronqué
+MAX_COLUMN_WIDTH = 40
+
+
+class Column:
+    """Colonne d'une liste.
+
+    Args:
+        key (str): nom du champ dans les formats json, ndjson et csv
+        header (str): en-tête dans le format table
+        value (callable, optional): ``value(row)`` renvoie la valeur brute,
+            par défaut l'attribut ``key`` de la ligne
+        display (callable, optional): ``display(valeur)`` renvoie le texte
+            affiché dans le tableau
+        width (int, optional): largeur fixe dans le tableau, sinon calculée
+            sur les premières lignes
+        align (str): "<" (gauche, texte) ou ">" (droite, nombres) dans
+            le tableau
+        table (bool): colonne affichée dans le tableau
+        record (bool): champ écrit en json, ndjson et csv
+    """
+
+    def __init__(self, key, header, value=None, display=None, width=None,
+                 align="<", table=True, record=True):
+        self.key = key
+        self.header = header
+        self.value = value or (lambda row: getattr(row, key))
+        self.display = display or (lambda v: "" if v is None else v)
+        self.width = width
+        self.align = align
+        self.table = table
+        self.record = record
+
+    def text(self, row):
+        """Texte de la cellule, sur une seule ligne"""
+        return " ".join(str(self.display(self.value(row))).split())
+
+
+def format_option(f):
+    """Ajoute --format à une commande de liste"""
+    return click.option(
+        "--format", "output_format", type=click.Choice(FORMATS),
+        default="table", show_default=True,
+        help="Format de sortie ; les lignes sont écrites au fil de la "
+             "lecture")(f)
+
+
+def _json_value(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} non sérialisable")
+
+
+def _csv_value(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def write_records(rows, columns, output_format, out=None):
+    """Écrit les lignes au format json, ndjson ou csv, une par une, sans
+    les garder en mémoire.
+
+    Args:
+        rows (iterable): lignes à écrire, éventuellement un générateur
+        columns (list): colonnes (``Column``) à écrire
+        output_format (str): "json", "ndjson" ou "csv"
+        out (file, optional): flux de sortie, sys.stdout par défaut
+
+    Returns:
+        int: nombre de lignes écrites
+    """
+    out = out or sys.stdout
+    columns = [column for column in columns if column.record]
+    count = 0
+    if output_format == "csv":
+        writer = csv.writer(out, lineterminator="\n")
+        writer.writerow([column.key for column in columns])
+        for row in rows:
+            writer.writerow([_csv_value(column.value(row))
+                             for column in columns])
+            count += 1
+    elif output_format == "ndjson":
+        for row in rows:
+            record = {column.key: column.value(row) for column in columns}
+            out.write(json.dumps(record, default=_json_value,
+                                 ensure_ascii=False) + "\n")
+            count += 1
+    else:
+        # Tableau JSON écrit élément par élément
+        separator = "[\n"
+        for row in rows:
+            record = {column.key: column.value(row) for column in columns}
+            out.write(separator + json.dumps(record, default=_json_value,
+                                             ensure_ascii=False))
+            separator = ",\n"
+            count += 1
+        out.write("[]\n" if count == 0 else "\n]\n")
+    out.flush()
+    return count
+
+
+def _fit(text, width, align):
+    # Un nombre n'est jamais tronqué : il déborde de sa colonne
+    if len(text) > width and align == "<":
+        return text[:width - 1] + "…"
+    return text
+
+
+def table_lines(rows, columns, sample_size=TABLE_SAMPLE_SIZE):
+    """Génère les lignes d'un tableau encadré au fur et à mesure que les
+    lignes arrivent.
+
+    Seules les ``sample_size`` premières lignes sont lues d'avance : elles
+    fixent la largeur des colonnes qui n'en ont pas (au plus
+    MAX_COLUMN_WIDTH). Les textes plus larges sont tronqués.
+
+    Yields:
+        str: une ligne de texte terminée par un saut de ligne
+    """
+    columns = [column for column in columns if column.table]
+    rows = iter(rows)
+    sample = [[column.text(row) for column in columns]
+              for row in islice(rows, sample_size)]
+    if not sample:
+        return
+
+    widths = []
+    for i, column in enumerate(columns):
+        width = column.width or min(
+            max([len(column.header)] + [len(cells[i]) for cells in sample]),
+            MAX_COLUMN_WIDTH)
+        widths.append(width)
+
+    def line(cells, aligns):
+        return "| " + " | ".join(
+            f"{_fit(cell, width, align):{align}{width}}"
+            for cell, width, align in zip(cells, widths, aligns)) + " |\n"
+
+    border = "+" + "+".join("-" * (width + 2) for width in widths) + "+\n"
+    yield border
+    yield line([column.header for column in columns], "<" * len(columns))
+    yield border.replace("-", "=")
+
+    aligns = [column.align for column in columns]
+    remaining = ([column.text(row) for column in columns] for row in rows)
+    for cells in chain(sample, remaining):
+        yield line(cells, aligns)
+        yield border
+
+
+def _use_pager():
+    return bool(os.getenv("PAGER")) and sys.stdout.isatty()
+
+
+def echo_table(rows, columns, pager=True):
+    """Affiche un tableau au fil de l'eau, à travers $PAGER quand la
+    sortie est un terminal.
+
+    Returns:
+        int: nombre de lignes affichées
+    """
+    count = 0
+
+    def counted():
+        nonlocal count
+        for row in rows:
+            count += 1
+            yield row
+
+    lines = table_lines(counted(), columns)
+    first = next(lines, None)
+    if first is None:
+        return 0
+
+    if pager and _use_pager():
+        click.echo_via_pager(chain([first], lines))
+    else:
+        out = sys.stdout
+        for text in chain([first], lines):
+            out.write(text)
+        out.flush()
+    return count
+
+
+def stream_records(iterate, columns, output_format, empty_message=None):
+    """Affiche au fil de l'eau les lignes d'un générateur de service.
+
+    Args:
+        iterate (callable): méthode ``iter_...`` du service
+        columns (list): colonnes (``Column``) à écrire
+        output_format (str): un des FORMATS
+        empty_message (str, optional): affiché en format table quand il
+            n'y a aucune ligne
+
+    Raises:
+        click.exceptions.Exit: code 1 si la lecture échoue en cours de
+            route ; la sortie déjà écrite est incomplète
+    """
+    table = output_format not in STREAM_FORMATS
+    try:
+        if table:
+            count = echo_table(iterate(), columns)
+        else:
+            count = write_records(iterate(), columns, output_format)
+    except Exception:
+        sys.stdout.flush()
+        click.echo("Erreur lors de la récupération", err=not table)
+        raise click.exceptions.Exit(1)
+    if table and count == 0 and empty_message:
+        click.echo(empty_message)
+
+
+def page_renderer(columns, output_format, show_message=False):
+    """Fonction d'affichage de ``show_pages``.
+
+    En table, le message du service est affiché quand la page est vide ou
+    en erreur, et après chaque page avec ``show_message``. En json, ndjson
+    et csv, les messages vont sur la sortie d'erreur pour ne pas se mêler
+    aux données.
+    """
+    table = output_format not in STREAM_FORMATS
+
+    def render(success, rows, message):
+        if not success:
+            click.echo(message, err=not table)
+        elif not table:
+            write_records(rows, columns, output_format)
+        elif echo_table(rows, columns, pager=False) == 0 or show_message:
+            click.echo(message)
+    return render
@@ -0,0 +1,49 @@
+import click
+
+DEFAULT_PAGE_SIZE = 50
+
+
+def pagination_options(f):
+    """Ajoute --limit, --after et --page à une commande de liste"""
+    f = click.option("--page", "interactive", is_flag=True,
+                     help="Affiche les résultats page par page")(f)
+    f = click.option("--after", default=None,
+                     help="Curseur renvoyé par la page précédente")(f)
+    f = click.option("--limit", type=click.IntRange(min=1), default=None,
+                     help="Nombre de lignes par page")(f)
+    return f
+
+
+def show_pages(fetch, next_cursor, render, limit=None, after=None,
+               interactive=False, err=False):
+    """Récupère et affiche une liste page par page.
+
+    Args:
+        fetch (callable): ``fetch(limit=, after=)`` renvoyant
+            (success, rows, message)
+        next_cursor (callable): ``next_cursor(rows, limit)`` renvoyant le
+            curseur de la page suivante ou None
+        render (callable): ``render(success, rows, message)`` affiche une page
+        limit (int, optional): taille de page
+        after (str, optional): curseur de départ
+        interactive (bool): propose d'afficher la page suivante
+        err (bool): écrit le curseur et la question sur la sortie d'erreur
+    """
+    if interactive and limit is None:
+        limit = DEFAULT_PAGE_SIZE
+
+    while True:
+        success, rows, message = fetch(limit=limit, after=after)
+        render(success, rows, message)
+        if not success:
+            return
+
+        after = next_cursor(rows, limit)
+        if after is None:
+            return
+        if not interactive:
+            click.echo(f"Page suivante : --after {after}", err=err)
+            return
+        if not click.confirm("Afficher la page suivante ?", default=True,
+                             err=err):
+            return
@@ -0,0 +1,45 @@
+import os
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def load_env():
+    """Charge le fichier .env une seule fois par processus"""
+    from dotenv import load_dotenv
+    load_dotenv()
+
+
+def get_env(name, default=None):
+    """Lit une variable d'environnement après chargement du .env"""
+    load_env()
+    return os.getenv(name, default)
+
+
+def _get_typed_env(name, default, cast):
+    value = get_env(name)
+    if value is None or value.strip() == "":
+        return default
+    try:
+        return cast(value.strip())
+    except ValueError:
+        return default
+
+
+def get_env_int(name, default):
+    """Variable d'environnement entière, ``default`` si elle est absente,
+    vide ou invalide"""
+    return _get_typed_env(name, default, int)
+
+
+def get_env_float(name, default):
+    """Variable d'environnement décimale, ``default`` si elle est absente,
+    vide ou invalide"""
+    return _get_typed_env(name, default, float)
+
+
+def get_env_bool(name, default=False):
+    """Variable d'environnement booléenne : 1, true, yes ou on (sans
+    casse) valent True ; ``default`` si elle est absente ou vide"""
+    return _get_typed_env(
+        name, default,
+        lambda value: value.lower() in ("1", "true", "yes", "on"))
@@ -0,0 +1,85 @@
+from datetime import datetime
+from sqlalchemy import insert, select
+from database.schema import audit_log
+from database.dao.streaming import stream_rows, DEFAULT_BATCH_SIZE
+from database.dao.base import BaseDAO
+from database.stats import timed
+
+
+@timed
+class AuditLogDAO(BaseDAO):
+    """Journal d'audit local.
+
+    Le journal est en ajout seul : cette DAO n'expose ni mise à jour ni
+    suppression.
+    """
+
+    def append(self, events):
+        """Ajoute des événements d'audit en un seul INSERT multi-lignes.
+
+        Args:
+            events (list): événements d'audit de l'outbox (timestamp,
+                entity, entity_id, event_type, action, actor, message,
+                details)
+
+        Returns:
+            int: nombre de lignes ajoutées
+        """
+        rows = [{
+            "occurred_at": datetime.fromtimestamp(e["timestamp"]),
+            "entity": e["entity"],
+            "entity_id": e["entity_id"],
+            "event_type": e["event_type"],
+            "action": e["action"],
+            "actor": e.get("actor"),
+            "message": e.get("message"),
+            "details": e.get("details"),
+        } for e in events]
+        if not rows:
+            return 0
+        with self._begin() as conn:
+            conn.execute(insert(audit_log), rows)
+        return len(rows)
+
+    @staticmethod
+    def filter_criteria(entity=None, entity_id=None, since=None, until=None,
+                        actor=None):
+        """Conditions WHERE de la recherche dans le journal.
+
+        Une entité et son id, avec ou sans dates, utilisent l'index
+        ix_audit_log_entity ; les dates seules ix_audit_log_occurred_at.
+
+        Args:
+            entity (str, optional): "user", "contract" ou "event"
+            entity_id (int, optional): id de l'entité
+            since (datetime, optional): à partir de cette date
+            until (datetime, optional): avant cette date (exclue)
+            actor (str, optional): utilisateur à l'origine de l'événement
+
+        Returns:
+            list: conditions à passer à ``where``
+        """
+        criteria = []
+        if entity is not None:
+            criteria.append(audit_log.c.entity == entity)
+        if entity_id is not None:
+            criteria.append(audit_log.c.entity_id == entity_id)
+        if since is not None:
+            criteria.append(audit_log.c.occurred_at >= since)
+        if until is not None:
+            criteria.append(audit_log.c.occurred_at < until)
+        if actor is not None:
+            criteria.append(audit_log.c.actor == actor)
+        return criteria
+
+    def iter_entries(self, limit=None, batch_size=DEFAULT_BATCH_SIZE,
+                     **filters):
+        """Parcourt les événements du journal par date, avec un curseur
+        côté serveur, voir ``filter_criteria`` pour les filtres"""
+        query = (
+            select(audit_log)
+            .where(*self.filter_criteria(**filters))
+            .order_by(audit_log.c.occurred_at, audit_log.c.id)
+            .limit(limit)
+        )
+        yield from stream_rows(self.engine, query, batch_size)
@@ -0,0 +1,15 @@
+from database.unit_of_work import connect, begin
+
+
+class BaseDAO:
+    """Base des DAO : les connexions passent par l'unité de travail en
+    cours quand il y en a une (voir database.unit_of_work)"""
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def _connect(self):
+        return connect(self.engine)
+
+    def _begin(self):
+        return begin(self.engine)
@@ -0,0 +1,77 @@
+from sqlalchemy import insert
+from sqlalchemy.exc import DataError, IntegrityError
+from database.unit_of_work import begin
+
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def _chunks(rows, chunk_size):
+    """Découpe les lignes en lots consécutifs de mêmes colonnes, chaque lot
+    étant une liste de (position d'origine, ligne)"""
+    chunk, keys = [], None
+    for position, row in enumerate(rows):
+        row_keys = frozenset(row)
+        if chunk and (row_keys != keys or len(chunk) >= chunk_size):
+            yield chunk
+            chunk = []
+        chunk.append((position, row))
+        keys = row_keys
+    if chunk:
+        yield chunk
+
+
+def driver_message(error):
+    """Message du driver d'une erreur SQL, sur une seule ligne"""
+    return " ".join(str(error.orig).split())
+
+
+def insert_many(engine, table, rows, chunk_size=DEFAULT_CHUNK_SIZE,
+                describe_error=None):
+    """Insère plusieurs lignes dans une seule transaction.
+
+    Chaque lot est envoyé en un ``INSERT ... RETURNING`` multi-lignes
+    (insertmanyvalues) dans un SAVEPOINT. Si une contrainte échoue, seul ce
+    lot est rejoué ligne par ligne, chacune dans son propre SAVEPOINT : les
+    lignes valides sont conservées et les lignes en erreur signalées, sans
+    interrompre le reste de l'import.
+
+    Args:
+        engine: engine SQLAlchemy
+        table (Table): table cible
+        rows (iterable): dictionnaires colonne -> valeur
+        chunk_size (int): nombre de lignes par INSERT
+        describe_error (callable, optional): transforme l'exception d'une
+            ligne rejetée en message ; par défaut le message du driver
+
+    Returns:
+        tuple: (ids, errors)
+            - ids (list): id créé pour chaque ligne, dans l'ordre d'entrée,
+              None pour les lignes rejetées
+            - errors (list): (position, message) des lignes rejetées
+    """
+    describe_error = describe_error or driver_message
+    stmt = insert(table).returning(table.c.id, sort_by_parameter_order=True)
+    ids, errors = [], []
+
+    with begin(engine) as conn:
+        for chunk in _chunks(rows, chunk_size):
+            ids.extend([None] * len(chunk))
+            values = [row for _, row in chunk]
+            try:
+                with conn.begin_nested():
+                    created = conn.execute(stmt, values).scalars().all()
+                for (position, _), row_id in zip(chunk, created):
+                    ids[position] = row_id
+                continue
+            except (IntegrityError, DataError):
+                pass
+
+            for position, row in chunk:
+                try:
+                    with conn.begin_nested():
+                        ids[position] = conn.execute(
+                            stmt, row).scalar_one()
+                except (IntegrityError, DataError) as e:
+                    errors.append((position, describe_error(e)))
+
+    return ids, errors
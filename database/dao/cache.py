@@ -0,0 +1,83 @@
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from config import get_env_int, get_env_float
+
+
+class TTLCache:
+    """Cache clé -> valeur borné en taille, dont les entrées expirent après
+    ``ttl`` secondes. Au-delà de ``maxsize`` entrées, la moins récemment
+    utilisée est évincée."""
+
+    def __init__(self, maxsize=1024, ttl=60.0, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            value, expires_at = item
+            if expires_at <= self._clock():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, self._clock() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class RoleCache:
+    """Caches des rôles pour une base de données.
+
+    ``departements`` associe l'id d'un département à son nom pour toute la
+    durée du processus ; ``users`` associe l'id d'un utilisateur à l'id de
+    son département, avec expiration (ROLE_CACHE_TTL secondes, 60 par
+    défaut) et au plus ROLE_CACHE_SIZE entrées (1024 par défaut).
+    """
+
+    def __init__(self):
+        self.departements = {}
+        self.users = TTLCache(
+            maxsize=get_env_int("ROLE_CACHE_SIZE", 1024),
+            ttl=get_env_float("ROLE_CACHE_TTL", 60))
+
+    def clear(self):
+        self.departements.clear()
+        self.users.clear()
+
+
+# Un cache par engine : deux bases ouvertes dans le même processus ne
+# partagent pas leurs rôles
+_role_caches = weakref.WeakKeyDictionary()
+_role_caches_lock = threading.Lock()
+
+
+def get_role_cache(engine):
+    """Renvoie le cache des rôles associé à un engine"""
+    with _role_caches_lock:
+        cache = _role_caches.get(engine)
+        if cache is None:
+            cache = _role_caches[engine] = RoleCache()
+        return cache
@@ -1,19 +1,153 @@
-from sqlalchemy import insert, update, select
+from sqlalchemy import (insert, update, delete, select, func, or_,
+                        MetaData, Table, Column, Integer, String)
 from database.schema import client, user
+from database.dao.pagination import paginate
+from database.dao.bulk import insert_many
+from database.dao.streaming import stream_rows, DEFAULT_BATCH_SIZE
+from database.dao.base import BaseDAO
+from database.dao import outcomes
+from database.stats import timed
 
+# Table temporaire de l'import : chargée par lots puis fusionnée dans client
+client_staging = Table(
+    "client_staging",
+    MetaData(),
+    Column('line', Integer, primary_key=True),
+    Column('fullname', String(255), nullable=False),
+    Column('contact', String(255)),
+    Column('email', String(255), nullable=False),
+    Column('phone_number', String(20)),
+    Column('commercial_id', Integer),
+    prefixes=["TEMPORARY"]
+)
 
-class ClientDAO:
-    def __init__(self, engine):
-        self.engine = engine
+IMPORT_COLUMNS = ("fullname", "contact", "email", "phone_number",
+                  "commercial_id")
+
+
+def _upsert(conn):
+    """Construit un INSERT du dialecte, qui supporte ON CONFLICT"""
+    if conn.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    return dialect_insert(client)
+
+
+def _reject_staged(conn, query, reason, on_rejected):
+    """Retire de la table d'import les lignes renvoyées par ``query``"""
+    lines = []
+    for row in conn.execute(query.order_by(client_staging.c.line)):
+        lines.append(row.line)
+        if on_rejected is not None:
+            on_rejected(row._asdict(), reason)
+    if lines:
+        conn.execute(delete(client_staging).where(
+            client_staging.c.line.in_(lines)))
+
+
+@timed
+class ClientDAO(BaseDAO):
+    # Clé de tri de la pagination (curseur : fullname, id)
+    SORT_KEY = "fullname"
 
     def create_client(self, client_data):
-        with self.engine.begin() as conn:
+        with self._begin() as conn:
             stmt = insert(client).values(**client_data)
             result = conn.execute(stmt)
             return result.inserted_primary_key
 
+    def create_many(self, rows):
+        """Crée plusieurs clients en une transaction, voir insert_many"""
+        return insert_many(self.engine, client, rows)
+
+    def import_clients(self, batches, owner_id=None, on_rejected=None):
+        """Importe des clients par lots en une transaction.
+
+        Les lots sont chargés dans une table temporaire puis fusionnés dans
+        ``client`` par un seul ``INSERT ... ON CONFLICT (email) DO UPDATE`` :
+        un email déjà connu met à jour le client existant, sans changer son
+        commercial (il n'est renseigné que s'il n'en avait pas). Une ligne
+        sans ``commercial_id`` ne peut que mettre à jour un client existant.
+
+        Args:
+            batches (iterable): listes de dictionnaires ayant les clés
+                ``line`` et IMPORT_COLUMNS ; les emails doivent être uniques
+            owner_id (int, optional): seuls les clients existants de ce
+                commercial peuvent être mis à jour ; les lignes dont l'email
+                appartient à un autre client sont écartées
+            on_rejected (callable, optional): ``on_rejected(row, reason)``
+                appelé pour chaque ligne écartée, ``reason`` valant
+                ``outcomes.NOT_CLIENT_COMMERCIAL`` ou
+                ``outcomes.COMMERCIAL_REQUIRED``
+
+        Returns:
+            tuple: (created, updated) nombre de clients créés et mis à jour
+        """
+        with self._begin() as conn:
+            client_staging.create(conn)
+
+            for batch in batches:
+                if batch:
+                    conn.execute(insert(client_staging), batch)
+
+            if owner_id is not None:
+                _reject_staged(
+                    conn,
+                    select(client_staging)
+                    .join(client, client.c.email == client_staging.c.email)
+                    .where(or_(client.c.commercial_id.is_(None),
+                               client.c.commercial_id != owner_id)),
+                    outcomes.NOT_CLIENT_COMMERCIAL, on_rejected)
+            _reject_staged(
+                conn,
+                select(client_staging)
+                .outerjoin(client,
+                           client.c.email == client_staging.c.email)
+                .where(client_staging.c.commercial_id.is_(None),
+                       client.c.id.is_(None)),
+                outcomes.COMMERCIAL_REQUIRED, on_rejected)
+
+            updated = conn.execute(
+                select(func.count())
+                .select_from(client_staging.join(
+                    client, client.c.email == client_staging.c.email))
+            ).scalar()
+            total = conn.execute(
+                select(func.count()).select_from(client_staging)
+            ).scalar()
+
+            stmt = _upsert(conn).from_select(
+                IMPORT_COLUMNS,
+                select(*[client_staging.c[name] for name in IMPORT_COLUMNS])
+                # WHERE requis par SQLite pour lever l'ambiguïté du ON
+                .where(client_staging.c.line.is_not(None))
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[client.c.email],
+                set_={
+                    # Un champ absent du fichier garde sa valeur en base
+                    **{name: func.coalesce(stmt.excluded[name],
+                                           client.c[name])
+                       for name in IMPORT_COLUMNS
+                       if name not in ("email", "commercial_id")},
+                    # Le commercial par défaut de l'import ne vaut que pour
+                    # les nouveaux clients
+                    "commercial_id": func.coalesce(
+                        client.c.commercial_id,
+                        stmt.excluded.commercial_id),
+                    "updated_at": func.now()
+                },
+                where=(client.c.commercial_id == owner_id
+                       if owner_id is not None else None)
+            )
+            conn.execute(stmt)
+
+            client_staging.drop(conn)
+            return total - updated, updated
+
     def get_client_by_id(self, client_id):
-        with self.engine.connect() as conn:
+        with self._connect() as conn:
             stmt = (
                 select(
                     client
@@ -25,7 +159,7 @@ class ClientDAO:
             return result
 
     def exists(self, client_id):
-        with self.engine.connect() as conn:
+        with self._connect() as conn:
             stmt = (
                 select(
                     client.c.id
@@ -36,7 +170,7 @@ class ClientDAO:
             return result is not None
 
     def update_client(self, client_id, client_data):
-        with self.engine.begin() as conn:
+        with self._begin() as conn:
             stmt = (
                 update(client)
                 .where(client.c.id == client_id)
@@ -45,17 +179,32 @@ class ClientDAO:
             result = conn.execute(stmt)
             return result.rowcount
 
-    def get_all_clients(self):
-        with self.engine.connect() as conn:
-            stmt = (
-                select(
-                    client,
-                    user.c.first_name.label("commercial_first_name"),
-                    user.c.last_name.label("commercial_last_name")
-                )
-                .join(user, client.c.commercial_id == user.c.id)
+    def _list_query(self, limit=None, after=None, commercial_id=None):
+        stmt = (
+            select(
+                client,
+                user.c.first_name.label("commercial_first_name"),
+                user.c.last_name.label("commercial_last_name")
             )
+            .join(user, client.c.commercial_id == user.c.id)
+        )
+        if commercial_id is not None:
+            stmt = stmt.where(client.c.commercial_id == commercial_id)
+        return paginate(stmt, client.c.fullname, client.c.id,
+                        limit=limit, after=after)
 
-            result = conn.execute(stmt)
+    def get_all_clients(self, limit=None, after=None, commercial_id=None):
+        """Liste les clients, ceux d'un commercial avec ``commercial_id``"""
+        with self._connect() as conn:
+            stmt = self._list_query(limit=limit, after=after,
+                                    commercial_id=commercial_id)
+
+            result = conn.execute(stmt).fetchall()
 
             return result
+
+    def iter_all_clients(self, batch_size=DEFAULT_BATCH_SIZE,
+                         commercial_id=None):
+        """Parcourt les clients avec un curseur côté serveur"""
+        query = self._list_query(commercial_id=commercial_id)
+        yield from stream_rows(self.engine, query, batch_size)
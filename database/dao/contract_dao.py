@@ -1,31 +1,115 @@
-from sqlalchemy import insert, update, select
-from database.schema import contract, client
+from sqlalchemy import insert, update, select, exists, or_
+from database.schema import contract, client, contract_balance
+from database.dao import outcomes
+from database.dao.pagination import paginate
+from database.dao.bulk import insert_many
+from database.dao.streaming import stream_rows, DEFAULT_BATCH_SIZE
+from database.dao.base import BaseDAO
+from database.stats import timed
 
 
-class ContractDAO:
-    def __init__(self, engine):
-        self.engine = engine
+@timed
+class ContractDAO(BaseDAO):
+    # Clé de tri de la pagination (curseur : created_at, id)
+    SORT_KEY = "created_at"
 
     def create_contract(self, contract_data):
-        with self.engine.begin() as conn:
+        with self._begin() as conn:
             stmt = insert(contract).values(**contract_data)
             result = conn.execute(stmt)
             return result
 
-    def update_contract(self, contract_id, update_data):
-
-        with self.engine.begin() as conn:
-            stmt = (
-                update(contract)
+    def create_many(self, rows):
+        """Crée plusieurs contrats en une transaction, voir insert_many"""
+        return insert_many(self.engine, contract, rows)
+
+    def update_contract(self, contract_id, update_data, owner_id=None):
+        """Met à jour un contrat en vérifiant les règles métier dans la même
+        requête.
+
+        L'``UPDATE`` n'aboutit que si le montant payé ne dépasse pas le
+        montant du contrat et, quand ``owner_id`` est fourni, si le client
+        est assigné à ce commercial ou à personne. Lors d'une signature par
+        ce commercial, un client sans commercial lui est assigné dans la
+        même transaction.
+
+        Args:
+            contract_id (int): contrat à modifier
+            update_data (dict): colonnes à modifier
+            owner_id (int, optional): commercial qui doit suivre le client
+
+        Returns:
+            tuple: (reason, row) ; reason vaut outcomes.UPDATED en cas de
+                succès. row contient id, client_id, amount, fullname et
+                commercial_id du contrat, None s'il n'existe pas
+        """
+        client_fullname = (
+            select(client.c.fullname)
+            .where(client.c.id == contract.c.client_id)
+            .scalar_subquery()
+        )
+        client_commercial = (
+            select(client.c.commercial_id)
+            .where(client.c.id == contract.c.client_id)
+            .scalar_subquery()
+        )
+
+        criteria = [contract.c.id == contract_id]
+        if owner_id is not None:
+            criteria.append(exists().where(
+                client.c.id == contract.c.client_id,
+                or_(client.c.commercial_id.is_(None),
+                    client.c.commercial_id == owner_id)
+            ))
+        if update_data.get("paid_amount") is not None:
+            criteria.append(contract.c.amount >= update_data["paid_amount"])
+
+        stmt = (
+            update(contract)
+            .where(*criteria)
+            .values(**update_data)
+            .returning(contract.c.id, contract.c.client_id,
+                       contract.c.amount,
+                       client_fullname.label("fullname"),
+                       client_commercial.label("commercial_id"))
+        )
+
+        with self._begin() as conn:
+            row = conn.execute(stmt).fetchone()
+            if row is not None:
+                if (owner_id is not None and update_data.get("status")
+                        and row.commercial_id is None):
+                    conn.execute(
+                        update(client)
+                        .where(client.c.id == row.client_id,
+                               client.c.commercial_id.is_(None))
+                        .values(commercial_id=owner_id)
+                    )
+                return outcomes.UPDATED, row
+
+            current = conn.execute(
+                select(contract.c.id, contract.c.client_id,
+                       contract.c.amount,
+                       client.c.fullname, client.c.commercial_id)
+                .select_from(
+                    contract.join(client, contract.c.client_id == client.c.id)
+                )
                 .where(contract.c.id == contract_id)
-                .values(**update_data)
-            )
-            result = conn.execute(stmt)
-            return result.rowcount
+            ).fetchone()
+
+        if current is None:
+            return outcomes.CONTRACT_NOT_FOUND, None
+        if (owner_id is not None and
+                current.commercial_id not in (None, owner_id)):
+            return outcomes.NOT_CLIENT_COMMERCIAL, current
+        if update_data.get("paid_amount") is not None:
+            return outcomes.AMOUNT_EXCEEDS_CONTRACT, current
+        # Contrat modifié entre l'UPDATE et la relecture
+        return outcomes.CONTRACT_NOT_FOUND, current
 
     def exists(self, contract_id):
 
-        with self.engine.begin() as conn:
+        with self._begin() as conn:
             stmt = (
                 select(
                     contract.c.id
@@ -35,23 +119,68 @@ class ContractDAO:
             result = conn.execute(stmt).fetchone()
             return result is not None
 
-    def get_all_contracts(self):
-        with self.engine.connect()as conn:
-            query = (
-                select(
-                    contract, client.c.fullname
-                )
-                .select_from(
-                    contract.join(client, contract.c.client_id == client.c.id)
-                )
-
+    @staticmethod
+    def filter_criteria(client_id=None, min_balance=None, created_from=None,
+                        created_to=None, owner_id=None):
+        """Conditions WHERE des filtres de la liste des contrats.
+
+        Args:
+            client_id (int, optional): client du contrat
+            min_balance (float, optional): reste à payer strictement
+                supérieur à ce montant (index ix_contract_balance)
+            created_from (datetime, optional): créé à partir de cette date
+            created_to (datetime, optional): créé avant cette date (exclue)
+            owner_id (int, optional): contrats visibles par ce commercial,
+                ceux de ses clients et des clients sans commercial (qu'il
+                peut signer)
+
+        Returns:
+            list: conditions à passer à ``_list_query``
+        """
+        criteria = []
+        if owner_id is not None:
+            criteria.append(or_(client.c.commercial_id == owner_id,
+                                client.c.commercial_id.is_(None)))
+        if client_id is not None:
+            criteria.append(contract.c.client_id == client_id)
+        if min_balance is not None:
+            # Même expression que l'index pour qu'il soit utilisé
+            criteria.append(contract_balance > min_balance)
+        if created_from is not None:
+            criteria.append(contract.c.created_at >= created_from)
+        if created_to is not None:
+            criteria.append(contract.c.created_at < created_to)
+        return criteria
+
+    def _list_query(self, *criteria, limit=None, after=None):
+        query = (
+            select(
+                contract, client.c.fullname
+            )
+            .select_from(
+                contract.join(client, contract.c.client_id == client.c.id)
             )
+            .where(*criteria)
+        )
+        return paginate(query, contract.c.created_at, contract.c.id,
+                        limit=limit, after=after)
+
+    def get_all_contracts(self, limit=None, after=None, **filters):
+        """Liste les contrats, voir ``filter_criteria`` pour les filtres"""
+        with self._connect() as conn:
+            query = self._list_query(*self.filter_criteria(**filters),
+                                     limit=limit, after=after)
 
             result = conn.execute(query).fetchall()
             return result
 
+    def iter_all_contracts(self, batch_size=DEFAULT_BATCH_SIZE, **filters):
+        """Parcourt les contrats avec un curseur côté serveur"""
+        query = self._list_query(*self.filter_criteria(**filters))
+        yield from stream_rows(self.engine, query, batch_size)
+
     def get_contract_by_id(self, contract_id):
-        with self.engine.connect()as conn:
+        with self._connect() as conn:
             query = (
                 select(
                     contract, client.c.fullname, client.c.commercial_id
@@ -69,7 +198,7 @@ class ContractDAO:
             return result
 
     def get_all_contracts_filter_by_client(self, client_id):
-        with self.engine.connect() as conn:
+        with self._connect() as conn:
             query = (
                 select(contract, client.c.fullname)
                 .select_from(
@@ -80,31 +209,32 @@ class ContractDAO:
             result = conn.execute(query).fetchall()
             return result
 
-    def get_contracts_not_sign(self):
-        with self.engine.connect() as conn:
-            query = (
-                select(contract,
-                       client.c.fullname
-                       )
-                .select_from(
-                    contract.join(client, contract.c.client_id == client.c.id)
-                )
-                .where(contract.c.status.is_(False))
-            )
+    def get_contracts_not_sign(self, **filters):
+        with self._connect() as conn:
+            query = self._list_query(contract.c.status.is_(False),
+                                     *self.filter_criteria(**filters))
             result = conn.execute(query).fetchall()
             return result
 
-    def get_contracts_not_fully_paid(self):
-        with self.engine.connect() as conn:
-            query = (select(
-                contract,
-                client.c.fullname,
-            )
-                .select_from(
-                    contract.join(client, contract.c.client_id == client.c.id)
-            )
-                .where((contract.c.paid_amount < contract.c.amount))
-            )
+    def iter_contracts_not_sign(self, batch_size=DEFAULT_BATCH_SIZE,
+                                **filters):
+        """Parcourt les contrats non signés avec un curseur côté serveur"""
+        query = self._list_query(contract.c.status.is_(False),
+                                 *self.filter_criteria(**filters))
+        yield from stream_rows(self.engine, query, batch_size)
+
+    def get_contracts_not_fully_paid(self, **filters):
+        with self._connect() as conn:
+            query = self._list_query(
+                contract.c.paid_amount < contract.c.amount,
+                *self.filter_criteria(**filters))
 
             result = conn.execute(query).fetchall()
             return result
+
+    def iter_contracts_not_fully_paid(self, batch_size=DEFAULT_BATCH_SIZE,
+                                      **filters):
+        """Parcourt les contrats non soldés avec un curseur côté serveur"""
+        query = self._list_query(contract.c.paid_amount < contract.c.amount,
+                                 *self.filter_criteria(**filters))
+        yield from stream_rows(self.engine, query, batch_size)
@@ -1,24 +1,24 @@
 from sqlalchemy import insert, select
 from database.schema import departement
+from database.dao.base import BaseDAO
+from database.stats import timed
 
 
-class DepartementDAO:
-    def __init__(self, engine):
-        self.engine = engine
-
+@timed
+class DepartementDAO(BaseDAO):
     def create_departement(self, departement_data):
-        with self.engine.begin() as conn:
+        with self._begin() as conn:
             stmt = insert(departement).values(**departement_data)
             result = conn.execute(stmt)
             return result.inserted_primary_key[0]
 
     def get_all_departements(self):
-        with self.engine.connect() as conn:
+        with self._connect() as conn:
             result = conn.execute(select(departement))
             return [(row.id, row.name) for row in result]
 
     def get_departement_by_id(self, departement_id):
-        with self.engine.connect() as conn:
+        with self._connect() as conn:
             stmt = select(departement).where(
                 departement.c.id == departement_id)
             result = conn.execute(stmt).fetchone()
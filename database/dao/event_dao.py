@@ -1,19 +1,92 @@
-from sqlalchemy import insert, select, update
-from database.schema import event
+from sqlalchemy import (insert, select, update, exists, literal, true,
+                        func)
+from database.schema import event, contract, client, user, departement
+from database.dao import outcomes
+from database.dao.pagination import paginate
+from database.dao.bulk import insert_many
+from database.dao.streaming import stream_rows, DEFAULT_BATCH_SIZE
+from database.dao.base import BaseDAO
+from database.stats import timed
 
 
-class EventDAO:
-    def __init__(self, engine):
-        self.engine = engine
+@timed
+class EventDAO(BaseDAO):
+    # Clé de tri de la pagination (curseur : start_date, id)
+    SORT_KEY = "start_date"
 
     def create_event(self, event_data):
-        with self.engine.begin() as conn:
-            stmt = insert(event).values(**event_data)
-            result = conn.execute(stmt)
-            return result
+        """Crée un évènement si son contrat est signé et si le contact
+        support éventuel appartient bien à l'équipe Support.
+
+        Les conditions sont vérifiées par l'``INSERT ... SELECT`` lui-même :
+        la validation et l'écriture tiennent en un aller-retour, sans
+        fenêtre entre la vérification et l'insertion. Le motif d'un refus
+        n'est recherché qu'en cas d'échec.
+
+        Returns:
+            tuple: (reason, row) ; reason vaut outcomes.CREATED en cas de
+                succès, row contient alors l'id créé et le fullname du
+                client du contrat, None sinon
+        """
+        contract_id = event_data["contract_id"]
+        support_id = event_data.get("support_contact_id")
+
+        contract_signed = exists().where(
+            contract.c.id == contract_id, contract.c.status.is_(True))
+        support_ok = true() if support_id is None else \
+            self._is_support(support_id)
+
+        # Sous-requêtes sans jointure : SQLite écrit le RETURNING sans
+        # préfixer les colonnes par leur table
+        client_fullname = (
+            select(client.c.fullname)
+            .where(client.c.id == select(contract.c.client_id)
+                   .where(contract.c.id == contract_id)
+                   .scalar_subquery())
+            .scalar_subquery()
+        )
+
+        columns = list(event_data)
+        stmt = (
+            insert(event)
+            .from_select(columns, select(*[
+                literal(event_data[name], event.c[name].type)
+                for name in columns
+            ]).where(contract_signed, support_ok))
+            .returning(event.c.id, client_fullname.label("fullname"))
+        )
+
+        with self._begin() as conn:
+            row = conn.execute(stmt).fetchone()
+            if row is not None:
+                return outcomes.CREATED, row
+
+            checks = conn.execute(select(
+                exists().where(contract.c.id == contract_id)
+                .label("contract_found"),
+                contract_signed.label("contract_signed")
+            )).one()
+
+        if not checks.contract_found:
+            return outcomes.CONTRACT_NOT_FOUND, None
+        if not checks.contract_signed:
+            return outcomes.CONTRACT_NOT_SIGNED, None
+        return outcomes.NOT_SUPPORT, None
+
+    @staticmethod
+    def _is_support(user_id):
+        return exists().where(
+            user.c.id == user_id,
+            user.c.departement_id == departement.c.id,
+            func.lower(departement.c.name) == "support"
+        )
+
+    def create_many(self, rows):
+        """Crée plusieurs évènements en une transaction, voir insert_many"""
+        return insert_many(self.engine, event, rows)
 
     def update_event(self, event_id, update_data):
-        with self.engine.begin() as conn:
+        with self._begin() as conn:
             stmt = (
                 update(event)
                 .where(event.c.id == event_id)
@@ -22,19 +95,62 @@ class EventDAO:
             result = conn.execute(stmt)
             return result.rowcount
 
-    def get_all_events(self):
-        with self.engine.connect() as conn:
-            result = conn.execute(select(event))
+    @staticmethod
+    def filter_criteria(support_id=None, unassigned=False, start_from=None,
+                        start_to=None, contract_id=None):
+        """Conditions WHERE des filtres de la liste des évènements.
+
+        Chaque filtre porte sur une colonne indexée ; ``unassigned``
+        combiné aux dates utilise l'index partiel ix_event_unassigned.
+
+        Args:
+            support_id (int, optional): contact support assigné
+            unassigned (bool): seulement les évènements sans support
+            start_from (datetime, optional): début à partir de cette date
+            start_to (datetime, optional): début avant cette date (exclue)
+            contract_id (int, optional): contrat de l'évènement
+
+        Returns:
+            list: conditions à passer à ``where``
+        """
+        criteria = []
+        if support_id is not None:
+            criteria.append(event.c.support_contact_id == support_id)
+        if unassigned:
+            criteria.append(event.c.support_contact_id.is_(None))
+        if start_from is not None:
+            criteria.append(event.c.start_date >= start_from)
+        if start_to is not None:
+            criteria.append(event.c.start_date < start_to)
+        if contract_id is not None:
+            criteria.append(event.c.contract_id == contract_id)
+        return criteria
+
+    def _list_query(self, limit=None, after=None, **filters):
+        query = select(event).where(*self.filter_criteria(**filters))
+        return paginate(query, event.c.start_date, event.c.id,
+                        limit=limit, after=after)
+
+    def get_all_events(self, limit=None, after=None, **filters):
+        """Liste les évènements, voir ``filter_criteria`` pour les filtres"""
+        with self._connect() as conn:
+            query = self._list_query(limit=limit, after=after, **filters)
+            result = conn.execute(query).fetchall()
             return result
 
+    def iter_all_events(self, batch_size=DEFAULT_BATCH_SIZE, **filters):
+        """Parcourt les évènements avec un curseur côté serveur"""
+        yield from stream_rows(self.engine, self._list_query(**filters),
+                               batch_size)
+
     def get_event_by_id(self, event_id):
-        with self.engine.connect() as conn:
+        with self._connect() as conn:
             query = select(event).where(event.c.id == event_id)
             result = conn.execute(query).fetchone()
             return result
 
     def get_event_if_assign(self, user_id):
-        with self.engine.connect() as conn:
+        with self._connect() as conn:
             query = (
                 select(event)
                 .where(event.c.support_contact_id == user_id)
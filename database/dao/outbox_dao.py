@@ -0,0 +1,78 @@
+from sqlalchemy import delete, func, insert, select, update
+from database.schema import outbox
+from database.dao.base import BaseDAO
+from database.stats import timed
+
+
+@timed
+class OutboxDAO(BaseDAO):
+    """Boîte d'envoi des effets de bord.
+
+    ``add`` écrit dans l'unité de travail en cours : les lignes ne
+    deviennent visibles qu'avec la modification qui les a causées.
+    """
+
+    def add(self, rows):
+        """Ajoute des lignes à livrer.
+
+        Args:
+            rows (list): dictionnaires destination, payload
+        """
+        if not rows:
+            return
+        with self._begin() as conn:
+            conn.execute(insert(outbox), rows)
+
+    def claim(self, destination, limit):
+        """Verrouille les plus anciennes lignes à livrer d'une destination.
+
+        À appeler dans une unité de travail, qui garde le verrou jusqu'à la
+        suppression des lignes livrées. Les lignes déjà verrouillées par un
+        autre processus sont sautées (SKIP LOCKED) : plusieurs processus
+        peuvent vider la boîte en même temps sans livrer deux fois la même
+        ligne.
+
+        Returns:
+            list: lignes (id, payload)
+        """
+        query = (
+            select(outbox.c.id, outbox.c.payload)
+            .where(outbox.c.destination == destination)
+            .order_by(outbox.c.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        with self._connect() as conn:
+            return conn.execute(query).fetchall()
+
+    def delete(self, ids):
+        """Supprime les lignes livrées"""
+        with self._begin() as conn:
+            conn.execute(delete(outbox).where(outbox.c.id.in_(ids)))
+
+    def record_failure(self, ids, error):
+        """Note l'échec d'une livraison ; les lignes restent à livrer"""
+        with self._begin() as conn:
+            conn.execute(
+                update(outbox)
+                .where(outbox.c.id.in_(ids))
+                .values(attempts=outbox.c.attempts + 1,
+                        last_error=error[:1000])
+            )
+
+    def pending(self):
+        """Lignes en attente par destination.
+
+        Returns:
+            list: lignes (destination, count, oldest, max_attempts)
+        """
+        query = (
+            select(outbox.c.destination,
+                   func.count().label("count"),
+                   func.min(outbox.c.created_at).label("oldest"),
+                   func.max(outbox.c.attempts).label("max_attempts"))
+            .group_by(outbox.c.destination)
+            .order_by(outbox.c.destination)
+        )
+        with self._connect() as conn:
+            return conn.execute(query).fetchall()
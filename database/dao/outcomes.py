@@ -0,0 +1,12 @@
+# Codes de résultat des écritures validées en base (create_event,
+# update_contract, import_clients) : la DAO renvoie le motif, le service le
+# traduit en message pour l'utilisateur.
+
+CREATED = "created"
+UPDATED = "updated"
+CONTRACT_NOT_FOUND = "contract_not_found"
+CONTRACT_NOT_SIGNED = "contract_not_signed"
+NOT_SUPPORT = "not_support"
+NOT_CLIENT_COMMERCIAL = "not_client_commercial"
+AMOUNT_EXCEEDS_CONTRACT = "amount_exceeds_contract"
+COMMERCIAL_REQUIRED = "commercial_required"
@@ -0,0 +1,80 @@
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import and_, or_, tuple_
+
+
+def encode_cursor(sort_value, row_id):
+    """Encode la position (clé de tri, id) d'une ligne en curseur opaque"""
+    if isinstance(sort_value, datetime):
+        payload = {"dt": sort_value.isoformat(), "id": row_id}
+    else:
+        payload = {"v": sort_value, "id": row_id}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Décode un curseur produit par encode_cursor.
+
+    Returns:
+        tuple: (valeur de la clé de tri, id)
+
+    Raises:
+        ValueError: si le curseur est invalide
+    """
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(cursor + padding))
+        if "dt" in payload:
+            return datetime.fromisoformat(payload["dt"]), int(payload["id"])
+        return payload["v"], int(payload["id"])
+    except (ValueError, TypeError, KeyError) as e:
+        raise ValueError(f"Curseur de pagination invalide : {cursor}") from e
+
+
+def paginate(query, sort_column, id_column, limit=None, after=None):
+    """Applique une pagination par clé (keyset) à une requête.
+
+    Les lignes sont triées par (sort_column, id_column), les valeurs NULL de
+    la clé de tri en dernier. Le curseur ``after`` désigne la dernière ligne
+    de la page précédente : la page suivante démarre strictement après, sans
+    OFFSET, ce qui garde un coût constant quelle que soit la page.
+
+    Args:
+        query (Select): requête à paginer
+        sort_column (Column): colonne de tri principale
+        id_column (Column): clé primaire, départage les égalités
+        limit (int, optional): taille de page, None = pas de limite
+        after (str | tuple, optional): curseur ou tuple (valeur, id)
+
+    Returns:
+        Select: requête triée, filtrée et limitée
+    """
+    query = query.order_by(sort_column.asc().nulls_last(), id_column.asc())
+
+    if after is not None:
+        if isinstance(after, str):
+            after = decode_cursor(after)
+        sort_value, last_id = after
+        if sort_value is None:
+            query = query.where(
+                and_(sort_column.is_(None), id_column > last_id))
+        else:
+            query = query.where(or_(
+                tuple_(sort_column, id_column) > tuple_(sort_value, last_id),
+                sort_column.is_(None)
+            ))
+
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+
+def next_cursor(rows, limit, sort_key, id_key="id"):
+    """Renvoie le curseur de la page suivante, ou None si c'était la
+    dernière page"""
+    if not limit or not rows or len(rows) < limit:
+        return None
+    last = rows[-1]
+    return encode_cursor(getattr(last, sort_key), getattr(last, id_key))
@@ -0,0 +1,25 @@
+from database.unit_of_work import connect
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+def stream_rows(engine, query, batch_size=DEFAULT_BATCH_SIZE):
+    """Exécute une requête avec un curseur côté serveur et renvoie ses
+    lignes une à une.
+
+    La connexion reste ouverte tant que le générateur n'est pas épuisé ou
+    fermé ; les lignes sont lues par lots de ``batch_size``, ce qui garde une
+    mémoire constante quelle que soit la taille de la table.
+
+    Args:
+        engine: engine SQLAlchemy
+        query (Select): requête à exécuter
+        batch_size (int): nombre de lignes lues par aller-retour
+
+    Yields:
+        Row: lignes du résultat
+    """
+    with connect(engine) as conn:
+        result = conn.execution_options(yield_per=batch_size).execute(query)
+        for row in result:
+            yield row
@@ -1,15 +1,22 @@
 from sqlalchemy import insert, update, select
 from sqlalchemy.exc import IntegrityError
 from database.schema import user, departement
+from database.dao.pagination import paginate
+from database.dao.cache import get_role_cache
+from database.dao.bulk import insert_many, driver_message
+from database.dao.streaming import stream_rows, DEFAULT_BATCH_SIZE
+from database.dao.base import BaseDAO
+from database.stats import timed
 
 
-class UserDAO:
-    def __init__(self, engine):
-        self.engine = engine
+@timed
+class UserDAO(BaseDAO):
+    # Clé de tri de la pagination (curseur : username, id)
+    SORT_KEY = "username"
 
     def create_user(self, user_data):
         try:
-            with self.engine.begin() as conn:
+            with self._begin() as conn:
                 stmt = insert(user).values(**user_data)
                 result = conn.execute(stmt)
                 return result.inserted_primary_key[0]
@@ -18,50 +25,112 @@ class UserDAO:
                 raise ValueError("Cet email existe déjà")
             raise
 
-    def get_users(self):
-        with self.engine.connect() as conn:
-            stmt = select(user)
+    def create_many(self, users_data):
+        """Crée plusieurs utilisateurs en une transaction, voir insert_many.
+
+        Les mots de passe doivent déjà être hachés.
+        """
+        def describe_error(e):
+            if 'user_email_key' in str(e.orig):
+                return "Cet email existe déjà"
+            return driver_message(e)
+
+        return insert_many(self.engine, user, users_data,
+                           describe_error=describe_error)
+
+    def _list_query(self, limit=None, after=None):
+        return paginate(select(user), user.c.username, user.c.id,
+                        limit=limit, after=after)
+
+    def get_users(self, limit=None, after=None):
+        with self._connect() as conn:
+            stmt = self._list_query(limit=limit, after=after)
             result = conn.execute(stmt).fetchall()
             return result
 
+    def iter_users(self, batch_size=DEFAULT_BATCH_SIZE):
+        """Parcourt tous les utilisateurs avec un curseur côté serveur"""
+        yield from stream_rows(self.engine, self._list_query(), batch_size)
+
     def get_user_by_id(self, user_id):
         """Récupère un utilisateur par son ID"""
-        with self.engine.connect() as conn:
+        with self._connect() as conn:
             stmt = select(user).where(user.c.id == user_id)
             result = conn.execute(stmt).fetchone()
             return result
 
     def select_user(self, session, username):
-        with self.engine.connect():
+        with self._connect():
             stmt = select(user).where(user.c.username == username)
             result = session.execute(stmt).fetchone()
             return result
 
     def update_user(self, user_id, user_data):
-        with self.engine.begin() as conn:
+        with self._begin() as conn:
             stmt = (
                 update(user)
                 .where(user.c.id == user_id)
                 .values(**user_data)
             )
             result = conn.execute(stmt)
-            return result.rowcount
+        if "departement_id" in user_data:
+            get_role_cache(self.engine).users.pop(user_id)
+        return result.rowcount
 
-    def has_departement(self, user_id, dept_name):
-        with self.engine.connect() as conn:
-            smtp = (
-                select(
-                    user.c.id, user.c.departement_id
+    def get_roles(self, user_ids):
+        """Renvoie le nom du département de chaque utilisateur.
+
+        Les utilisateurs absents du cache sont chargés en une seule requête
+        jointe sur ``departement`` ; les utilisateurs inconnus sont omis.
+
+        Args:
+            user_ids (iterable): ids des utilisateurs
+
+        Returns:
+            dict: id utilisateur -> nom du département
+        """
+        cache = get_role_cache(self.engine)
+        roles, missing = {}, set()
+        for user_id in set(user_ids):
+            departement_id = cache.users.get(user_id)
+            name = cache.departements.get(departement_id)
+            if name is None:
+                missing.add(user_id)
+            else:
+                roles[user_id] = name
+
+        if missing:
+            with self._connect() as conn:
+                stmt = (
+                    select(user.c.id, user.c.departement_id,
+                           departement.c.name)
+                    .join(departement,
+                          user.c.departement_id == departement.c.id)
+                    .where(user.c.id.in_(missing))
                 )
-                .where(user.c.id == user_id)
-            )
-            result = conn.execute(smtp).fetchone()
-            if not result or not result.departement_id:
-                return False
-            dept_stmt = select(departement.c.name).where(
-                departement.c.id == result.departement_id)
-            dept = conn.execute(dept_stmt).fetchone()
-            return dept and dept.name.lower() == dept_name.lower()
+                for row in conn.execute(stmt):
+                    cache.departements[row.departement_id] = row.name
+                    cache.users.set(row.id, row.departement_id)
+                    roles[row.id] = row.name
+        return roles
+
+    def get_role(self, user_id):
+        """Nom du département d'un utilisateur, None s'il n'existe pas"""
+        if user_id is None:
+            return None
+        return self.get_roles([user_id]).get(user_id)
+
+    def has_departement(self, user_id, dept_name):
+        role = self.get_role(user_id)
+        return role is not None and role.lower() == dept_name.lower()
+
+    def filter_by_departement(self, user_ids, dept_name):
+        """Renvoie, parmi ``user_ids``, les ids des utilisateurs du
+        département ``dept_name``"""
+        return {
+            user_id for user_id, role in self.get_roles(user_ids).items()
+            if role.lower() == dept_name.lower()
+        }
 
     def is_commercial(self, user_id):
         return self.has_departement(user_id, "commercial")
@@ -1,12 +1,45 @@
-import os
-from sqlalchemy import create_engine
-from dotenv import load_dotenv
+import threading
+from config import get_env
 
-load_dotenv()
+_engine = None
+_engine_lock = threading.Lock()
 
-DB_URL = (
-    f"postgresql+psycopg2://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}"
-    f"@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}"
-)
 
-engine = create_engine(DB_URL)
+def get_db_url():
+    return (
+        f"postgresql+psycopg2://{get_env('DB_USER')}:"
+        f"{get_env('DB_PASSWORD')}"
+        f"@{get_env('DB_HOST')}:{get_env('DB_PORT')}/{get_env('DB_NAME')}"
+    )
+
+
+def get_engine():
+    """Renvoie l'engine partagé du processus, construit au premier appel.
+
+    SQLAlchemy, le pool et le .env ne sont chargés qu'à ce moment-là : une
+    commande qui n'interroge pas la base (``--help``, ``auth logout``) ne
+    paie pas leur coût de démarrage.
+    """
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                from sqlalchemy import create_engine
+                from database.pool import get_pool_options, pool_stats
+                from database import stats
+
+                new_engine = create_engine(get_db_url(),
+                                           **get_pool_options())
+                pool_stats.attach(new_engine)
+                stats.attach(new_engine)
+                _engine = new_engine
+    return _engine
+
+
+def __getattr__(name):
+    # Compatibilité avec ``from database.database import engine``
+    if name == "engine":
+        return get_engine()
+    if name == "DB_URL":
+        return get_db_url()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
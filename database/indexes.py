@@ -0,0 +1,119 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateIndex, DropIndex
+from database.schema import meta
+
+
+def get_declared_indexes():
+    """Renvoie les index déclarés dans le schéma, table par table"""
+    return [index
+            for table in meta.sorted_tables
+            for index in sorted(table.indexes, key=lambda ix: ix.name)]
+
+
+def _existing_index_names(bind):
+    if bind.dialect.name == "sqlite":
+        # La réflexion SQLite ignore les index sur expression
+        # (ix_contract_balance) : les noms sont lus dans le catalogue
+        stmt = text("SELECT name FROM sqlite_master WHERE type = 'index'")
+        if hasattr(bind, "connect"):
+            with bind.connect() as conn:
+                return {row[0] for row in conn.execute(stmt)}
+        return {row[0] for row in bind.execute(stmt)}
+
+    inspector = inspect(bind)
+    existing = set()
+    for table_name in inspector.get_table_names():
+        existing.update(ix["name"]
+                        for ix in inspector.get_indexes(table_name))
+    return existing
+
+
+def get_missing_tables(bind):
+    """Renvoie les tables déclarées absentes de la base, par exemple sur
+    une base créée avant l'ajout d'``audit_log`` ou d'``outbox``"""
+    existing = set(inspect(bind).get_table_names())
+    return [table for table in meta.sorted_tables
+            if table.name not in existing]
+
+
+def ensure_tables(engine):
+    """Crée les tables déclarées manquantes, avec leurs index.
+
+    Returns:
+        list: noms des tables créées
+    """
+    missing = get_missing_tables(engine)
+    if missing:
+        meta.create_all(engine, tables=missing, checkfirst=True)
+    return [table.name for table in missing]
+
+
+def get_missing_indexes(bind):
+    """Renvoie les index déclarés absents de la base.
+
+    Les index d'une table absente sont ignorés : ils sont créés avec elle
+    (voir ensure_tables).
+    """
+    existing = _existing_index_names(bind)
+    missing_tables = {table.name for table in get_missing_tables(bind)}
+    return [index for index in get_declared_indexes()
+            if index.name not in existing and
+            index.table.name not in missing_tables]
+
+
+def get_invalid_indexes(conn):
+    """Renvoie les index laissés invalides par un build concurrent échoué"""
+    if conn.dialect.name != "postgresql":
+        return []
+    names = [index.name for index in get_declared_indexes()]
+    stmt = text(
+        "SELECT c.relname FROM pg_index i "
+        "JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE NOT i.indisvalid AND c.relname = ANY(:names)"
+    )
+    invalid = {row[0] for row in conn.execute(stmt, {"names": names})}
+    return [index for index in get_declared_indexes()
+            if index.name in invalid]
+
+
+def _execute_ddl(conn, ddl, index, concurrently):
+    # CONCURRENTLY ne bloque pas les écritures mais doit s'exécuter hors
+    # transaction : la connexion est en AUTOCOMMIT.
+    previous = index.dialect_kwargs.get("postgresql_concurrently")
+    index.dialect_kwargs["postgresql_concurrently"] = concurrently
+    try:
+        conn.execute(ddl)
+    finally:
+        index.dialect_kwargs["postgresql_concurrently"] = previous
+
+
+def ensure_indexes(engine, concurrently=True):
+    """Crée les index déclarés manquants sur une base existante.
+
+    Sur PostgreSQL, les index sont construits avec CREATE INDEX
+    CONCURRENTLY pour ne pas bloquer les écritures, et un index laissé
+    invalide par une construction interrompue est supprimé puis recréé.
+
+    Args:
+        engine: engine SQLAlchemy de la base cible
+        concurrently (bool): construire les index sans verrou d'écriture
+
+    Returns:
+        list: noms des index créés
+    """
+    created = []
+    with engine.connect() as conn:
+        conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+
+        for index in get_invalid_indexes(conn):
+            _execute_ddl(conn, DropIndex(index, if_exists=True), index,
+                         concurrently)
+            _execute_ddl(conn, CreateIndex(index), index, concurrently)
+            created.append(index.name)
+
+        for index in get_missing_indexes(conn):
+            _execute_ddl(conn, CreateIndex(index, if_not_exists=True), index,
+                         concurrently)
+            created.append(index.name)
+
+    return created
@@ -0,0 +1,117 @@
+import time
+import threading
+from sqlalchemy import event
+from sqlalchemy.pool import NullPool, QueuePool
+from config import get_env, get_env_int, get_env_float, get_env_bool
+from database.stats import record_pool_wait
+
+
+def get_pool_mode():
+    """Renvoie le mode de pool configuré : "queue" (défaut) ou "null"."""
+    return get_env("DB_POOL_MODE", "queue").strip().lower()
+
+
+def get_pool_options():
+    """Construit les options de pool à passer à create_engine.
+
+    Variables d'environnement lues :
+        DB_POOL_MODE: "queue" (pool classique) ou "null" (NullPool, une
+            connexion par checkout, adapté aux CLI derrière PgBouncer)
+        DB_POOL_SIZE: nombre de connexions conservées (défaut 5)
+        DB_MAX_OVERFLOW: connexions supplémentaires autorisées (défaut 10)
+        DB_POOL_TIMEOUT: attente max en secondes d'une connexion (défaut 30)
+        DB_POOL_RECYCLE: durée de vie max d'une connexion, -1 = illimitée
+        DB_POOL_PRE_PING: teste la connexion avant usage (défaut False)
+
+    Returns:
+        dict: arguments nommés pour create_engine
+    """
+    pre_ping = get_env_bool("DB_POOL_PRE_PING", False)
+
+    if get_pool_mode() == "null":
+        return {"poolclass": NullPool, "pool_pre_ping": pre_ping}
+
+    return {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": get_env_int("DB_POOL_SIZE", 5),
+        "max_overflow": get_env_int("DB_MAX_OVERFLOW", 10),
+        "pool_timeout": get_env_float("DB_POOL_TIMEOUT", 30),
+        "pool_recycle": get_env_int("DB_POOL_RECYCLE", -1),
+        "pool_pre_ping": pre_ping,
+    }
+
+
+class PoolStats:
+    """Compteurs d'utilisation du pool de connexions du processus."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.connects = 0
+            self.checkouts = 0
+            self.checkins = 0
+            self.invalidations = 0
+            self.waits = 0
+            self.wait_time = 0.0
+            self.max_overflow_seen = 0
+
+    def record_wait(self, duration):
+        with self._lock:
+            self.waits += 1
+            self.wait_time += duration
+
+    def record_overflow(self, overflow):
+        with self._lock:
+            if overflow > self.max_overflow_seen:
+                self.max_overflow_seen = overflow
+
+    def _incr(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def attach(self, engine):
+        """Branche les compteurs sur les événements du pool de l'engine."""
+        event.listen(engine, "connect",
+                     lambda *args: self._incr("connects"))
+        event.listen(engine, "checkout",
+                     lambda *args: self._incr("checkouts"))
+        event.listen(engine, "checkin",
+                     lambda *args: self._incr("checkins"))
+        event.listen(engine, "invalidate",
+                     lambda *args: self._incr("invalidations"))
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "invalidations": self.invalidations,
+                "waits": self.waits,
+                "wait_time": self.wait_time,
+                "max_overflow_seen": self.max_overflow_seen,
+            }
+
+
+pool_stats = PoolStats()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool qui mesure les attentes quand le pool est saturé."""
+
+    def _do_get(self):
+        saturated = (self._max_overflow > -1 and
+                     self.checkedin() == 0 and
+                     self.overflow() >= self._max_overflow)
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            duration = time.perf_counter() - start
+            if saturated:
+                pool_stats.record_wait(duration)
+            record_pool_wait(duration)
+            pool_stats.record_overflow(max(self.overflow(), 0))
@@ -1,5 +1,5 @@
 from sqlalchemy import (MetaData, Table, Column, Integer, String, Float,
-                        DateTime, ForeignKey, Boolean, Text)
+                        DateTime, ForeignKey, Boolean, Text, Index, JSON)
 from sqlalchemy import func
 
 meta = MetaData()
@@ -74,3 +74,68 @@ event = Table(
     Column('support_contact_id', Integer, ForeignKey('user.id'),
            nullable=True)
 )
+
+# Journal d'audit local, en ajout seul : les DAO n'y font que des INSERT
+audit_log = Table(
+    "audit_log",
+    meta,
+    Column('id', Integer, primary_key=True),
+    Column('occurred_at', DateTime, nullable=False),
+    Column('entity', String(20), nullable=False),
+    Column('entity_id', Integer, nullable=False),
+    Column('event_type', String(50), nullable=False),
+    Column('action', String(50), nullable=False),
+    Column('actor', String(40)),
+    Column('message', Text),
+    Column('details', JSON)
+)
+
+# Effets de bord (audit, notifications) écrits dans la transaction de la
+# modification qui les cause, puis livrés par services.outbox ; une ligne
+# par destination, supprimée une fois livrée
+outbox = Table(
+    "outbox",
+    meta,
+    Column('id', Integer, primary_key=True),
+    Column('created_at', DateTime, server_default=func.now()),
+    Column('destination', String(20), nullable=False),
+    Column('payload', JSON, nullable=False),
+    Column('attempts', Integer, nullable=False, server_default='0'),
+    Column('last_error', Text)
+)
+
+# Index secondaires sur les clés étrangères et colonnes de filtre.
+# Les tables existantes se mettent à jour avec ``epic db ensure-indexes``.
+Index("ix_user_updated_at", user.c.updated_at)
+
+Index("ix_client_commercial_id", client.c.commercial_id)
+Index("ix_client_updated_at", client.c.updated_at)
+# Pagination par clé (fullname, id) de la liste des clients
+Index("ix_client_fullname_id", client.c.fullname, client.c.id)
+
+Index("ix_contract_client_id", contract.c.client_id)
+Index("ix_contract_updated_at", contract.c.updated_at)
+# Pagination par clé (created_at, id) de la liste des contrats
+Index("ix_contract_created_at_id", contract.c.created_at, contract.c.id)
+# Index partiel : seuls les contrats non signés sont filtrés par statut
+Index("ix_contract_unsigned", contract.c.client_id,
+      postgresql_where=contract.c.status.is_(False))
+# Reste à payer, filtré par ``contract list --min-balance``
+contract_balance = contract.c.amount - contract.c.paid_amount
+Index("ix_contract_balance", contract_balance)
+
+Index("ix_event_contract_id", event.c.contract_id)
+Index("ix_event_support_contact_id", event.c.support_contact_id)
+Index("ix_event_start_date", event.c.start_date)
+Index("ix_event_updated_at", event.c.updated_at)
+# Index partiel : évènements sans contact support, par date
+Index("ix_event_unassigned", event.c.start_date,
+      postgresql_where=event.c.support_contact_id.is_(None))
+
+# Historique d'une entité (``audit query --entity contract --id 42``)
+Index("ix_audit_log_entity", audit_log.c.entity, audit_log.c.entity_id,
+      audit_log.c.occurred_at)
+Index("ix_audit_log_occurred_at", audit_log.c.occurred_at)
+
+# Lignes à livrer d'une destination, dans l'ordre d'écriture
+Index("ix_outbox_destination_id", outbox.c.destination, outbox.c.id)
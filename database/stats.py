@@ -0,0 +1,201 @@
+"""Temps passé en base pendant une commande (``epic --stats``).
+
+Les compteurs ne sont tenus que dans le contexte où ``collect_stats`` est
+ouvert : sans ``--stats``, les points de mesure se limitent à la lecture
+d'une ContextVar. Les threads d'arrière-plan (livraison de l'outbox) ont
+leur propre contexte et ne sont pas comptés.
+"""
+import functools
+import inspect
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_current = ContextVar("epic_command_stats", default=None)
+
+# Nombre de requêtes détaillées dans le rapport
+REPORT_TOP_QUERIES = 10
+# Longueur maximale du texte d'une requête dans le rapport
+REPORT_STATEMENT_WIDTH = 90
+
+
+class CommandStats:
+    """Compteurs d'une commande : requêtes SQL, méthodes DAO, pool"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.elapsed = None
+        # texte de la requête -> [exécutions, durée, lignes]
+        self.queries = {}
+        # Classe.méthode -> [appels, durée]
+        self.dao_calls = {}
+        self.checkouts = 0
+        self.pool_wait = 0.0
+
+    def record_query(self, statement, duration, rows):
+        entry = self.queries.setdefault(statement, [0, 0.0, 0])
+        entry[0] += 1
+        entry[1] += duration
+        if rows > 0:
+            entry[2] += rows
+
+    def record_dao(self, name, duration):
+        entry = self.dao_calls.setdefault(name, [0, 0.0])
+        entry[0] += 1
+        entry[1] += duration
+
+    def stop(self):
+        self.elapsed = time.perf_counter() - self.started
+
+    def report_lines(self):
+        """Rapport lisible, une ligne par élément"""
+        elapsed = self.elapsed if self.elapsed is not None else \
+            time.perf_counter() - self.started
+        count = sum(entry[0] for entry in self.queries.values())
+        sql_time = sum(entry[1] for entry in self.queries.values())
+        rows = sum(entry[2] for entry in self.queries.values())
+
+        lines = [
+            f"Statistiques : {elapsed * 1000:.1f} ms au total",
+            f"  SQL : {count} requêtes, {sql_time * 1000:.1f} ms, "
+            f"{rows} lignes",
+            f"  Pool : {self.checkouts} connexions prises en "
+            f"{self.pool_wait * 1000:.1f} ms",
+        ]
+        if self.dao_calls:
+            lines.append("  DAO (temps inclusif) :")
+            width = max(len(name) for name in self.dao_calls)
+            for name, (calls, duration) in sorted(
+                    self.dao_calls.items(), key=lambda item: -item[1][1]):
+                lines.append(f"    {name:<{width}}  {calls:>4} appels  "
+                             f"{duration * 1000:>8.1f} ms")
+        if self.queries:
+            lines.append("  Requêtes (les plus coûteuses d'abord) :")
+            ranked = sorted(self.queries.items(),
+                            key=lambda item: -item[1][1])
+            for statement, (calls, duration, _) in \
+                    ranked[:REPORT_TOP_QUERIES]:
+                text = statement
+                if len(text) > REPORT_STATEMENT_WIDTH:
+                    text = text[:REPORT_STATEMENT_WIDTH - 1] + "…"
+                repeated = "  [répétée]" if calls > 1 else ""
+                lines.append(f"    {calls:>4} x {duration * 1000:>8.1f} ms  "
+                             f"{text}{repeated}")
+        return lines
+
+
+def current_stats():
+    """Compteurs de la commande en cours, None sans ``--stats``"""
+    return _current.get()
+
+
+@contextmanager
+def collect_stats(report=None):
+    """Compte le temps passé en base dans le bloc.
+
+    Args:
+        report (callable, optional): ``report(stats)`` appelé à la sortie
+            du bloc, même en cas d'erreur
+    """
+    stats = CommandStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+        stats.stop()
+        if report is not None:
+            report(stats)
+
+
+def record_pool_wait(duration):
+    """Temps passé à obtenir une connexion du pool, attente et ouverture
+    comprises"""
+    stats = _current.get()
+    if stats is not None:
+        stats.pool_wait += duration
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context,
+                           executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("epic_query_start", []).append(
+            time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+    stats = _current.get()
+    starts = conn.info.get("epic_query_start")
+    if stats is None or not starts:
+        return
+    duration = time.perf_counter() - starts.pop()
+    # Les paramètres sont exclus : une requête répétée (N+1) garde le même
+    # texte
+    stats.record_query(" ".join(statement.split()), duration,
+                       cursor.rowcount)
+
+
+def _checkout(dbapi_connection, connection_record, connection_proxy):
+    stats = _current.get()
+    if stats is not None:
+        stats.checkouts += 1
+
+
+def attach(engine):
+    """Branche la mesure des requêtes et des connexions sur l'engine"""
+    from sqlalchemy import event
+
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "checkout", _checkout)
+
+
+def _timed_method(name, method):
+    if inspect.isgeneratorfunction(method):
+        @functools.wraps(method)
+        def timed_generator(*args, **kwargs):
+            stats = _current.get()
+            if stats is None:
+                yield from method(*args, **kwargs)
+                return
+            # Seul le temps passé dans la DAO est compté, pas celui de
+            # l'appelant entre deux lignes
+            iterator = method(*args, **kwargs)
+            elapsed = 0.0
+            try:
+                while True:
+                    start = time.perf_counter()
+                    try:
+                        row = next(iterator)
+                    except StopIteration:
+                        return
+                    finally:
+                        elapsed += time.perf_counter() - start
+                    yield row
+            finally:
+                iterator.close()
+                stats.record_dao(name, elapsed)
+        return timed_generator
+
+    @functools.wraps(method)
+    def timed_method(*args, **kwargs):
+        stats = _current.get()
+        if stats is None:
+            return method(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            stats.record_dao(name, time.perf_counter() - start)
+    return timed_method
+
+
+def timed(cls):
+    """Décorateur de classe : mesure les appels des méthodes publiques
+    d'une DAO quand ``--stats`` est actif"""
+    for name, attr in list(vars(cls).items()):
+        if name.startswith("_") or not inspect.isfunction(attr):
+            continue
+        setattr(cls, name, _timed_method(f"{cls.__name__}.{name}", attr))
+    return cls
@@ -0,0 +1,174 @@
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_current = ContextVar("epic_unit_of_work", default=None)
+
+
+class UnitOfWork:
+    """Transaction partagée par toutes les DAO le temps d'une commande.
+
+    Tant qu'une unité de travail est ouverte, les DAO construites sur le
+    même engine réutilisent sa connexion au lieu d'en prendre une dans le
+    pool : la commande ne fait qu'un checkout et ses écritures sont
+    validées ensemble à la sortie du bloc, ou annulées en cas d'exception
+    ou d'appel à ``rollback``. La connexion n'est prise qu'à la première
+    requête. Une unité de travail ouverte dans une autre réutilise la
+    première.
+
+    Exemple::
+
+        with UnitOfWork(engine):
+            client_dao.update_client(...)
+            contract_dao.update_contract(...)
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self._connection = None
+        self._transaction = None
+        self._token = None
+        self._outer = None
+        self._rollback_only = False
+        self._on_commit = []
+
+    @property
+    def connection(self):
+        """Connexion partagée, prise dans le pool au premier usage"""
+        if self._outer is not None:
+            return self._outer.connection
+        if self._connection is None:
+            self._connection = self.engine.connect()
+            self._transaction = self._connection.begin()
+        return self._connection
+
+    def rollback(self):
+        """Annule la transaction à la sortie du bloc"""
+        if self._outer is not None:
+            self._outer.rollback()
+        self._rollback_only = True
+
+    def on_commit(self, callback):
+        """Appelle ``callback()`` une fois la transaction validée ; rien
+        n'est appelé si elle est annulée"""
+        (self._outer or self)._on_commit.append(callback)
+
+    @contextmanager
+    def savepoint(self):
+        """Point de reprise (SAVEPOINT) dans la transaction partagée.
+
+        Un échec à l'intérieur du bloc (exception, ``rollback`` ou service
+        ``@transactional`` en échec) n'annule que ce qui a été fait depuis
+        l'ouverture du bloc ; le reste de la transaction est conservé.
+        """
+        root = self._outer or self
+        nested = root.connection.begin_nested()
+        rollback_only = root._rollback_only
+        root._rollback_only = False
+        try:
+            yield self
+        except BaseException:
+            nested.rollback()
+            raise
+        else:
+            if root._rollback_only:
+                nested.rollback()
+            else:
+                nested.commit()
+        finally:
+            root._rollback_only = rollback_only
+
+    def __enter__(self):
+        active = _current.get()
+        if active is not None and active.engine is self.engine:
+            self._outer = active
+            return self
+
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._outer is not None:
+            if exc_type is not None:
+                self._outer.rollback()
+            return False
+
+        _current.reset(self._token)
+        callbacks, self._on_commit = self._on_commit, []
+        if exc_type is not None or self._rollback_only:
+            if self._connection is not None:
+                self._close(self._transaction.rollback)
+            return False
+        if self._connection is not None:
+            self._close(self._transaction.commit)
+        for callback in callbacks:
+            callback()
+        return False
+
+    def _close(self, end_transaction):
+        try:
+            end_transaction()
+        finally:
+            self._connection.close()
+            self._connection = None
+
+
+def current_connection(engine):
+    """Connexion de l'unité de travail ouverte sur ``engine``, ou None"""
+    active = _current.get()
+    if active is not None and active.engine is engine:
+        return active.connection
+    return None
+
+
+def after_commit(engine, callback):
+    """Appelle ``callback()`` après la validation de l'unité de travail
+    ouverte sur ``engine``, ou tout de suite s'il n'y en a pas"""
+    active = _current.get()
+    if active is not None and active.engine is engine:
+        active.on_commit(callback)
+    else:
+        callback()
+
+
+@contextmanager
+def connect(engine):
+    """Connexion de lecture : celle de l'unité de travail en cours, sinon
+    une connexion du pool"""
+    conn = current_connection(engine)
+    if conn is not None:
+        yield conn
+        return
+    with engine.connect() as conn:
+        yield conn
+
+
+@contextmanager
+def begin(engine):
+    """Connexion d'écriture : dans une unité de travail, la validation est
+    faite par celle-ci ; sinon une transaction est ouverte et validée à la
+    sortie du bloc"""
+    conn = current_connection(engine)
+    if conn is not None:
+        yield conn
+        return
+    with engine.begin() as conn:
+        yield conn
+
+
+def transactional(method):
+    """Exécute une méthode de service dans une unité de travail ouverte
+    sur ``self.engine``.
+
+    Les services renvoient un tuple dont le premier élément indique le
+    succès : un résultat ``(False, ...)`` annule la transaction, de même
+    qu'une exception.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with UnitOfWork(self.engine) as uow:
+            result = method(self, *args, **kwargs)
+            if isinstance(result, tuple) and result and result[0] is False:
+                uow.rollback()
+            return result
+    return wrapper
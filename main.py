@@ -1,7 +1,15 @@
-from cli.epic import epic
-from services.sentry_service import init_sentry
+import sys
 
 if __name__ == "__main__":
-    # Initialiser Sentry avant de démarrer l'application
-    init_sentry()
-    epic()
+    # Si le démon tourne, il exécute la commande : rien d'autre à charger
+    from cli.daemon_client import forward
+    exit_code = forward(sys.argv[1:])
+    if exit_code is not None:
+        sys.exit(exit_code)
+
+    from cli.epic import epic
+    from services.sentry_service import trace_command
+
+    # Sentry n'est initialisé qu'au premier événement à envoyer
+    with trace_command(sys.argv[1:]):
+        epic()
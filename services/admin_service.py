@@ -1,16 +1,14 @@
-from argon2 import PasswordHasher
-from database.database import engine
+from database.database import get_engine
 
 from database.dao.user_dao import UserDAO
 from database.dao.departement_dao import DepartementDAO
-
-
-ph = PasswordHasher()
+from services.auth_service import get_password_hasher
 
 
 class AdminService:
 
     def __init__(self):
+        engine = get_engine()
         self.departement_dao = DepartementDAO(engine)
         self.user_dao = UserDAO(engine)
 
@@ -31,7 +29,7 @@ class AdminService:
             print("Département 'gestion' introuvable. Crée-le d'abord.")
             return
 
-        hashed_password = ph.hash(password)
+        hashed_password = get_password_hasher().hash(password)
 
         user_data = {
             "username": username,
@@ -0,0 +1,47 @@
+from database.dao.audit_log_dao import AuditLogDAO
+from database.database import get_engine
+from services.sentry_service import log_exception
+
+
+class AuditService:
+    def __init__(self):
+        engine = self.engine = get_engine()
+        self.audit_log_dao = AuditLogDAO(engine)
+
+    def record(self, events):
+        """Ajoute des événements d'audit au journal local.
+
+        Returns:
+            int: nombre d'événements enregistrés
+        """
+        return self.audit_log_dao.append(events)
+
+    def iter_entries(self, limit=None, **filters):
+        """Parcourt le journal d'audit par date, sans le charger en
+        mémoire d'un bloc.
+
+        Args:
+            limit (int, optional): nombre maximal d'événements
+            **filters: entity, entity_id, since, until, actor (voir
+                AuditLogDAO.filter_criteria)
+
+        Yields:
+            Row: un événement à la fois
+
+        Raises:
+            Exception: l'erreur d'accès à la base, après journalisation
+        """
+        try:
+            yield from self.audit_log_dao.iter_entries(limit=limit,
+                                                       **filters)
+        except Exception as e:
+            log_exception(e, {
+                "action": "iter_audit_entries",
+                "filters": {k: str(v) for k, v in filters.items()}
+            })
+            raise
+
+
+def record_audit_events(events):
+    """Destination ``audit_log`` de l'outbox (voir services.outbox)"""
+    return AuditService().record(events) >= 0
@@ -1,24 +1,53 @@
 import os
 import jwt
+import time
 import click
-from argon2 import PasswordHasher
 import functools
+from contextvars import ContextVar
 from datetime import datetime, timedelta, timezone
-from database.database import engine
-from database.dao.user_dao import UserDAO
-from database.dao.departement_dao import DepartementDAO
+from config import get_env
 
-SECRET_KEY = os.getenv("JWT_SECRET_KEY")
-JWT_EXPIRE_SECONDS = os.getenv("JWT_EXPIRE_SECONDS")
-JWT_ALGORITHM = os.getenv('JWT_ALGORITHM')
+# Un jeton dont l'expiration est plus proche que cette marge (en secondes)
+# est relu et vérifié à nouveau
+AUTH_REVALIDATE_MARGIN = 60
 
-ph = PasswordHasher()
+# Contenu du jeton décodé, mémorisé pour le processus (ou la requête en
+# cours en mode shell ou démon)
+_auth_context = ContextVar("epic_auth_context", default=None)
+
+
+def clear_auth_context():
+    """Oublie l'utilisateur mémorisé : le prochain accès relit .token"""
+    _auth_context.set(None)
+
+
+def get_jwt_settings():
+    """Renvoie (clé secrète, algorithme, durée de validité en secondes)"""
+    return (get_env("JWT_SECRET_KEY"),
+            get_env("JWT_ALGORITHM"),
+            get_env("JWT_EXPIRE_SECONDS"))
+
+
+@functools.lru_cache(maxsize=None)
+def get_password_hasher():
+    """Instancie le hasheur Argon2 à la première utilisation"""
+    from argon2 import PasswordHasher
+    return PasswordHasher()
 
 
 class AuthService:
-    def __init__(self):
-        self.user_dao = UserDAO(engine)
-        self.departement_dao = DepartementDAO(engine)
+    # DAO construits au premier accès : logout n'a pas besoin de la base
+    @functools.cached_property
+    def user_dao(self):
+        from database.database import get_engine
+        from database.dao.user_dao import UserDAO
+        return UserDAO(get_engine())
+
+    @functools.cached_property
+    def departement_dao(self):
+        from database.database import get_engine
+        from database.dao.departement_dao import DepartementDAO
+        return DepartementDAO(get_engine())
 
     def login(self, session, username, password):
         """_summary_
@@ -38,10 +67,11 @@ class AuthService:
             return False, None, 'Utilisateur non trouvé'
 
         try:
-            ph.verify(result.password, password)
+            get_password_hasher().verify(result.password, password)
         except Exception:
             return False, None, "Mot de passe incorect"
 
+        secret_key, algorithm, expire_seconds = get_jwt_settings()
         dept_name = self.departement_dao.get_departement_name_by_id(
             session, result.departement_id)
 
@@ -50,17 +80,19 @@ class AuthService:
             "username": result.username,
             "departement": dept_name,
             "exp": (datetime.now(timezone.utc) +
-                    timedelta(seconds=int(JWT_EXPIRE_SECONDS)))
+                    timedelta(seconds=int(expire_seconds)))
         }
 
         try:
-            token = jwt.encode(payload, SECRET_KEY, algorithm=JWT_ALGORITHM)
+            token = jwt.encode(payload, secret_key, algorithm=algorithm)
+            clear_auth_context()
             return True, token, "Connexion réussie"
         except Exception:
             return False, None, "Erreur lors de la création du token"
 
     def logout(self):
         """deconnecte l'utilisateur en supprimant le token"""
+        clear_auth_context()
         try:
             if os.path.exists(".token"):
                 os.remove(".token")
@@ -79,11 +111,25 @@ def get_token():
 
 
 def get_current_user_info():
+    """Renvoie le contenu du jeton de l'utilisateur connecté, ou None.
+
+    Le jeton n'est lu et décodé qu'une fois : les appels suivants (décorateurs,
+    commande, services) renvoient le contenu mémorisé, jusqu'à ce que son
+    expiration soit à moins de AUTH_REVALIDATE_MARGIN secondes.
+    """
+    payload = _auth_context.get()
+    if (payload is not None and
+            payload.get("exp", 0) - time.time() > AUTH_REVALIDATE_MARGIN):
+        return payload
+
+    _auth_context.set(None)
     token = get_token()
     if not token:
         return None
+    secret_key, algorithm, _ = get_jwt_settings()
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[JWT_ALGORITHM])
+        payload = jwt.decode(token, secret_key, algorithms=[algorithm])
+        _auth_context.set(payload)
         return payload
     except jwt.ExpiredSignatureError:
         click.echo("Token expiré. Veuillez vous reconnecter.")
@@ -0,0 +1,200 @@
+"""Exécution d'un lot d'opérations métier.
+
+Chaque opération est un dictionnaire ``{"op": nom, ...champs}``. Elles
+passent par les mêmes services que les commandes interactives, dans un
+seul processus et avec l'utilisateur connecté. Les opérations sont
+regroupées en transactions de ``transaction_size`` opérations ; chacune a
+son point de reprise, une opération en échec n'annule donc pas les autres
+opérations de sa transaction.
+"""
+from datetime import datetime
+from database.database import get_engine
+from database.unit_of_work import UnitOfWork
+from services.factories import (
+    get_client_service,
+    get_contract_service,
+    get_event_service
+)
+from services.sentry_service import log_exception
+
+DEFAULT_TRANSACTION_SIZE = 100
+
+EVENT_FIELDS = ("start_date", "end_date", "attendees", "location", "notes",
+                "support_contact_id")
+
+
+def _date(value):
+    return datetime.fromisoformat(value) if value else None
+
+
+def _create_client(runner, op):
+    return runner.client_service.create_client(
+        fullname=op["fullname"],
+        contact=op.get("contact"),
+        email=op["email"],
+        phone_number=op.get("phone_number"),
+        commercial_id=runner.user["user_id"])
+
+
+def _create_contract(runner, op):
+    return runner.contract_service.create_contract(
+        title=op["title"],
+        client_id=int(op["client_id"]),
+        amount=float(op["amount"]))
+
+
+def _sign_contract(runner, op):
+    return runner.contract_service.update_contract(
+        contract_id=int(op["contract_id"]),
+        user_id=runner.user["user_id"],
+        user_departement=runner.user.get("departement", ""),
+        sign=True)
+
+
+def _record_payment(runner, op):
+    return runner.contract_service.update_contract(
+        contract_id=int(op["contract_id"]),
+        user_id=runner.user["user_id"],
+        user_departement=runner.user.get("departement", ""),
+        paid_amount=float(op["paid_amount"]))
+
+
+def _support_contact_id(op):
+    # ``support_id`` est accepté comme alias de ``support_contact_id``
+    if op.get("support_contact_id") is not None:
+        return op["support_contact_id"]
+    return op.get("support_id")
+
+
+def _create_event(runner, op):
+    support_id = _support_contact_id(op)
+    return runner.event_service.create_event(
+        contract_id=int(op["contract_id"]),
+        start_date=_date(op["start_date"]),
+        attendees=int(op["attendees"]),
+        location=op["location"],
+        notes=op.get("notes", ""),
+        support_id=int(support_id) if support_id is not None else None)
+
+
+def _update_event(runner, op):
+    op = {**op, "support_contact_id": _support_contact_id(op)}
+    update_data = {field: op[field] for field in EVENT_FIELDS
+                   if op.get(field) not in (None, "")}
+    for field in ("start_date", "end_date"):
+        if field in update_data:
+            update_data[field] = _date(update_data[field])
+    return runner.event_service.update_event(int(op["event_id"]),
+                                             **update_data)
+
+
+# Nom de l'opération -> (départements autorisés, exécution)
+OPERATIONS = {
+    "create_client": (("Commercial",), _create_client),
+    "create_contract": (("Gestion",), _create_contract),
+    "sign_contract": (("Gestion", "Commercial"), _sign_contract),
+    "record_payment": (("Gestion", "Commercial"), _record_payment),
+    "create_event": (("Gestion",), _create_event),
+    "update_event": (("Gestion", "Support"), _update_event),
+}
+
+
+class BatchRunner:
+    """Exécute des opérations pour un utilisateur connecté.
+
+    Args:
+        user (dict): utilisateur connecté (``get_current_user_info``)
+        transaction_size (int): nombre d'opérations validées ensemble
+        engine (Engine, optional): engine de la base, celui du processus
+            par défaut
+    """
+
+    def __init__(self, user, transaction_size=DEFAULT_TRANSACTION_SIZE,
+                 engine=None):
+        self.user = user
+        self.transaction_size = transaction_size
+        self.engine = engine or get_engine()
+        self.client_service = get_client_service()
+        self.contract_service = get_contract_service()
+        self.event_service = get_event_service()
+
+    def run(self, operations):
+        """Exécute les opérations transaction par transaction.
+
+        Args:
+            operations (iterable): (numéro de ligne, dictionnaire ou None
+                si la ligne est illisible)
+
+        Yields:
+            dict: résultat de chaque opération (line, op, success,
+                message), une fois sa transaction validée
+        """
+        group = []
+        for line, op in operations:
+            group.append((line, op))
+            if len(group) >= self.transaction_size:
+                yield from self._run_group(group)
+                group = []
+        if group:
+            yield from self._run_group(group)
+
+    def _run_group(self, group):
+        results = []
+        try:
+            with UnitOfWork(self.engine) as uow:
+                for line, op in group:
+                    result = self._check(line, op)
+                    if result is None:
+                        with uow.savepoint():
+                            result = self._execute(line, op)
+                            if not result["success"]:
+                                uow.rollback()
+                    results.append(result)
+        except Exception as e:
+            log_exception(e, {
+                "action": "batch_run",
+                "first_line": group[0][0]
+            })
+            return [self._result(line, op, False,
+                                 "Transaction annulée : erreur de la base")
+                    for line, op in group]
+        return results
+
+    def _check(self, line, op):
+        """Résultat en échec si l'opération ne peut pas être exécutée,
+        None sinon"""
+        if op is None:
+            return self._result(line, None, False, "Ligne illisible")
+
+        name = op.get("op")
+        if name not in OPERATIONS:
+            return self._result(line, op, False,
+                                f"Opération inconnue : {name}")
+
+        departements = OPERATIONS[name][0]
+        user_dept = self.user.get("departement", "").lower()
+        if user_dept not in [d.lower() for d in departements]:
+            return self._result(line, op, False,
+                                f"Accès refusé : reservé au(x) "
+                                f"departement(s) {departements}.")
+        return None
+
+    def _execute(self, line, op):
+        execute = OPERATIONS[op["op"]][1]
+        try:
+            success, message = execute(self, op)
+        except KeyError as e:
+            return self._result(line, op, False,
+                                f"Champ manquant : {e.args[0]}")
+        except (TypeError, ValueError) as e:
+            return self._result(line, op, False, f"Valeur invalide : {e}")
+        return self._result(line, op, success, message)
+
+    @staticmethod
+    def _result(line, op, success, message):
+        return {
+            "line": line,
+            "op": op.get("op") if op else None,
+            "success": bool(success),
+            "message": message
+        }
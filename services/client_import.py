@@ -0,0 +1,95 @@
+import csv
+import json
+import os
+
+FORMATS = ("csv", "ndjson")
+
+
+def guess_format(path):
+    """Déduit le format d'un fichier d'import de son extension"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".ndjson", ".jsonl"):
+        return "ndjson"
+    return "csv"
+
+
+def read_records(path, fmt=None):
+    """Lit un fichier CSV ou NDJSON ligne à ligne.
+
+    Args:
+        path (str): chemin du fichier
+        fmt (str, optional): "csv" ou "ndjson", déduit de l'extension
+            par défaut
+
+    Yields:
+        tuple: (numéro de ligne, dictionnaire des champs) ; le
+            dictionnaire vaut None si la ligne NDJSON est illisible
+    """
+    fmt = fmt or guess_format(path)
+    with open(path, newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            reader = csv.DictReader(f)
+            for record in reader:
+                yield reader.line_num, record
+            return
+
+        yield from parse_ndjson(f)
+
+
+def parse_ndjson(lines):
+    """Décode des lignes NDJSON, en sautant les lignes vides.
+
+    Yields:
+        tuple: (numéro de ligne, dictionnaire) ; le dictionnaire vaut None
+            si la ligne n'est pas un objet JSON
+    """
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        if not isinstance(record, dict):
+            record = None
+        yield line_number, record
+
+
+class RejectedRowsWriter:
+    """Écrit les lignes rejetées d'un import, avec leur numéro de ligne et
+    le motif du rejet. Le fichier n'est créé qu'au premier rejet."""
+
+    def __init__(self, path, fmt="csv"):
+        self.path = path
+        self.fmt = fmt
+        self.count = 0
+        self._file = None
+        self._writer = None
+
+    def write(self, line, record, message):
+        record = {key: value for key, value in (record or {}).items()
+                  if key is not None}
+        record.update({"line": line, "error": message})
+        if self._file is None:
+            self._file = open(self.path, "w", newline="", encoding="utf-8")
+            if self.fmt == "csv":
+                self._writer = csv.DictWriter(self._file,
+                                              fieldnames=list(record),
+                                              extrasaction="ignore")
+                self._writer.writeheader()
+        if self.fmt == "csv":
+            self._writer.writerow(record)
+        else:
+            self._file.write(json.dumps(record, ensure_ascii=False,
+                                        default=str) + "\n")
+        self.count += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
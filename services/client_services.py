@@ -1,15 +1,30 @@
-from database.dao.client_dao import ClientDAO
+from database.dao.client_dao import ClientDAO, IMPORT_COLUMNS
 from database.dao.user_dao import UserDAO
-from database.database import engine
+from database.dao import outcomes
+from database.database import get_engine
+from database.unit_of_work import transactional
 import services.utils as utils
+from database.dao.pagination import next_cursor
 from services.sentry_service import log_exception
+from services.auth_service import get_current_user_info
+
+# Message des lignes d'import écartées par la DAO, selon le motif
+IMPORT_REJECTIONS = {
+    outcomes.NOT_CLIENT_COMMERCIAL:
+        "Cet email est celui du client d'un autre commercial",
+    outcomes.COMMERCIAL_REQUIRED:
+        "Le commercial est obligatoire pour un nouveau client "
+        "(colonne commercial_id ou option --commercial-id)",
+}
 
 
 class ClientService:
     def __init__(self):
+        engine = self.engine = get_engine()
         self.client_dao = ClientDAO(engine)
         self.user_dao = UserDAO(engine)
 
+    @transactional
     def create_client(self,
                       fullname,
                       contact,
@@ -55,29 +70,192 @@ class ClientService:
             })
             return False, "erreur lors de la création"
 
-    def get_clients(self):
-        """retourne la liste des clients
+    def _validate_import_batch(self, batch, default_commercial_id,
+                               seen_emails, on_error):
+        """Valide un lot de lignes d'import, renvoie les lignes valides"""
+        commercial_ids = set()
+        candidates = []
+        for line, record in batch:
+            if record is None:
+                on_error(line, record, "Ligne illisible")
+                continue
+
+            row = {"line": line}
+            for name in IMPORT_COLUMNS:
+                value = record.get(name)
+                if isinstance(value, str):
+                    value = value.strip() or None
+                row[name] = value
+
+            if not row["fullname"]:
+                on_error(line, record, "Le nom du client est obligatoire")
+                continue
+            if not row["email"] or not utils.is_valid_email(row["email"]):
+                on_error(line, record, "L'email n'est pas valide")
+                continue
+            if row["email"].lower() in seen_emails:
+                on_error(line, record, "Email en double dans le fichier")
+                continue
+            if row["commercial_id"] is None:
+                row["commercial_id"] = default_commercial_id
+            # Sans commercial, la ligne ne peut que mettre à jour un client
+            # existant : la DAO rejette les nouveaux clients
+            if row["commercial_id"] is not None:
+                try:
+                    row["commercial_id"] = int(row["commercial_id"])
+                except (TypeError, ValueError):
+                    on_error(line, record,
+                             "L'ID n'est pas celui d'un commercial")
+                    continue
+                commercial_ids.add(row["commercial_id"])
+
+            seen_emails.add(row["email"].lower())
+            candidates.append((record, row))
+
+        commercials = self.user_dao.filter_by_departement(commercial_ids,
+                                                          "commercial")
+        valid = []
+        for record, row in candidates:
+            if (row["commercial_id"] is not None and
+                    row["commercial_id"] not in commercials):
+                seen_emails.discard(row["email"].lower())
+                on_error(row["line"], record,
+                         "L'ID n'est pas celui d'un commercial")
+            else:
+                valid.append(row)
+        return valid
+
+    @transactional
+    def import_clients(self, records, default_commercial_id, on_error,
+                       batch_size=1000, owner_id=None):
+        """Importe des clients depuis un flux de lignes.
+
+        Les lignes sont validées par lots (format de l'email, commercial
+        existant, email unique dans le fichier) puis fusionnées en base :
+        un client dont l'email existe déjà est mis à jour, sans changer de
+        commercial. L'import se fait en une transaction.
+
+        Args:
+            records (iterable): (numéro de ligne, dictionnaire des champs)
+            default_commercial_id (int): commercial assigné aux nouveaux
+                clients des lignes sans ``commercial_id`` ; None : ces lignes
+                ne peuvent que mettre à jour des clients existants
+            on_error (callable): ``on_error(line, record, message)`` appelé
+                pour chaque ligne rejetée
+            batch_size (int): nombre de lignes validées par lot
+            owner_id (int, optional): commercial connecté ; les lignes qui
+                mettraient à jour le client d'un autre commercial sont
+                rejetées, comme dans ``update_client``
 
         Returns:
-            tuple: (success, message)
+            tuple: (success, stats, message)
+                - success (bool): True si l'import a abouti
+                - stats (dict): lignes lues, créées, mises à jour, rejetées
+                - message (str): Message décrivant le résultat
+        """
+        stats = {"read": 0, "created": 0, "updated": 0, "rejected": 0}
+        seen_emails = set()
+
+        def reject(line, record, message):
+            stats["rejected"] += 1
+            on_error(line, record, message)
+
+        def valid_batches():
+            batch = []
+            for line, record in records:
+                stats["read"] += 1
+                batch.append((line, record))
+                if len(batch) >= batch_size:
+                    yield self._validate_import_batch(
+                        batch, default_commercial_id, seen_emails, reject)
+                    batch = []
+            if batch:
+                yield self._validate_import_batch(
+                    batch, default_commercial_id, seen_emails, reject)
+
+        try:
+            created, updated = self.client_dao.import_clients(
+                valid_batches(), owner_id=owner_id,
+                on_rejected=lambda row, reason: reject(
+                    row["line"], row, IMPORT_REJECTIONS[reason]))
+        except Exception as e:
+            log_exception(e, {
+                "action": "import_clients",
+                "read": stats["read"]
+            })
+            return False, stats, "Erreur lors de l'import, aucun client " \
+                "n'a été importé"
+
+        stats["created"], stats["updated"] = created, updated
+        return True, stats, (f"{created + updated} clients importés "
+                             f"({created} créés, {updated} mis à jour), "
+                             f"{stats['rejected']} lignes rejetées")
+
+    def _visibility(self):
+        """Filtres de lecture selon le rôle de l'utilisateur connecté : un
+        commercial ne voit que ses clients"""
+        user = get_current_user_info()
+        if user and user.get("departement", "").lower() == "commercial":
+            return {"commercial_id": user["user_id"]}
+        return {}
+
+    def get_clients(self, limit=None, after=None):
+        """retourne la liste des clients visibles par l'utilisateur
+        connecté, triée par nom
+
+        Args:
+            limit (int, optional): taille de page, None = tous les clients
+            after (str, optional): curseur de la page précédente
+
+        Returns:
+            tuple: (success, clients, message)
                 - success (bool): True si la liste à été récupérée, False sinon
+                - clients (list): clients de la page demandée
                 - message (str): Message décrivant le résultat de l'opération
 
         """
 
         try:
-            clients = self.client_dao.get_all_clients()
+            clients = self.client_dao.get_all_clients(limit=limit,
+                                                      after=after,
+                                                      **self._visibility())
             if clients:
                 return True, clients, "clients récupérés"
             else:
                 return True, [], "Aucun client trouvé"
+        except ValueError as e:
+            return False, [], str(e)
         except Exception as e:
             log_exception(e, {
                 "action": "get clients"
             })
 
-            return False, "Erreur lors de la récupération"
+            return False, [], "Erreur lors de la récupération"
+
+    def iter_clients(self):
+        """Parcourt tous les clients, triés par nom, sans les charger en
+        mémoire d'un bloc.
+
+        Yields:
+            Row: un client à la fois
+
+        Raises:
+            Exception: l'erreur d'accès à la base, après journalisation
+        """
+        try:
+            yield from self.client_dao.iter_all_clients(
+                **self._visibility())
+        except Exception as e:
+            log_exception(e, {
+                "action": "iter clients"
+            })
+            raise
+
+    def next_cursor(self, clients, limit):
+        """Curseur de la page suivante, None si la page était la dernière"""
+        return next_cursor(clients, limit, self.client_dao.SORT_KEY)
 
+    @transactional
     def update_client(self,
                       client_id,
                       user_id,
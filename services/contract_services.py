@@ -1,17 +1,22 @@
 from database.dao.contract_dao import ContractDAO
 from database.dao.client_dao import ClientDAO
 from database.dao.user_dao import UserDAO
-from database.database import engine
+from database.database import get_engine
+from database.unit_of_work import transactional
 from services.sentry_service import log_contract_signature, log_exception
+from database.dao import outcomes
 from services.auth_service import get_current_user_info
+from database.dao.pagination import next_cursor
 
 
 class ContractService:
     def __init__(self):
+        engine = self.engine = get_engine()
         self.contract_dao = ContractDAO(engine)
         self.client_dao = ClientDAO(engine)
         self.user_dao = UserDAO(engine)
 
+    @transactional
     def create_contract(self, title, client_id, amount):
         """
         Crée un nouveau contrat pour un client existant.
@@ -56,6 +61,7 @@ class ContractService:
             })
             return False, "Erreur lors de la création."
 
+    @transactional
     def update_contract(self, contract_id, user_id, user_departement,
                         sign=None, paid_amount=None):
         """
@@ -86,75 +92,29 @@ class ContractService:
                 - message (str): Message décrivant le résultat de l'opération
         """
 
-        contract = self.contract_dao.get_contract_by_id(contract_id)
-        if not contract:
-            return False, f"Contrat avec l'ID {contract_id} introuvable"
-
-        # Validation des droits pour les commerciaux
-        # Note: contract.commercial_id vient de la table client (via JOIN)
-        if user_departement.lower() == "commercial":
-            # Un commercial peut mettre à jour un contrat si:
-            # 1. Il est assigné au client du contrat, OU
-            # 2. Le client n'a pas de commercial assigné
-            if (contract.commercial_id is not None and
-                    contract.commercial_id != user_id):
-                return False, (f"Vous ne pouvez mettre à jour que les "
-                               f"contrats de vos clients. Ce contrat "
-                               f"appartient à un client assigné à un autre "
-                               f"commercial (ID: {contract.commercial_id})")
-
         update_data = {}
 
         # Gestion de la signature
         if sign:
             update_data["status"] = True
 
-            # Si le client n'a pas de commercial assigné et que l'utilisateur
-            # est commercial, on peut assigner le commercial au client lors
-            # de la signature
-            if (contract.commercial_id is None and
-                    user_departement.lower() == "commercial"):
-                # Mettre à jour le commercial du client
-                self.client_dao.update_client(
-                    contract.client_id, {"commercial_id": user_id})
-
         # Gestion du paiement
         if paid_amount is not None and paid_amount > 0:
-            if paid_amount > contract.amount:
-                return False, (f"Le montant payé ({paid_amount}€) ne doit "
-                               f"pas être supérieur au montant du contrat "
-                               f"({contract.amount}€)")
             update_data["paid_amount"] = paid_amount
 
         if not update_data:
             return False, "Aucune donnée à mettre à jour"
 
+        # Un commercial peut mettre à jour un contrat si:
+        # 1. Il est assigné au client du contrat, OU
+        # 2. Le client n'a pas de commercial assigné (il lui est alors
+        #    assigné lors de la signature)
+        owner_id = user_id if user_departement.lower() == "commercial" \
+            else None
+
         try:
-            nb = self.contract_dao.update_contract(contract_id, update_data)
-            if nb > 0:
-                # Journaliser la signature de contrat si le statut passe à
-                # True
-                if "status" in update_data and update_data["status"] is True:
-                    current_user = get_current_user_info()
-                    signed_by = (current_user.get("username", "Unknown")
-                                 if current_user else "System")
-
-                    # Récupérer les informations du client pour le contrat
-                    client = self.client_dao.get_client_by_id(
-                        contract.client_id)
-                    client_name = (client.fullname if client
-                                   else f"Client-{contract.client_id}")
-
-                    log_contract_signature(
-                        contract_id=contract_id,
-                        client_name=client_name,
-                        amount=contract.amount,
-                        signed_by=signed_by
-                    )
-
-                return True, "Le contrat a été mis à jour"
-            else:
-                return False, "Aucun contrat trouvé avec cet ID"
+            reason, contract = self.contract_dao.update_contract(
+                contract_id, update_data, owner_id=owner_id)
         except Exception as e:
             # Journaliser l'exception inattendue
             log_exception(e, {
@@ -164,12 +124,59 @@ class ContractService:
             })
             return False, "Erreur lors de la mise à jour"
 
-    def get_contract_list(self):
+        if reason == outcomes.CONTRACT_NOT_FOUND:
+            return False, f"Contrat avec l'ID {contract_id} introuvable"
+        if reason == outcomes.NOT_CLIENT_COMMERCIAL:
+            return False, (f"Vous ne pouvez mettre à jour que les "
+                           f"contrats de vos clients. Ce contrat "
+                           f"appartient à un client assigné à un autre "
+                           f"commercial (ID: {contract.commercial_id})")
+        if reason == outcomes.AMOUNT_EXCEEDS_CONTRACT:
+            return False, (f"Le montant payé ({paid_amount}€) ne doit "
+                           f"pas être supérieur au montant du contrat "
+                           f"({contract.amount}€)")
+
+        # Journaliser la signature de contrat si le statut passe à True
+        if update_data.get("status") is True:
+            current_user = get_current_user_info()
+            signed_by = (current_user.get("username", "Unknown")
+                         if current_user else "System")
+            client_name = (contract.fullname or
+                           f"Client-{contract.client_id}")
+
+            log_contract_signature(
+                contract_id=contract_id,
+                client_name=client_name,
+                amount=contract.amount,
+                signed_by=signed_by
+            )
+
+        return True, "Le contrat a été mis à jour"
+
+    def _visibility(self):
+        """Filtres de lecture selon le rôle de l'utilisateur connecté : un
+        commercial ne voit que les contrats de ses clients et ceux des
+        clients sans commercial, qu'il peut signer"""
+        user = get_current_user_info()
+        if user and user.get("departement", "").lower() == "commercial":
+            return {"owner_id": user["user_id"]}
+        return {}
+
+    def get_contract_list(self, limit=None, after=None, **filters):
         """
-        Récupère la liste complète de tous les contrats.
+        Récupère la liste des contrats, triés par date de création.
 
-        Cette méthode retourne tous les contrats présents dans la base de
-        données, peu importe leur statut (signé ou non signé).
+        Cette méthode retourne les contrats présents dans la base de
+        données, peu importe leur statut (signé ou non signé), limités à
+        ceux que l'utilisateur connecté peut voir. Avec
+        ``limit``, seule une page est renvoyée ; la suivante s'obtient en
+        passant le curseur calculé par ``next_cursor``.
+
+        Args:
+            limit (int, optional): taille de page, None = tous les contrats
+            after (str, optional): curseur de la page précédente
+            **filters: filtres appliqués par la requête, voir
+                ContractDAO.filter_criteria
 
         Returns:
             tuple: (success, contracts, message)
@@ -185,20 +192,45 @@ class ContractService:
         """
 
         try:
-            contracts = self.contract_dao.get_all_contracts()
+            filters.update(self._visibility())
+            contracts = self.contract_dao.get_all_contracts(limit=limit,
+                                                            after=after,
+                                                            **filters)
             if contracts:
                 return True, contracts, "Contrats récupérés"
             else:
                 return True, [], "Aucun contrats trouvés"
+        except ValueError as e:
+            return False, [], str(e)
         except Exception as e:
 
             log_exception(e, {
                 "action": "get_contact_list",
-                'contracts': contracts
-
             })
             return False, [], "Erreur lors de la récupération"
 
+    def iter_contract_list(self, **filters):
+        """Parcourt les contrats, triés par date de création, sans les
+        charger en mémoire d'un bloc.
+
+        Args:
+            **filters: voir ContractDAO.filter_criteria
+
+        Yields:
+            Row: un contrat à la fois
+
+        Raises:
+            Exception: l'erreur d'accès à la base, après journalisation
+        """
+        try:
+            filters.update(self._visibility())
+            yield from self.contract_dao.iter_all_contracts(**filters)
+        except Exception as e:
+            log_exception(e, {
+                "action": "iter_contract_list",
+            })
+            raise
+
     def get_contract_list_not_sign(self):
         """
         Récupère la liste des contrats non signés.
@@ -218,7 +250,8 @@ class ContractService:
             retournant un tuple d\'erreur
         """
         try:
-            contracts = self.contract_dao.get_contracts_not_sign()
+            contracts = self.contract_dao.get_contracts_not_sign(
+                **self._visibility())
             if contracts:
                 return True, contracts, "Contrats récupérés"
             else:
@@ -230,6 +263,25 @@ class ContractService:
             })
             return False, [], "Erreur lors de la récupération"
 
+    def iter_contract_list_not_sign(self):
+        """Parcourt les contrats non signés sans les charger en mémoire
+        d'un bloc.
+
+        Yields:
+            Row: un contrat à la fois
+
+        Raises:
+            Exception: l'erreur d'accès à la base, après journalisation
+        """
+        try:
+            yield from self.contract_dao.iter_contracts_not_sign(
+                **self._visibility())
+        except Exception as e:
+            log_exception(e, {
+                "action": "iter_contracts_not_sign",
+            })
+            raise
+
     def get_contract_list_not_fully_paid(self):
         """
         Récupère la liste des contrats non entièrement payés.
@@ -250,7 +302,8 @@ class ContractService:
             retournant un tuple d'erreur
         """
         try:
-            contracts = self.contract_dao.get_contracts_not_fully_paid()
+            contracts = self.contract_dao.get_contracts_not_fully_paid(
+                **self._visibility())
             if contracts:
                 return True, contracts, "Contrats récupérés"
             else:
@@ -262,3 +315,26 @@ class ContractService:
                 "action": "get_contracts_not_fully_paid",
             })
             return False, [], "Erreur lors de la récupération"
+
+    def iter_contract_list_not_fully_paid(self):
+        """Parcourt les contrats non entièrement payés sans les charger en
+        mémoire d'un bloc.
+
+        Yields:
+            Row: un contrat à la fois
+
+        Raises:
+            Exception: l'erreur d'accès à la base, après journalisation
+        """
+        try:
+            yield from self.contract_dao.iter_contracts_not_fully_paid(
+                **self._visibility())
+        except Exception as e:
+            log_exception(e, {
+                "action": "iter_contracts_not_fully_paid",
+            })
+            raise
+
+    def next_cursor(self, contracts, limit):
+        """Curseur de la page suivante, None si la page était la dernière"""
+        return next_cursor(contracts, limit, self.contract_dao.SORT_KEY)
@@ -1,13 +1,25 @@
 
-from database.dao.departement_dao import DepartementDAO
-from database.database import engine
 
-departement_dao = DepartementDAO(engine)
+def __getattr__(name):
+    # Le DAO partagé n'est construit qu'au premier accès, pour que
+    # l'import de ce module ne charge pas la couche base de données.
+    if name == "departement_dao":
+        from database.dao.departement_dao import DepartementDAO
+        from database.database import get_engine
+
+        dao = DepartementDAO(get_engine())
+        globals()["departement_dao"] = dao
+        return dao
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _get_departement_dao():
+    return globals().get("departement_dao") or __getattr__("departement_dao")
 
 
 def get_departement_choice():
     """ renvoi le nom des départements existants """
-    departements = departement_dao.get_all_departements()
+    departements = _get_departement_dao().get_all_departements()
     dept_names = [name for _, name in departements]
 
     return dept_names
@@ -22,7 +34,7 @@ def get_departement_id_by_name(dept_name):
     Returns:
         int : identifiant du département demandé
     """
-    departements = departement_dao.get_all_departements()
+    departements = _get_departement_dao().get_all_departements()
     departement_id = next(
         (id for id, name in departements if
          name.lower() == dept_name.lower()), None)
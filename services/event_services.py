@@ -1,17 +1,22 @@
 from database.dao.contract_dao import ContractDAO
 from database.dao.event_dao import EventDAO
 from database.dao.user_dao import UserDAO
-from database.database import engine
+from database.database import get_engine
+from database.unit_of_work import transactional
 from services.auth_service import get_current_user_info
-from services.sentry_service import log_exception
+from services.sentry_service import log_event_create, log_exception
+from database.dao.pagination import next_cursor
+from database.dao import outcomes
 
 
 class EventService:
     def __init__(self):
+        engine = self.engine = get_engine()
         self.contract_dao = ContractDAO(engine)
         self.event_dao = EventDAO(engine)
         self.user_dao = UserDAO(engine)
 
+    @transactional
     def create_event(self,
                      contract_id,
                      start_date,
@@ -65,21 +70,10 @@ class EventService:
             - Si support_id est None, l'événement sera créé sans assignation
             - Les erreurs sont automatiquement loggées dans Sentry
             - La validation du support_id est optionnelle (peut être None)
+            - Les validations sont faites par la requête d'insertion
+            elle-même, en un seul aller-retour avec la base
         """
 
-        if not self.contract_dao.exists(contract_id):
-            return False, "le contrat n'existe pas"
-
-        contract = self.contract_dao.get_contract_by_id(contract_id)
-        if not contract or not getattr(contract, "status", False):
-            return False, "impossible de créer un évènement :" \
-                "contrat non signé"
-
-        if support_id is not None:
-            if not self.user_dao.is_support(support_id):
-                return False, "ID du support n'est pas un" \
-                    "membre de l'équipe support"
-
         event_data = {
             "contract_id": contract_id,
             "start_date": start_date,
@@ -90,14 +84,36 @@ class EventService:
         }
 
         try:
-            self.event_dao.create_event(event_data)
-            return True, "L'évènement a été crée"
+            reason, row = self.event_dao.create_event(event_data)
+            if reason == outcomes.CREATED:
+                # Dans la transaction de la création : l'événement d'audit
+                # passe par l'outbox et n'existe que si elle est validée.
+                # Le nom du client est renvoyé par l'insertion elle-même
+                current_user = get_current_user_info()
+                log_event_create(
+                    event_id=row.id,
+                    client_name=row.fullname or f"Contrat-{contract_id}",
+                    contract_id=contract_id,
+                    created_by=(current_user.get("username", "Unknown")
+                                if current_user else "System")
+                )
         except Exception as e:
             log_exception(e, {
                 "action": "create_event"
             })
             return False, f"erreur lors de la création : {str(e)}"
 
+        if reason == outcomes.CREATED:
+            return True, "L'évènement a été crée"
+        if reason == outcomes.CONTRACT_NOT_FOUND:
+            return False, "le contrat n'existe pas"
+        if reason == outcomes.CONTRACT_NOT_SIGNED:
+            return False, "impossible de créer un évènement :" \
+                "contrat non signé"
+        return False, "ID du support n'est pas un" \
+            "membre de l'équipe support"
+
+    @transactional
     def update_event(self,
                      event_id,
                      **kwargs):
@@ -265,16 +281,86 @@ class EventService:
             })
             return False, [], f"Erreur lors de la récupération : {str(e)}"
 
-    def get_event_list(self):
+    def _visibility(self):
+        """Filtres de lecture selon le rôle de l'utilisateur connecté : le
+        support ne voit que les événements qui lui sont attribués"""
+        user = get_current_user_info()
+        if user and user.get("departement", "").lower() == "support":
+            return {"support_id": user["user_id"], "unassigned": False}
+        return {}
+
+    def _scoped(self, filters):
+        """Filtres de l'utilisateur restreints à sa vue.
+
+        Les filtres ne font que restreindre la vue : pour le support,
+        ``--unassigned`` ou le contact d'un autre support ne peuvent rien
+        renvoyer.
+
+        Returns:
+            dict: filtres à passer à la DAO, None si le résultat est vide
+        """
+        visibility = self._visibility()
+        support_id = visibility.get("support_id")
+        if support_id is not None and (
+                filters.get("unassigned") or
+                filters.get("support_id") not in (None, support_id)):
+            return None
+        return {**filters, **visibility}
+
+    def get_event_list(self, limit=None, after=None, **filters):
+        """Récupère les événements visibles par l'utilisateur connecté,
+        triés par date de début
+
+        Args:
+            limit (int, optional): taille de page, None = tous les événements
+            after (str, optional): curseur de la page précédente
+            **filters: filtres appliqués par la requête, voir
+                EventDAO.filter_criteria
+
+        Returns:
+            tuple: (success, events, message)
+        """
         try:
-            events = self.event_dao.get_all_events()
+            filters = self._scoped(filters)
+            events = None if filters is None else \
+                self.event_dao.get_all_events(limit=limit, after=after,
+                                              **filters)
             if events:
                 return True, events, "evenements récupérés"
             else:
                 return True, [], "Aucun événements trouvés"
+        except ValueError as e:
+            return False, [], str(e)
         except Exception as e:
 
             log_exception(e, {
                 "action": "get_event_list",
-                "events": events
             })
+            return False, [], "Erreur lors de la récupération"
+
+    def iter_event_list(self, **filters):
+        """Parcourt les événements, triés par date de début, sans les
+        charger en mémoire d'un bloc.
+
+        Args:
+            **filters: voir EventDAO.filter_criteria
+
+        Yields:
+            Row: un événement à la fois
+
+        Raises:
+            Exception: l'erreur d'accès à la base, après journalisation
+        """
+        try:
+            filters = self._scoped(filters)
+            if filters is not None:
+                yield from self.event_dao.iter_all_events(**filters)
+        except Exception as e:
+            log_exception(e, {
+                "action": "iter_event_list",
+            })
+            raise
+
+    def next_cursor(self, events, limit):
+        """Curseur de la page suivante, None si la page était la dernière"""
+        return next_cursor(events, limit, self.event_dao.SORT_KEY)
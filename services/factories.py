@@ -0,0 +1,36 @@
+"""Fabriques des services métier.
+
+Les modules de commandes passent par ces fonctions plutôt que d'importer
+les services directement : les services, les DAO et SQLAlchemy ne sont
+chargés que lorsqu'une commande s'exécute réellement.
+"""
+
+
+def get_auth_service():
+    from services.auth_service import AuthService
+    return AuthService()
+
+
+def get_user_service():
+    from services.user_services import UserService
+    return UserService()
+
+
+def get_client_service():
+    from services.client_services import ClientService
+    return ClientService()
+
+
+def get_contract_service():
+    from services.contract_services import ContractService
+    return ContractService()
+
+
+def get_event_service():
+    from services.event_services import EventService
+    return EventService()
+
+
+def get_audit_service():
+    from services.audit_services import AuditService
+    return AuditService()
@@ -0,0 +1,225 @@
+"""Livraison des effets de bord par boîte d'envoi (outbox).
+
+Les événements d'audit ne sont plus envoyés pendant la commande : ils sont
+écrits dans la table ``outbox``, dans la même transaction que la
+modification qui les cause. Ils n'existent donc que si elle est validée,
+et ne sont pas perdus si l'envoi échoue. Un ``OutboxDrainer`` les livre
+ensuite par lots à chaque destination (journal local, Sentry), au moins
+une fois : une ligne n'est supprimée qu'après sa livraison.
+"""
+import atexit
+import threading
+import time
+from config import get_env_int, get_env_float
+
+# Destinations des événements d'audit, une ligne d'outbox chacune
+AUDIT_DESTINATIONS = ("audit_log", "sentry")
+
+DEFAULT_BATCH_SIZE = 100
+# Attente maximale, à la sortie d'une commande, de la livraison des
+# événements qu'elle a produits ; le reste est livré plus tard
+DEFAULT_DRAIN_TIMEOUT = 2.0
+# Délai avant de réessayer une destination en échec
+DEFAULT_RETRY_INTERVAL = 30.0
+
+_drainer = None
+_drainer_lock = threading.Lock()
+
+
+class OutboxDrainer:
+    """Livre les lignes de l'outbox à leurs destinations.
+
+    Args:
+        engine (Engine): engine de la base de l'outbox
+        destinations (dict): nom -> ``deliver(payloads)``, qui renvoie False
+            ou lève une exception si la destination est injoignable
+        batch_size (int): lignes livrées par lot
+        retry_interval (float): délai avant de réessayer après un échec,
+            en secondes
+    """
+
+    def __init__(self, engine, destinations, batch_size=DEFAULT_BATCH_SIZE,
+                 retry_interval=DEFAULT_RETRY_INTERVAL):
+        from database.dao.outbox_dao import OutboxDAO
+
+        self.engine = engine
+        self.destinations = destinations
+        self.batch_size = batch_size
+        self.retry_interval = retry_interval
+        self.outbox_dao = OutboxDAO(engine)
+        self.stats = {"delivered": 0, "failed": 0}
+        self._wake = threading.Event()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self._deadline = None
+        self._stopping = False
+
+    def drain(self, deadline=None):
+        """Livre les lignes en attente, lot par lot.
+
+        Une destination en échec est laissée de côté jusqu'au prochain
+        appel ; les autres continuent d'être livrées.
+
+        Args:
+            deadline (float, optional): ``time.monotonic()`` au-delà duquel
+                aucun nouveau lot n'est commencé
+
+        Returns:
+            bool: True si toutes les destinations ont été vidées
+        """
+        complete = True
+        for name, deliver in self.destinations.items():
+            while True:
+                if deadline is not None and time.monotonic() >= deadline:
+                    return False
+                delivered = self._drain_batch(name, deliver)
+                if delivered is None:
+                    complete = False
+                    break
+                if delivered < self.batch_size:
+                    break
+        return complete
+
+    def _drain_batch(self, name, deliver):
+        """Livre un lot ; renvoie le nombre de lignes livrées, None en cas
+        d'échec"""
+        from database.unit_of_work import UnitOfWork
+
+        ids = []
+        try:
+            with UnitOfWork(self.engine):
+                rows = self.outbox_dao.claim(name, self.batch_size)
+                if not rows:
+                    return 0
+                ids = [row.id for row in rows]
+                if deliver([row.payload for row in rows]) is False:
+                    raise ConnectionError(f"{name} injoignable")
+                # Dans la même transaction : une livraison au journal local
+                # et la suppression des lignes sont validées ensemble
+                self.outbox_dao.delete(ids)
+        except Exception as e:
+            self.stats["failed"] += len(ids)
+            if ids:
+                try:
+                    self.outbox_dao.record_failure(ids, f"{name}: {e}")
+                except Exception:
+                    pass
+            return None
+        self.stats["delivered"] += len(ids)
+        return len(ids)
+
+    def wake(self):
+        """Demande au thread de livraison de vider l'outbox"""
+        with self._thread_lock:
+            if self._thread is None:
+                self._stopping = False
+                self._thread = threading.Thread(
+                    target=self._run, name="epic-outbox", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def close(self, timeout=None):
+        """Livre ce qui peut l'être en ``timeout`` secondes et arrête le
+        thread ; les lignes restantes seront livrées par une prochaine
+        commande, le démon ou ``epic outbox drain``"""
+        with self._thread_lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        if timeout is not None:
+            self._deadline = time.monotonic() + timeout
+        self._stopping = True
+        self._wake.set()
+        thread.join(timeout)
+
+    def _run(self):
+        retry = False
+        while True:
+            self._wake.wait(self.retry_interval if retry else None)
+            self._wake.clear()
+            try:
+                retry = not self.drain(self._deadline)
+            except Exception:
+                retry = True
+            if self._stopping:
+                return
+
+
+def active_audit_destinations():
+    """Destinations d'audit à alimenter : ``sentry`` seulement si un DSN
+    est configuré"""
+    from services.sentry_service import sentry_configured
+
+    if sentry_configured():
+        return AUDIT_DESTINATIONS
+    return tuple(name for name in AUDIT_DESTINATIONS if name != "sentry")
+
+
+def audit_destinations():
+    """Fonctions de livraison des événements d'audit, par destination.
+
+    ``sentry`` reste livrable sans DSN : des lignes écrites quand il était
+    configuré sont alors écartées sans bruit.
+    """
+    from services.audit_services import record_audit_events
+    from services.sentry_service import send_audit_batch
+
+    return {
+        "audit_log": record_audit_events,
+        "sentry": send_audit_batch,
+    }
+
+
+def get_outbox_drainer():
+    """Livreur de l'outbox du processus, créé au premier besoin.
+
+    Réglages : OUTBOX_BATCH_SIZE, OUTBOX_RETRY_INTERVAL et
+    OUTBOX_DRAIN_TIMEOUT, l'attente maximale à la sortie du processus.
+    """
+    global _drainer
+    with _drainer_lock:
+        if _drainer is None:
+            from database.database import get_engine
+            from services.sentry_service import init_sentry, \
+                sentry_configured
+
+            # Sentry initialisé d'abord : sa fermeture à la sortie passe
+            # après les dernières livraisons (atexit est dernier entré,
+            # premier sorti). Sans DSN, il n'est pas initialisé du tout :
+            # sa notice ne s'affiche pas au milieu de la sortie
+            if sentry_configured():
+                init_sentry()
+            _drainer = OutboxDrainer(
+                get_engine(), audit_destinations(),
+                batch_size=get_env_int("OUTBOX_BATCH_SIZE",
+                                       DEFAULT_BATCH_SIZE),
+                retry_interval=get_env_float("OUTBOX_RETRY_INTERVAL",
+                                             DEFAULT_RETRY_INTERVAL))
+            atexit.register(_drainer.close,
+                            get_env_float("OUTBOX_DRAIN_TIMEOUT",
+                                          DEFAULT_DRAIN_TIMEOUT))
+        return _drainer
+
+
+def _wake_drainer():
+    get_outbox_drainer().wake()
+
+
+def enqueue(destinations, payload):
+    """Écrit ``payload`` dans l'outbox, une ligne par destination, dans
+    l'unité de travail en cours ; le livreur est réveillé après sa
+    validation"""
+    from database.database import get_engine
+    from database.dao.outbox_dao import OutboxDAO
+    from database.unit_of_work import after_commit
+
+    engine = get_engine()
+    OutboxDAO(engine).add([{"destination": destination, "payload": payload}
+                           for destination in destinations])
+    after_commit(engine, _wake_drainer)
+
+
+def enqueue_audit(event):
+    """Écrit un événement d'audit dans l'outbox de chaque destination
+    d'audit active (voir active_audit_destinations)"""
+    enqueue(active_audit_destinations(), event)
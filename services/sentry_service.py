@@ -1,24 +1,213 @@
-import sentry_sdk
-import os
-from dotenv import load_dotenv
+import random
+import sys
+import time
+from contextlib import contextmanager
 from functools import wraps
+from config import get_env, get_env_float, get_env_bool
 
-load_dotenv()
+# Commandes en lecture seule : fréquentes et peu utiles à tracer
+READ_COMMANDS = frozenset({
+    "user list",
+    "client get-clients",
+    "contract list",
+    "contract contracts-not-sign",
+    "contract contracts-not-paid",
+    "event list",
+    "event assigned-events",
+    "db pool-stats",
+    "audit query",
+    "outbox status",
+})
+# Commandes qui durent le temps de nombreuses opérations : une trace unique
+# n'a pas de sens et resterait ouverte tout du long
+LONG_RUN_COMMANDS = frozenset({"batch", "daemon", "shell"})
+
+DEFAULT_READ_TRACES_RATE = 0.01
+DEFAULT_WRITE_TRACES_RATE = 1.0
+# Attente maximale, en secondes, de l'envoi des événements à la sortie
+DEFAULT_FLUSH_TIMEOUT = 2.0
+
+# None : pas encore initialisé ; puis True si un DSN est configuré
+_initialized = None
+
+
+def _rate(name, default):
+    return min(max(get_env_float(name, default), 0.0), 1.0)
+
+
+def make_traces_sampler(read_rate=DEFAULT_READ_TRACES_RATE,
+                        write_rate=DEFAULT_WRITE_TRACES_RATE,
+                        trace_long_runs=False):
+    """Construit le ``traces_sampler`` de Sentry.
+
+    La décision porte sur la commande tracée (``epic_command`` dans le
+    contexte d'échantillonnage, voir ``trace_command``) : les lectures au
+    taux ``read_rate``, les autres commandes au taux ``write_rate``. Les
+    commandes longues (lot, démon, shell) et tout ce qui s'exécute dans le
+    démon ne sont tracés qu'avec ``trace_long_runs``.
+
+    Args:
+        read_rate (float): taux des commandes de READ_COMMANDS
+        write_rate (float): taux des autres commandes
+        trace_long_runs (bool): trace aussi les lots et le démon
+
+    Returns:
+        callable: ``sampler(sampling_context)`` -> taux entre 0 et 1
+    """
+    def sampler(sampling_context):
+        # Une trace continuée garde la décision de son parent
+        parent_sampled = sampling_context.get("parent_sampled")
+        if parent_sampled is not None:
+            return float(parent_sampled)
+
+        command = sampling_context.get("epic_command")
+        if command is None:
+            return write_rate
+        if not trace_long_runs and (
+                sampling_context.get("epic_long_run")
+                or command.split(" ")[0] in LONG_RUN_COMMANDS):
+            return 0.0
+        if command in READ_COMMANDS:
+            return read_rate
+        return write_rate
+    return sampler
+
+
+def _traces_sampler():
+    """``traces_sampler`` configuré par l'environnement, None si les
+    traces sont désactivées"""
+    if not get_env_bool("SENTRY_TRACING", default=True):
+        return None
+    return make_traces_sampler(
+        read_rate=_rate("SENTRY_TRACES_READ_RATE", DEFAULT_READ_TRACES_RATE),
+        write_rate=_rate("SENTRY_TRACES_WRITE_RATE",
+                         DEFAULT_WRITE_TRACES_RATE),
+        trace_long_runs=get_env_bool("SENTRY_TRACE_LONG_RUNS"))
+
+
+def _flush_timeout():
+    return max(get_env_float("SENTRY_FLUSH_TIMEOUT", DEFAULT_FLUSH_TIMEOUT),
+               0.0)
+
+
+def sentry_configured():
+    """Vrai si SENTRY_DSN est renseigné ; ne charge pas le SDK"""
+    return bool(get_env("SENTRY_DSN"))
 
 
 def init_sentry():
-    """Initialise Sentry pour la journalisation des erreurs et événements"""
-    sentry_dsn = os.getenv("SENTRY_DSN")
+    """Initialise Sentry pour la journalisation des erreurs et événements.
+
+    L'initialisation n'a lieu qu'une fois, au premier besoin (journalisation
+    ou trace échantillonnée) : une commande qui n'envoie rien n'importe pas
+    le SDK. Les erreurs sont toujours envoyées ; les traces de performance
+    suivent ``make_traces_sampler``, réglé par SENTRY_TRACES_READ_RATE,
+    SENTRY_TRACES_WRITE_RATE et SENTRY_TRACE_LONG_RUNS. SENTRY_TRACING=false
+    coupe toutes les traces. À la sortie, l'envoi des événements en attente
+    est attendu au plus SENTRY_FLUSH_TIMEOUT secondes.
+
+    Returns:
+        bool: True si Sentry est configuré
+    """
+    global _initialized
+    if _initialized is not None:
+        return _initialized
 
+    sentry_dsn = get_env("SENTRY_DSN")
+    _initialized = bool(sentry_dsn)
     if sentry_dsn:
+        import sentry_sdk
+
+        options = {}
+        sampler = _traces_sampler()
+        if sampler is not None:
+            options["traces_sampler"] = sampler
+
         sentry_sdk.init(
             dsn=sentry_dsn,
-            traces_sample_rate=1.0,
-            environment=os.getenv("ENVIRONMENT", "development"),
-            release=os.getenv("RELEASE_VERSION", "1.0.0")
+            # Les erreurs ne sont jamais échantillonnées
+            sample_rate=1.0,
+            shutdown_timeout=_flush_timeout(),
+            environment=get_env("ENVIRONMENT", "development"),
+            release=get_env("RELEASE_VERSION", "1.0.0"),
+            **options
         )
     else:
-        print("SENTRY_DSN non configuré dans les variables d'environnement")
+        print("SENTRY_DSN non configuré dans les variables d'environnement",
+              file=sys.stderr)
+    return _initialized
+
+
+def _sdk():
+    """Module ``sentry_sdk``, Sentry étant initialisé au premier appel"""
+    init_sentry()
+    import sentry_sdk
+    return sentry_sdk
+
+
+def command_name(argv):
+    """Nom de la commande tracée : les deux premiers mots de ``argv`` qui
+    ne sont pas des options, par exemple ``"contract list"`` ; les options
+    globales placées avant (``--stats``) sont ignorées"""
+    words = []
+    for arg in argv:
+        if arg.startswith("-"):
+            if words:
+                break
+            continue
+        words.append(arg)
+        if len(words) == 2:
+            break
+    return " ".join(words)
+
+
+@contextmanager
+def trace_command(argv, long_run=False):
+    """Trace Sentry d'une commande du CLI.
+
+    Sans DSN, ou si la commande n'est pas retenue par l'échantillonnage,
+    le bloc s'exécute sans importer le SDK ; avec un DSN, une exception
+    l'initialise alors pour être envoyée. Une exception, ou une sortie avec
+    un code non nul, marque la trace en erreur.
+
+    Args:
+        argv (list): arguments de la commande, sans le nom du programme
+        long_run (bool): commande exécutée par le démon ou un lot
+    """
+    if not get_env("SENTRY_DSN"):
+        yield
+        return
+
+    # Décision prise avant d'importer le SDK : une commande non tracée ne
+    # paie pas l'initialisation de Sentry
+    name = command_name(argv) or "epic"
+    sampler = _traces_sampler()
+    rate = sampler({"epic_command": name,
+                    "epic_long_run": long_run}) if sampler else 0.0
+    if rate <= 0 or random.random() >= rate:
+        try:
+            yield
+        except Exception as e:
+            # Sentry n'est pas encore initialisé : son excepthook ne
+            # verrait pas l'erreur
+            _sdk().capture_exception(e)
+            raise
+        return
+
+    sentry_sdk = _sdk()
+    with sentry_sdk.start_transaction(
+            op="cli.command", name=name, sampled=True
+    ) as transaction:
+        try:
+            yield
+        except SystemExit as e:
+            if e.code not in (None, 0):
+                transaction.set_status("internal_error")
+            raise
+        except BaseException:
+            transaction.set_status("internal_error")
+            raise
+        transaction.set_status("ok")
 
 
 def sentry_exception_handler(func_name=None):
@@ -29,6 +218,8 @@ def sentry_exception_handler(func_name=None):
             try:
                 return func(*args, **kwargs)
             except Exception as e:
+                sentry_sdk = _sdk()
+
                 # Journaliser l'exception avec le contexte
                 sentry_sdk.set_tag("event_type", "unexpected_exception")
                 sentry_sdk.set_context("function_details", {
@@ -44,80 +235,146 @@ def sentry_exception_handler(func_name=None):
     return decorator
 
 
-def log_user_creation(user_id, username, departement, created_by):
-    """Journalise la création d'un utilisateur"""
-    sentry_sdk.set_tag("event_type", "user_creation")
-    sentry_sdk.set_tag("action", "create_user")
-    sentry_sdk.set_context("user_details", {
-        "user_id": user_id,
-        "username": username,
-        "departement": departement,
-        "created_by": created_by
+def _attribute(value):
+    """Attribut d'un log Sentry : valeur et type"""
+    if isinstance(value, bool):
+        return {"value": value, "type": "boolean"}
+    if isinstance(value, int):
+        return {"value": value, "type": "integer"}
+    if isinstance(value, float):
+        return {"value": value, "type": "double"}
+    if isinstance(value, (list, tuple)):
+        value = ", ".join(str(v) for v in value)
+    return {"value": str(value), "type": "string"}
+
+
+def send_audit_batch(events):
+    """Envoie un lot d'événements d'audit à Sentry, en une seule
+    enveloppe de logs.
+
+    Les événements apparaissent dans les Logs de Sentry, un log ``info``
+    par événement avec ses champs en attributs ``epic.*`` ; ils ne créent
+    plus d'Issue comme ``capture_message``.
+
+    Sans DSN configuré, les événements sont ignorés sans initialiser
+    Sentry, comme le faisait ``capture_message`` sans client.
+
+    Returns:
+        bool: False si Sentry ne peut pas recevoir le lot (transport
+        absent, saturé ou limité par le serveur)
+    """
+    if not sentry_configured():
+        return True
+    init_sentry()
+
+    import sentry_sdk
+    from sentry_sdk.envelope import Envelope, Item, PayloadRef
+
+    transport = sentry_sdk.get_client().transport
+    if transport is None or not transport.is_healthy():
+        return False
+
+    items = []
+    for event in events:
+        attributes = {f"epic.{key}": value
+                      for key, value in event["details"].items()
+                      if value is not None}
+        attributes["epic.event_type"] = event["event_type"]
+        attributes["epic.action"] = event["action"]
+        items.append({
+            "timestamp": event["timestamp"],
+            "level": "info",
+            "body": event["message"],
+            "attributes": {key: _attribute(value)
+                           for key, value in attributes.items()}
+        })
+
+    envelope = Envelope()
+    envelope.add_item(Item(
+        type="log",
+        content_type="application/vnd.sentry.items.log+json",
+        headers={"item_count": len(items)},
+        payload=PayloadRef(json={"items": items})))
+    transport.capture_envelope(envelope)
+    return True
+
+
+def _audit(event_type, action, entity, entity_id, actor, message,
+           details):
+    """Écrit un événement métier dans l'outbox, dans la transaction en
+    cours ; il est enregistré dans le journal local et envoyé à Sentry
+    après sa validation, groupé avec les suivants"""
+    from services.outbox import enqueue_audit
+
+    enqueue_audit({
+        "timestamp": time.time(),
+        "event_type": event_type,
+        "action": action,
+        "entity": entity,
+        "entity_id": int(entity_id),
+        "actor": actor,
+        "message": message,
+        "details": details
     })
 
-    sentry_sdk.capture_message(
-        f"Création d'utilisateur: {username} (ID: {user_id}) dans le \
-            département {departement}",
-        level="info"
-    )
+
+def log_user_creation(user_id, username, departement, created_by):
+    """Journalise la création d'un utilisateur"""
+    _audit("user_creation", "create_user", "user", user_id, created_by,
+           f"Création d'utilisateur: {username} (ID: {user_id}) dans le "
+           f"département {departement}",
+           {
+               "user_id": user_id,
+               "username": username,
+               "departement": departement,
+               "created_by": created_by
+           })
 
 
 def log_user_update(user_id, username, updated_fields, updated_by):
     """Journalise la modification d'un utilisateur"""
-    sentry_sdk.set_tag("event_type", "user_update")
-    sentry_sdk.set_tag("action", "update_user")
-    sentry_sdk.set_context("user_update_details", {
-        "user_id": user_id,
-        "username": username,
-        "updated_fields": updated_fields,
-        "updated_by": updated_by
-    })
-
-    sentry_sdk.capture_message(
-        f"Modification d'utilisateur: {username} (ID: {user_id}). \
-            Champs modifiés: {', '.join(updated_fields)}",
-        level="info"
-    )
+    _audit("user_update", "update_user", "user", user_id, updated_by,
+           f"Modification d'utilisateur: {username} (ID: {user_id}). "
+           f"Champs modifiés: {', '.join(updated_fields)}",
+           {
+               "user_id": user_id,
+               "username": username,
+               "updated_fields": list(updated_fields),
+               "updated_by": updated_by
+           })
 
 
 def log_contract_signature(contract_id, client_name, amount, signed_by):
     """Journalise la signature d'un contrat"""
-    sentry_sdk.set_tag("event_type", "contract_signature")
-    sentry_sdk.set_tag("action", "sign_contract")
-    sentry_sdk.set_context("contract_details", {
-        "contract_id": contract_id,
-        "client_name": client_name,
-        "amount": amount,
-        "signed_by": signed_by
-    })
-
-    sentry_sdk.capture_message(
-        f"Signature de contrat: Contrat ID {contract_id} pour \
-            {client_name} d'un montant de {amount}€",
-        level="info"
-    )
+    _audit("contract_signature", "sign_contract", "contract", contract_id,
+           signed_by,
+           f"Signature de contrat: Contrat ID {contract_id} pour "
+           f"{client_name} d'un montant de {amount}€",
+           {
+               "contract_id": contract_id,
+               "client_name": client_name,
+               "amount": amount,
+               "signed_by": signed_by
+           })
 
 
-def log_event_create(event_id, client_name, contract_id, signed_by):
+def log_event_create(event_id, client_name, contract_id, created_by):
     """Journalise la création d'un event"""
-    sentry_sdk.set_tag("event_type", "event_creation")
-    sentry_sdk.set_tag("action", "event_create")
-    sentry_sdk.set_context("event_details", {
-        "event_id": event_id,
-        "client_name": client_name,
-        "contract_id": contract_id,
-        "signed_by": signed_by
-    })
-
-    sentry_sdk.capture_message(
-        f"Création d'un évènement: Event ID: {event_id} pour \
-            {client_name} pour le contrat {contract_id}",
-        level="info"
-    )
+    _audit("event_creation", "event_create", "event", event_id, created_by,
+           f"Création d'un évènement: Event ID: {event_id} pour "
+           f"{client_name} pour le contrat {contract_id}",
+           {
+               "event_id": event_id,
+               "client_name": client_name,
+               "contract_id": contract_id,
+               "created_by": created_by
+           })
 
 
 def log_exception(exception, context=None):
     """Journalise une exception inattendue"""
+    sentry_sdk = _sdk()
+
     sentry_sdk.set_tag("event_type", "unexpected_exception")
     if context:
         sentry_sdk.set_context("error_context", context)
@@ -1,17 +1,20 @@
-from argon2 import PasswordHasher
 from database.dao.user_dao import UserDAO
-from database.database import engine
+from database.database import get_engine
+from database.unit_of_work import transactional
 from services import utils
 from services.sentry_service import (log_user_creation,
                                      log_user_update,
                                      log_exception)
-from services.auth_service import get_current_user_info
+from services.auth_service import (get_current_user_info,
+                                   get_password_hasher)
 
 
 class UserService:
     def __init__(self):
-        self.user_dao = UserDAO(engine)
+        self.engine = get_engine()
+        self.user_dao = UserDAO(self.engine)
 
+    @transactional
     def create_user(self,
                     username,
                     employee_number,
@@ -67,8 +70,7 @@ class UserService:
             - Toutes les erreurs sont automatiquement loggées dans Sentry
         """
 
-        ph = PasswordHasher()
-        hash_password = ph.hash(password)
+        hash_password = get_password_hasher().hash(password)
 
         if not utils.is_valid_email(email):
             return False, "Email invalide"
@@ -95,7 +97,7 @@ class UserService:
 
             # Récupérer le nom du département
             from database.dao.departement_dao import DepartementDAO
-            dept_dao = DepartementDAO(engine)
+            dept_dao = DepartementDAO(self.engine)
             dept_result = dept_dao.get_departement_by_id(departement_id)
             dept_name = dept_result.name if dept_result else "Unknown"
 
@@ -116,10 +118,29 @@ class UserService:
             })
             return False, f"Erreur lors de la création : {str(e)}"
 
-    def get_users(self):
-        users = self.user_dao.get_users()
+    def get_users(self, limit=None, after=None):
+        users = self.user_dao.get_users(limit=limit, after=after)
         return users
 
+    def iter_users(self):
+        """Parcourt tous les utilisateurs, triés par nom d'utilisateur, sans
+        les charger en mémoire d'un bloc.
+
+        Yields:
+            Row: un utilisateur à la fois
+
+        Raises:
+            Exception: l'erreur d'accès à la base, après journalisation
+        """
+        try:
+            yield from self.user_dao.iter_users()
+        except Exception as e:
+            log_exception(e, {
+                "action": "iter_users"
+            })
+            raise
+
+    @transactional
     def update_user(self, user_id, **kwargs):
         """
         Met à jour un utilisateur avec les champs fournis
@@ -142,8 +163,7 @@ class UserService:
                             " un nombre entier valide"
                 elif field == "password":
                     # Hasher le mot de passe si fourni
-                    ph = PasswordHasher()
-                    value = ph.hash(value)
+                    value = get_password_hasher().hash(value)
 
                 update_data[field] = value
 
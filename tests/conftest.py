@@ -0,0 +1,62 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def reset_auth_context():
+    """Chaque test repart sans utilisateur mémorisé"""
+    from services.auth_service import clear_auth_context
+
+    clear_auth_context()
+    yield
+    clear_auth_context()
+
+
+@pytest.fixture(autouse=True)
+def audit_events(monkeypatch):
+    """Les événements d'audit des tests sont gardés en mémoire au lieu
+    d'être écrits dans l'outbox"""
+    events = []
+    monkeypatch.setattr("services.outbox.enqueue_audit", events.append)
+    return events
+
+
+@pytest.fixture
+def sqlite_engine():
+    """Base SQLite en mémoire avec tout le schéma.
+
+    StaticPool : une seule connexion, partagée aussi avec les threads
+    (livraison de l'outbox), sans quoi chaque connexion verrait une base
+    vide.
+    """
+    from sqlalchemy import create_engine
+    from sqlalchemy.pool import StaticPool
+    from database.schema import meta
+
+    test_engine = create_engine("sqlite://", poolclass=StaticPool,
+                                connect_args={"check_same_thread": False})
+    meta.create_all(test_engine)
+    yield test_engine
+    test_engine.dispose()
+
+
+@pytest.fixture
+def add_users(sqlite_engine):
+    """Ajoute des départements et des utilisateurs à ``sqlite_engine``.
+
+    ``add_users("Commercial", "Support", users=(1, 2, 1))`` crée les
+    départements dans l'ordre (ids 1, 2...) puis un utilisateur ``u<i>``
+    par id de département de ``users`` (ids 1, 2, 3...).
+    """
+    from sqlalchemy import insert
+    from database.schema import departement, user
+
+    def add(*departements, users=(1,)):
+        with sqlite_engine.begin() as conn:
+            conn.execute(insert(departement),
+                         [{"name": name} for name in departements])
+            conn.execute(insert(user), [
+                {"username": f"u{i}", "password": "x", "last_name": "l",
+                 "first_name": "f", "email": f"u{i}@test.com",
+                 "departement_id": departement_id}
+                for i, departement_id in enumerate(users)])
+    return add
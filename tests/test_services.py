@@ -1,9 +1,10 @@
 import pytest
 from unittest.mock import Mock, patch
 from services.user_services import UserService
-from services.client_services import ClientService
+from services.client_services import ClientService, IMPORT_REJECTIONS
 from services.contract_services import ContractService
 from services.event_services import EventService
+from database.dao import outcomes
 
 
 class TestUserService:
@@ -440,6 +441,96 @@ class TestClientService:
         assert success is False
         assert "commercial" in message
 
+    def test_import_clients_validates_rows(self):
+        mock_client_dao = Mock()
+        mock_user_dao = Mock()
+        mock_user_dao.filter_by_departement.return_value = {1}
+        imported = []
+
+        def mock_import_clients(batches, owner_id=None, on_rejected=None):
+            for batch in batches:
+                imported.extend(batch)
+            return len(imported), 0
+
+        mock_client_dao.import_clients.side_effect = mock_import_clients
+
+        client_service = ClientService()
+        client_service.client_dao = mock_client_dao
+        client_service.user_dao = mock_user_dao
+
+        records = [
+            (2, {"fullname": "A", "email": "a@test.com"}),
+            (3, {"fullname": "B", "email": "invalide"}),
+            (4, {"fullname": "C", "email": "A@test.com"}),
+            (5, {"fullname": "D", "email": "d@test.com",
+                 "commercial_id": "999"}),
+            (6, None),
+        ]
+        errors = []
+        success, stats, message = client_service.import_clients(
+            records, default_commercial_id=1,
+            on_error=lambda line, record, msg: errors.append((line, msg)),
+            batch_size=2
+        )
+
+        assert success is True
+        assert [row["email"] for row in imported] == ["a@test.com"]
+        assert imported[0]["commercial_id"] == 1
+        assert [line for line, _ in errors] == [3, 4, 5, 6]
+        assert stats == {"read": 5, "created": 1, "updated": 0,
+                         "rejected": 4}
+
+    def test_import_clients_without_default_commercial(self):
+        mock_client_dao = Mock()
+        mock_user_dao = Mock()
+        mock_user_dao.filter_by_departement.return_value = {2}
+        imported = []
+
+        def mock_import_clients(batches, owner_id=None, on_rejected=None):
+            for batch in batches:
+                imported.extend(batch)
+            on_rejected(imported[0], outcomes.COMMERCIAL_REQUIRED)
+            return 0, len(imported) - 1
+
+        mock_client_dao.import_clients.side_effect = mock_import_clients
+
+        client_service = ClientService()
+        client_service.client_dao = mock_client_dao
+        client_service.user_dao = mock_user_dao
+
+        # Import de la gestion : sans commercial, la ligne n'est pas rejetée
+        # d'avance, elle peut mettre à jour un client existant
+        records = [
+            (2, {"fullname": "A", "email": "a@test.com"}),
+            (3, {"fullname": "B", "email": "b@test.com",
+                 "commercial_id": "2"}),
+        ]
+        errors = []
+        success, stats, message = client_service.import_clients(
+            records, default_commercial_id=None,
+            on_error=lambda line, record, msg: errors.append((line, msg)))
+
+        assert success is True
+        assert [row["commercial_id"] for row in imported] == [None, 2]
+        assert errors == [(2, IMPORT_REJECTIONS[
+            outcomes.COMMERCIAL_REQUIRED])]
+        assert stats["rejected"] == 1
+
+    def test_import_clients_database_error(self):
+        mock_client_dao = Mock()
+        mock_client_dao.import_clients.side_effect = Exception("DB error")
+
+        client_service = ClientService()
+        client_service.client_dao = mock_client_dao
+        client_service.user_dao = Mock()
+
+        with patch("services.client_services.log_exception"):
+            success, stats, message = client_service.import_clients(
+                [], default_commercial_id=1, on_error=Mock())
+
+        assert success is False
+        assert "aucun client" in message
+
 
 class TestContractService:
     """Tests unitaires pour ContractService"""
@@ -481,6 +572,71 @@ class TestContractService:
         assert success is False
         assert "introuvable" in message
 
+    def test_update_contract_checks_owner_in_dao(self):
+        mock_contract_dao = Mock()
+        mock_contract_dao.update_contract.return_value = (
+            outcomes.NOT_CLIENT_COMMERCIAL, Mock(commercial_id=7))
+
+        contract_service = ContractService()
+        contract_service.contract_dao = mock_contract_dao
+
+        success, message = contract_service.update_contract(
+            contract_id=1, user_id=3, user_departement="Commercial",
+            sign=True)
+
+        assert success is False
+        assert "(ID: 7)" in message
+        mock_contract_dao.update_contract.assert_called_once_with(
+            1, {"status": True}, owner_id=3)
+
+    def test_update_contract_signature_is_logged(self):
+        mock_contract_dao = Mock()
+        mock_contract_dao.update_contract.return_value = (
+            outcomes.UPDATED,
+            Mock(client_id=2, fullname="Client", amount=500.0))
+
+        contract_service = ContractService()
+        contract_service.contract_dao = mock_contract_dao
+
+        with patch("services.contract_services.get_current_user_info",
+                   return_value={"username": "gest"}), \
+                patch("services.contract_services.log_contract_signature"
+                      ) as mock_log:
+            success, message = contract_service.update_contract(
+                contract_id=1, user_id=3, user_departement="Gestion",
+                sign=True, paid_amount=100.0)
+
+        assert success is True
+        mock_contract_dao.update_contract.assert_called_once_with(
+            1, {"status": True, "paid_amount": 100.0}, owner_id=None)
+        mock_log.assert_called_once_with(contract_id=1, client_name="Client",
+                                         amount=500.0, signed_by="gest")
+
+    def test_contract_list_scoped_to_commercial(self):
+        mock_contract_dao = Mock()
+        mock_contract_dao.get_all_contracts.return_value = []
+
+        contract_service = ContractService()
+        contract_service.contract_dao = mock_contract_dao
+
+        with patch("services.contract_services.get_current_user_info",
+                   return_value={"user_id": 4,
+                                 "departement": "Commercial"}):
+            contract_service.get_contract_list(min_balance=100.0)
+            contract_service.get_contract_list_not_sign()
+
+        mock_contract_dao.get_all_contracts.assert_called_once_with(
+            limit=None, after=None, min_balance=100.0, owner_id=4)
+        mock_contract_dao.get_contracts_not_sign.assert_called_once_with(
+            owner_id=4)
+
+        mock_contract_dao.reset_mock()
+        with patch("services.contract_services.get_current_user_info",
+                   return_value={"user_id": 2, "departement": "Gestion"}):
+            contract_service.get_contract_list()
+        mock_contract_dao.get_all_contracts.assert_called_once_with(
+            limit=None, after=None)
+
 
 class TestEventService:
     """Tests unitaires pour EventService"""
@@ -490,14 +646,9 @@ class TestEventService:
         mock_contract_dao = Mock()
         mock_user_dao = Mock()
 
-        # Mock contract exists et est signé
-        mock_contract_dao.exists.return_value = True
-        mock_contract = Mock()
-        mock_contract.status = True
-        mock_contract_dao.get_contract_by_id.return_value = mock_contract
-
-        # Mock support user
-        mock_user_dao.is_support.return_value = True
+        # Contrat signé et contact support valide
+        mock_event_dao.create_event.return_value = (
+            outcomes.CREATED, Mock(id=1, fullname="Acme"))
 
         event_service = EventService()
         event_service.event_dao = mock_event_dao
@@ -519,16 +670,58 @@ class TestEventService:
         assert "crée" in message
         mock_event_dao.create_event.assert_called_once()
 
+    def test_create_event_is_audited(self, audit_events):
+        from datetime import datetime
+
+        mock_event_dao = Mock()
+        mock_event_dao.create_event.return_value = (
+            outcomes.CREATED, Mock(id=7, fullname="Acme"))
+        mock_contract_dao = Mock()
+
+        event_service = EventService()
+        event_service.event_dao = mock_event_dao
+        event_service.contract_dao = mock_contract_dao
+
+        with patch("services.event_services.get_current_user_info",
+                   return_value={"username": "gestion"}):
+            success, _ = event_service.create_event(
+                contract_id=3, start_date=datetime.now(), attendees=10,
+                location="Lyon", notes="", support_id=None)
+
+        assert success is True
+        assert len(audit_events) == 1
+        event = audit_events[0]
+        assert (event["event_type"], event["entity"], event["entity_id"],
+                event["actor"]) == ("event_creation", "event", 7, "gestion")
+        assert "Acme" in event["message"]
+        # Pas de relecture du contrat après l'insertion
+        mock_contract_dao.get_contract_by_id.assert_not_called()
+
+    def test_refused_event_is_not_audited(self, audit_events):
+        from datetime import datetime
+
+        mock_event_dao = Mock()
+        mock_event_dao.create_event.return_value = (
+            outcomes.CONTRACT_NOT_SIGNED, None)
+
+        event_service = EventService()
+        event_service.event_dao = mock_event_dao
+
+        success, _ = event_service.create_event(
+            contract_id=3, start_date=datetime.now(), attendees=10,
+            location="Lyon", notes="", support_id=None)
+
+        assert success is False
+        assert audit_events == []
+
     def test_create_event_contract_not_signed(self):
         mock_event_dao = Mock()
         mock_contract_dao = Mock()
         mock_user_dao = Mock()
 
-        # Mock contract exists mais pas signé
-        mock_contract_dao.exists.return_value = True
-        mock_contract = Mock()
-        mock_contract.status = False  # Pas signé
-        mock_contract_dao.get_contract_by_id.return_value = mock_contract
+        # Contrat existant mais pas signé
+        mock_event_dao.create_event.return_value = (
+            outcomes.CONTRACT_NOT_SIGNED, None)
 
         event_service = EventService()
         event_service.event_dao = mock_event_dao
@@ -549,6 +742,69 @@ class TestEventService:
         assert success is False
         assert "non signé" in message
 
+    def test_create_event_not_support(self):
+        mock_event_dao = Mock()
+        mock_event_dao.create_event.return_value = (outcomes.NOT_SUPPORT,
+                                                    None)
+
+        event_service = EventService()
+        event_service.event_dao = mock_event_dao
+
+        from datetime import datetime
+
+        success, message = event_service.create_event(
+            contract_id=1,
+            start_date=datetime.now(),
+            attendees=50,
+            location="Paris",
+            notes="Test event",
+            support_id=2
+        )
+
+        assert success is False
+        assert "support" in message
+
+    def test_event_list_scoped_to_support(self):
+        mock_event_dao = Mock()
+        mock_event_dao.iter_all_events.return_value = iter(())
+
+        event_service = EventService()
+        event_service.event_dao = mock_event_dao
+
+        with patch("services.event_services.get_current_user_info",
+                   return_value={"user_id": 5, "departement": "Support"}):
+            list(event_service.iter_event_list(support_id=5))
+
+        mock_event_dao.iter_all_events.assert_called_once_with(
+            support_id=5, unassigned=False)
+
+    def _support_service(self):
+        event_service = EventService()
+        event_service.event_dao = Mock()
+        return event_service
+
+    def test_support_sees_no_unassigned_events(self):
+        event_service = self._support_service()
+
+        with patch("services.event_services.get_current_user_info",
+                   return_value={"user_id": 5, "departement": "Support"}):
+            assert list(event_service.iter_event_list(unassigned=True)) == []
+
+        # Les filtres ne font que restreindre la vue du support
+        event_service.event_dao.iter_all_events.assert_not_called()
+
+    def test_support_sees_no_other_support_events(self):
+        event_service = self._support_service()
+
+        with patch("services.event_services.get_current_user_info",
+                   return_value={"user_id": 5, "departement": "Support"}):
+            assert list(event_service.iter_event_list(support_id=6)) == []
+            success, events, _ = event_service.get_event_list(support_id=6)
+
+        assert success is True and events == []
+        event_service.event_dao.iter_all_events.assert_not_called()
+        event_service.event_dao.get_all_events.assert_not_called()
+
 
 class TestDepartementService:
     """Tests pour le service département"""
@@ -607,19 +863,43 @@ class TestAuthService:
 class TestSentryIntegration:
     """Tests pour l'intégration Sentry"""
 
-    def test_sentry_logging_user_creation(self, monkeypatch):
+    def test_sentry_logging_user_creation(self, audit_events):
         from services.sentry_service import log_user_creation
 
-        # Mock Sentry
-        mock_sentry_capture_message = Mock()
-        monkeypatch.setattr("sentry_sdk.capture_message",
-                            mock_sentry_capture_message)
-
         # Test log avec tous les arguments requis
         log_user_creation("1", "testuser", "Gestion", "admin")
 
-        # Vérifier que Sentry a été appelé
-        mock_sentry_capture_message.assert_called()
+        # L'événement est écrit dans l'outbox, pas envoyé pendant la
+        # commande
+        assert len(audit_events) == 1
+        event = audit_events[0]
+        assert event["event_type"] == "user_creation"
+        assert (event["entity"], event["entity_id"]) == ("user", 1)
+        assert event["actor"] == "admin"
+        assert event["details"]["username"] == "testuser"
+
+    def test_audit_batch_sent_in_one_envelope(self, monkeypatch):
+        import services.sentry_service as sentry_service
+
+        transport = Mock()
+        transport.is_healthy.return_value = True
+        monkeypatch.setattr(sentry_service, "sentry_configured", lambda: True)
+        monkeypatch.setattr(sentry_service, "init_sentry", lambda: True)
+        monkeypatch.setattr("sentry_sdk.get_client",
+                            lambda: Mock(transport=transport))
+        events = [{"timestamp": 1.0, "event_type": "contract_signature",
+                   "action": "sign_contract", "message": f"Contrat {i}",
+                   "details": {"contract_id": i, "signed_by": "gest"}}
+                  for i in range(3)]
+
+        assert sentry_service.send_audit_batch(events) is True
+        transport.capture_envelope.assert_called_once()
+        envelope = transport.capture_envelope.call_args.args[0]
+        assert [item.headers["item_count"] for item in envelope.items] \
+            == [3]
+
+        transport.is_healthy.return_value = False
+        assert sentry_service.send_audit_batch(events) is False
 
     def test_sentry_exception_handler(self, monkeypatch):
         from services.sentry_service import sentry_exception_handler
@@ -640,6 +920,79 @@ class TestSentryIntegration:
         # Vérifier que l'exception a été capturée par Sentry
         mock_sentry_capture.assert_called()
 
+    def test_traces_sampler_rates_by_command(self):
+        from services.sentry_service import make_traces_sampler
+
+        sampler = make_traces_sampler(read_rate=0.01, write_rate=1.0)
+        assert sampler({"epic_command": "contract list"}) == 0.01
+        assert sampler({"epic_command": "contract create"}) == 1.0
+        assert sampler({"epic_command": "batch run"}) == 0.0
+        assert sampler({"epic_command": "event list",
+                        "epic_long_run": True}) == 0.0
+        assert sampler({"epic_command": "event list",
+                        "parent_sampled": True}) == 1.0
+
+        sampler = make_traces_sampler(trace_long_runs=True)
+        assert sampler({"epic_command": "batch run"}) == 1.0
+
+    def test_trace_command_without_sentry(self, monkeypatch):
+        import services.sentry_service as sentry_service
+
+        monkeypatch.delenv("SENTRY_DSN", raising=False)
+        assert sentry_service.command_name(
+            ["contract", "list", "--limit", "5"]) == "contract list"
+        assert sentry_service.command_name(["--help"]) == ""
+        assert sentry_service.command_name(
+            ["--stats", "contract", "update", "3"]) == "contract update"
+        with pytest.raises(SystemExit):
+            with sentry_service.trace_command(["auth", "logout"]):
+                raise SystemExit(0)
+
+    def test_sentry_initialized_on_first_use(self, monkeypatch):
+        import services.sentry_service as sentry_service
+
+        mock_init = Mock()
+        monkeypatch.setattr("sentry_sdk.init", mock_init)
+        monkeypatch.setattr("sentry_sdk.capture_exception", Mock())
+        monkeypatch.setattr(sentry_service, "_initialized", None)
+        monkeypatch.setenv("SENTRY_DSN", "https://key@sentry.test/1")
+        monkeypatch.setenv("SENTRY_TRACES_READ_RATE", "0")
+        monkeypatch.setenv("SENTRY_FLUSH_TIMEOUT", "0.5")
+
+        # Lecture non échantillonnée : Sentry n'est pas initialisé
+        with sentry_service.trace_command(["event", "list"]):
+            pass
+        mock_init.assert_not_called()
+
+        sentry_service.log_exception(ValueError("x"))
+        sentry_service.log_exception(ValueError("y"))
+        mock_init.assert_called_once()
+        assert mock_init.call_args.kwargs["shutdown_timeout"] == 0.5
+
+    @pytest.mark.parametrize("tracing", ["true", "false"])
+    def test_unsampled_command_crash_is_captured(self, monkeypatch, tracing):
+        import services.sentry_service as sentry_service
+
+        mock_sdk = Mock()
+        monkeypatch.setattr(sentry_service, "_sdk", lambda: mock_sdk)
+        monkeypatch.setenv("SENTRY_DSN", "https://key@sentry.test/1")
+        monkeypatch.setenv("SENTRY_TRACING", tracing)
+        monkeypatch.setenv("SENTRY_TRACES_READ_RATE", "0")
+
+        error = RuntimeError("base indisponible")
+        with pytest.raises(RuntimeError):
+            with sentry_service.trace_command(["event", "list"]):
+                raise error
+        mock_sdk.capture_exception.assert_called_once_with(error)
+        mock_sdk.start_transaction.assert_not_called()
+
+        # Une sortie normale n'initialise toujours pas Sentry
+        mock_sdk.reset_mock()
+        with pytest.raises(SystemExit):
+            with sentry_service.trace_command(["event", "list"]):
+                raise SystemExit(1)
+        mock_sdk.capture_exception.assert_not_called()
+
 
 if __name__ == "__main__":
     pytest.main([__file__])
@@ -1,3 +1,4 @@
+import click
 import pytest
 from click.testing import CliRunner
 from cli.commands.auth_commands import auth
@@ -235,20 +236,21 @@ class TestClient:
             })()
         ]
 
-        def mock_get_clients(self):
-            return True, fake_clients, "Clients récupérés"
+        def mock_iter_clients(self):
+            return iter(fake_clients)
 
         # Mock authentification
         mock_authenticated_user(
             monkeypatch, {"user_id": 1, "departement": "Commercial"})
         monkeypatch.setattr(
 
-            "services.client_services.ClientService.get_clients",
+            "services.client_services.ClientService.iter_clients",
 
-            mock_get_clients)
+            mock_iter_clients)
 
         result = runner.invoke(client, ['get-clients'])
         assert "Client Test" in result.output
+        assert "John Doe(1)" in result.output
 
 
 class TestContract:
@@ -388,40 +390,40 @@ class TestContract:
             })()
         ]
 
-        def mock_get_contract_list(self):
-            return True, fake_contracts, "Contrats récupérés"
+        def mock_iter_contract_list(self):
+            return iter(fake_contracts)
 
         # Mock authentification
         mock_authenticated_user(
             monkeypatch, {"user_id": 1, "departement": "Gestion"})
         monkeypatch.setattr(
 
-            "services.contract_services.ContractService.get_contract_list",
+            "services.contract_services.ContractService.iter_contract_list",
 
-            mock_get_contract_list)
+            mock_iter_contract_list)
 
         result = runner.invoke(contract, ['list'])
         assert "Client Test" in result.output
         assert "Contrat Test" in result.output
-        assert "Contrats récupérés" in result.output
+        assert "500.00 €" in result.output
 
     def test_contract_list_empty(self, monkeypatch):
         runner = CliRunner()
 
-        def mock_get_contract_list(self):
-            return False, [], "Aucun contrat trouvé"
+        def mock_iter_contract_list(self):
+            return iter(())
 
         # Mock authentification
         mock_authenticated_user(
             monkeypatch, {"user_id": 1, "departement": "Gestion"})
         monkeypatch.setattr(
 
-            "services.contract_services.ContractService.get_contract_list",
+            "services.contract_services.ContractService.iter_contract_list",
 
-            mock_get_contract_list)
+            mock_iter_contract_list)
 
         result = runner.invoke(contract, ['list'])
-        assert "Aucun contrat trouvé" in result.output
+        assert "Aucun contrats trouvés" in result.output
 
     def test_contracts_not_sign_success(self, monkeypatch):
         runner = CliRunner()
@@ -441,36 +443,36 @@ class TestContract:
             })()
         ]
 
-        def mock_get_contract_list_not_sign(self):
-            return True, fake_contracts, "Contrats non signés récupérés"
+        def mock_iter_contract_list_not_sign(self):
+            return iter(fake_contracts)
 
         # Mock authentification
         mock_authenticated_user(
             monkeypatch, {"user_id": 1, "departement": "Commercial"})
         monkeypatch.setattr(
             "services.contract_services.ContractService."
-            "get_contract_list_not_sign",
-            mock_get_contract_list_not_sign)
+            "iter_contract_list_not_sign",
+            mock_iter_contract_list_not_sign)
 
         result = runner.invoke(contract, ['contracts-not-sign'])
         assert "Client Non Signé" in result.output
-        assert "Contrats non signés récupérés" in result.output
+        assert "Non" in result.output
 
     def test_contracts_not_sign_empty(self, monkeypatch):
         runner = CliRunner()
 
-        def mock_get_contract_list_not_sign(self):
-            return False, [], "Aucun contrat non signé"
+        def mock_iter_contract_list_not_sign(self):
+            return iter(())
 
         # Mock authentification
         mock_authenticated_user(
             monkeypatch, {"user_id": 1, "departement": "Commercial"})
         monkeypatch.setattr(
             "services.contract_services.ContractService."
-            "get_contract_list_not_sign", mock_get_contract_list_not_sign)
+            "iter_contract_list_not_sign", mock_iter_contract_list_not_sign)
 
         result = runner.invoke(contract, ['contracts-not-sign'])
-        assert "Aucun contrat non signé" in result.output
+        assert "Aucun contrats non signés trouvés" in result.output
 
     def test_contracts_not_paid_success(self, monkeypatch):
         runner = CliRunner()
@@ -490,36 +492,36 @@ class TestContract:
             })()
         ]
 
-        def mock_get_contract_list_not_fully_paid(self):
-            return (True, fake_contracts,
-                    "Contrats non entièrement payés récupérés")
+        def mock_iter_contract_list_not_fully_paid(self):
+            return iter(fake_contracts)
 
         # Mock authentification
         mock_authenticated_user(
             monkeypatch, {"user_id": 1, "departement": "Commercial"})
         monkeypatch.setattr("services.contract_services.ContractService."
-                            "get_contract_list_not_fully_paid",
-                            mock_get_contract_list_not_fully_paid)
+                            "iter_contract_list_not_fully_paid",
+                            mock_iter_contract_list_not_fully_paid)
 
         result = runner.invoke(contract, ['contracts-not-paid'])
         assert "Client Impayé" in result.output
-        assert "Contrats non entièrement payés récupérés" in result.output
+        assert "750.00 €" in result.output
 
     def test_contracts_not_paid_empty(self, monkeypatch):
         runner = CliRunner()
 
-        def mock_get_contract_list_not_fully_paid(self):
-            return False, [], "Aucun contrat impayé"
+        def mock_iter_contract_list_not_fully_paid(self):
+            return iter(())
 
         # Mock authentification
         mock_authenticated_user(
             monkeypatch, {"user_id": 1, "departement": "Commercial"})
         monkeypatch.setattr("services.contract_services.ContractService."
-                            "get_contract_list_not_fully_paid",
-                            mock_get_contract_list_not_fully_paid)
+                            "iter_contract_list_not_fully_paid",
+                            mock_iter_contract_list_not_fully_paid)
 
         result = runner.invoke(contract, ['contracts-not-paid'])
-        assert "Aucun contrat impayé" in result.output
+        assert "Tous les contrats ont étés entièrement payés" \
+            in result.output
 
     def test_contract_update_prompt_for_id(self, monkeypatch):
         runner = CliRunner()
@@ -571,17 +573,17 @@ class TestContract:
             })()
         ]
 
-        def mock_get_contract_list(self):
-            return True, fake_contracts, "Contrats récupérés"
+        def mock_iter_contract_list(self):
+            return iter(fake_contracts)
 
         # Mock authentification
         mock_authenticated_user(
             monkeypatch, {"user_id": 1, "departement": "Gestion"})
         monkeypatch.setattr(
 
-            "services.contract_services.ContractService.get_contract_list",
+            "services.contract_services.ContractService.iter_contract_list",
 
-            mock_get_contract_list)
+            mock_iter_contract_list)
 
         result = runner.invoke(contract, ['list'])
         assert "N/A" in result.output  # Devrait afficher N/A pour la date
@@ -1132,8 +1134,8 @@ class TestEventCommands:
         result = runner.invoke(event, ['assigned-events'])
 
         assert result.exit_code == 0
-        assert "Evenement ID: 1" in result.output
-        assert "Evenement ID: 2" in result.output
+        assert "|        1 | 2024-12-25 10:00:00" in result.output
+        assert "|        2 | 2024-12-26 14:00:00" in result.output
         assert "Salle A" in result.output
         assert "Salle B" in result.output
 
@@ -2688,6 +2690,7 @@ class TestContractServiceUpdate:
         non assigné lors de la signature
         """
         from services.contract_services import ContractService
+        from database.dao import outcomes
 
         # Mock contract avec client non assigné
         class MockContract:
@@ -2699,24 +2702,16 @@ class TestContractServiceUpdate:
                 self.amount = 1000.0
                 self.paid_amount = 0.0
 
-        # Mock client
-        class MockClient:
-            def __init__(self):
-                self.id = 1
-                self.fullname = "Test Client"
-
-        # Mock DAOs
-        def mock_get_contract_by_id(self, contract_id):
-            return MockContract()
-
-        def mock_get_client_by_id(self, client_id):
-            return MockClient()
-
-        def mock_update_contract(self, contract_id, update_data):
-            return 1  # 1 row affected
+        calls = []
 
-        def mock_update_client(self, client_id, update_data):
-            return 1  # 1 row affected
+        # Mock DAO : la requête d'update vérifie les droits et assigne le
+        # commercial au client
+        def mock_update_contract(self, contract_id, update_data,
+                                 owner_id=None):
+            calls.append(owner_id)
+            contract = MockContract()
+            contract.fullname = "Test Client"
+            return outcomes.UPDATED, contract
 
         # Mock Sentry logging
         def mock_log_contract_signature(*args, **kwargs):
@@ -2727,28 +2722,11 @@ class TestContractServiceUpdate:
 
         monkeypatch.setattr(
 
-
-            "database.dao.contract_dao.ContractDAO.get_contract_by_id",
-
-
-            mock_get_contract_by_id)
-        monkeypatch.setattr(
-
-            "database.dao.client_dao.ClientDAO.get_client_by_id",
-
-            mock_get_client_by_id)
-        monkeypatch.setattr(
-
             "database.dao.contract_dao.ContractDAO.update_contract",
 
             mock_update_contract)
         monkeypatch.setattr(
 
-            "database.dao.client_dao.ClientDAO.update_client",
-
-            mock_update_client)
-        monkeypatch.setattr(
-
             "services.sentry_service.log_contract_signature",
 
             mock_log_contract_signature)
@@ -2769,6 +2747,7 @@ class TestContractServiceUpdate:
 
         assert success is True
         assert message == "Le contrat a été mis à jour"
+        assert calls == [1]
 
     def test_contract_service_update_permission_denied_wrong_commercial(
             self,
@@ -2777,6 +2756,7 @@ class TestContractServiceUpdate:
         Test: refus d'accès pour un commercial qui n'est pas assigné au client
         """
         from services.contract_services import ContractService
+        from database.dao import outcomes
 
         # Mock contract avec client assigné à un autre commercial
         class MockContract:
@@ -2788,17 +2768,16 @@ class TestContractServiceUpdate:
                 self.amount = 1000.0
                 self.paid_amount = 0.0
 
-        # Mock DAOs
-        def mock_get_contract_by_id(self, contract_id):
-            return MockContract()
+        # Mock DAO : l'update est refusé par la requête
+        def mock_update_contract(self, contract_id, update_data,
+                                 owner_id=None):
+            return outcomes.NOT_CLIENT_COMMERCIAL, MockContract()
 
         monkeypatch.setattr(
 
+            "database.dao.contract_dao.ContractDAO.update_contract",
 
-            "database.dao.contract_dao.ContractDAO.get_contract_by_id",
-
-
-            mock_get_contract_by_id)
+            mock_update_contract)
 
         service = ContractService()
         success, message = service.update_contract(
@@ -2816,6 +2795,7 @@ class TestContractServiceUpdate:
     def test_contract_service_update_paid_amount_validation(self, monkeypatch):
         """Test: validation du montant payé"""
         from services.contract_services import ContractService
+        from database.dao import outcomes
 
         # Mock contract
         class MockContract:
@@ -2827,17 +2807,16 @@ class TestContractServiceUpdate:
                 self.amount = 1000.0
                 self.paid_amount = 0.0
 
-        # Mock DAOs
-        def mock_get_contract_by_id(self, contract_id):
-            return MockContract()
+        # Mock DAO : l'update est refusé par la requête
+        def mock_update_contract(self, contract_id, update_data,
+                                 owner_id=None):
+            return outcomes.AMOUNT_EXCEEDS_CONTRACT, MockContract()
 
         monkeypatch.setattr(
 
+            "database.dao.contract_dao.ContractDAO.update_contract",
 
-            "database.dao.contract_dao.ContractDAO.get_contract_by_id",
-
-
-            mock_get_contract_by_id)
+            mock_update_contract)
 
         service = ContractService()
         success, message = service.update_contract(
@@ -2850,3 +2829,1651 @@ class TestContractServiceUpdate:
 
         assert success is False
         assert "ne doit pas être supérieur au montant du contrat" in message
+
+
+class TestDatabasePool:
+    """Tests pour la configuration et l'instrumentation du pool"""
+
+    def test_pool_options_defaults(self, monkeypatch):
+        from database.pool import get_pool_options, InstrumentedQueuePool
+
+        for name in ("DB_POOL_MODE", "DB_POOL_SIZE", "DB_MAX_OVERFLOW",
+                     "DB_POOL_TIMEOUT", "DB_POOL_RECYCLE",
+                     "DB_POOL_PRE_PING"):
+            monkeypatch.delenv(name, raising=False)
+
+        options = get_pool_options()
+        assert options["poolclass"] is InstrumentedQueuePool
+        assert options["pool_size"] == 5
+        assert options["max_overflow"] == 10
+        assert options["pool_timeout"] == 30
+        assert options["pool_recycle"] == -1
+        assert options["pool_pre_ping"] is False
+
+    def test_pool_options_from_env(self, monkeypatch):
+        from database.pool import get_pool_options
+
+        monkeypatch.setenv("DB_POOL_SIZE", "2")
+        monkeypatch.setenv("DB_MAX_OVERFLOW", "0")
+        monkeypatch.setenv("DB_POOL_RECYCLE", "1800")
+        monkeypatch.setenv("DB_POOL_PRE_PING", "true")
+
+        options = get_pool_options()
+        assert options["pool_size"] == 2
+        assert options["max_overflow"] == 0
+        assert options["pool_recycle"] == 1800
+        assert options["pool_pre_ping"] is True
+
+    def test_pool_options_typed_values(self, monkeypatch):
+        from database.pool import get_pool_options
+
+        # pool_timeout est un nombre de secondes décimal pour SQLAlchemy
+        monkeypatch.setenv("DB_POOL_TIMEOUT", "0.5")
+        monkeypatch.setenv("DB_POOL_SIZE", "cinq")
+        monkeypatch.setenv("DB_POOL_PRE_PING", " ")
+
+        options = get_pool_options()
+        assert options["pool_timeout"] == 0.5
+        assert options["pool_size"] == 5
+        assert options["pool_pre_ping"] is False
+
+    def test_typed_env_helpers(self, monkeypatch):
+        from config import get_env_int, get_env_float, get_env_bool
+
+        monkeypatch.setenv("EPIC_TEST_VALUE", " 12 ")
+        assert get_env_int("EPIC_TEST_VALUE", 1) == 12
+        assert get_env_float("EPIC_TEST_VALUE", 1.0) == 12.0
+        monkeypatch.setenv("EPIC_TEST_VALUE", "Yes")
+        assert get_env_bool("EPIC_TEST_VALUE") is True
+        assert get_env_int("EPIC_TEST_VALUE", 1) == 1
+        monkeypatch.delenv("EPIC_TEST_VALUE")
+        assert get_env_bool("EPIC_TEST_VALUE", default=True) is True
+        assert get_env_float("EPIC_TEST_VALUE", 0.5) == 0.5
+
+    def test_pool_options_null_mode(self, monkeypatch):
+        from sqlalchemy.pool import NullPool
+        from database.pool import get_pool_options
+
+        monkeypatch.setenv("DB_POOL_MODE", "null")
+        monkeypatch.setenv("DB_POOL_SIZE", "20")
+
+        options = get_pool_options()
+        assert options["poolclass"] is NullPool
+        assert "pool_size" not in options
+
+    def test_pool_stats_records_waits(self):
+        from sqlalchemy import create_engine
+        from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+        from database.pool import InstrumentedQueuePool, PoolStats, pool_stats
+
+        test_engine = create_engine("sqlite://",
+                                    poolclass=InstrumentedQueuePool,
+                                    pool_size=1, max_overflow=0,
+                                    pool_timeout=0.05)
+        stats = PoolStats()
+        stats.attach(test_engine)
+        pool_stats.reset()
+
+        conn = test_engine.connect()
+        with pytest.raises(PoolTimeoutError):
+            test_engine.connect()
+        conn.close()
+
+        assert stats.snapshot()["checkouts"] == 1
+        assert stats.snapshot()["checkins"] == 1
+        assert pool_stats.snapshot()["waits"] == 1
+        assert pool_stats.snapshot()["wait_time"] > 0
+
+    def test_pool_stats_command(self):
+        from cli.commands.db_commands import db
+
+        runner = CliRunner()
+        result = runner.invoke(db, ["pool-stats"])
+        assert result.exit_code == 0
+        assert "Mode du pool" in result.output
+        assert "Checkouts" in result.output
+
+
+class TestLazyGroup:
+    """Tests pour le chargement paresseux des sous-commandes"""
+
+    def test_help_lists_commands_without_importing(self):
+        from cli.lazy_group import LazyGroup
+
+        @click.group(cls=LazyGroup, lazy_subcommands={
+            "missing": ("module.inexistant:cmd", "Aide courte")})
+        def group():
+            pass
+
+        runner = CliRunner()
+        result = runner.invoke(group, ["--help"])
+        assert result.exit_code == 0
+        assert "missing" in result.output
+        assert "Aide courte" in result.output
+
+    def test_register_loads_command_on_demand(self):
+        from cli.lazy_group import LazyGroup
+
+        @click.group(cls=LazyGroup)
+        def group():
+            pass
+
+        group.register("auth", "cli.commands.auth_commands:auth")
+        assert "auth" not in group.commands
+
+        runner = CliRunner()
+        result = runner.invoke(group, ["auth", "--help"])
+        assert result.exit_code == 0
+        assert "login" in result.output
+        assert "auth" in group.commands
+
+    def test_epic_register_command(self, monkeypatch):
+        from cli.epic import epic, register_command
+
+        monkeypatch.setattr(epic, "lazy_subcommands",
+                            dict(epic.lazy_subcommands))
+        monkeypatch.setattr(epic, "commands", dict(epic.commands))
+        register_command("plugin-db", "cli.commands.db_commands:db",
+                         "Commande de plugin")
+
+        runner = CliRunner()
+        result = runner.invoke(epic, ["--help"])
+        assert "plugin-db" in result.output
+        result = runner.invoke(epic, ["plugin-db", "--help"])
+        assert result.exit_code == 0
+        assert "pool-stats" in result.output
+
+
+class TestIndexes:
+    """Tests pour la création des index secondaires"""
+
+    def test_schema_declares_partial_indexes(self):
+        from database.schema import contract, event
+
+        indexes = {ix.name: ix for ix in contract.indexes | event.indexes}
+        assert "ix_contract_client_id" in indexes
+        assert "ix_event_support_contact_id" in indexes
+        unsigned = indexes["ix_contract_unsigned"]
+        assert unsigned.dialect_options["postgresql"]["where"] is not None
+        unassigned = indexes["ix_event_unassigned"]
+        assert unassigned.dialect_options["postgresql"]["where"] is not None
+
+    def test_ensure_indexes_creates_missing(self, sqlite_engine):
+        from sqlalchemy import text
+        from database.indexes import ensure_indexes, get_missing_indexes
+
+        test_engine = sqlite_engine
+        assert get_missing_indexes(test_engine) == []
+
+        with test_engine.begin() as conn:
+            conn.execute(text("DROP INDEX ix_event_start_date"))
+        assert [ix.name for ix in get_missing_indexes(test_engine)] == [
+            "ix_event_start_date"]
+
+        assert ensure_indexes(test_engine) == ["ix_event_start_date"]
+        assert get_missing_indexes(test_engine) == []
+
+    def test_ensure_indexes_command_dry_run(self, monkeypatch,
+                                            sqlite_engine):
+        from cli.commands.db_commands import db
+
+        monkeypatch.setattr("database.database.get_engine",
+                            lambda: sqlite_engine)
+
+        runner = CliRunner()
+        result = runner.invoke(db, ["ensure-indexes", "--dry-run"])
+        assert result.exit_code == 0
+        assert "Tous les index sont présents" in result.output
+
+    def test_ensure_indexes_on_database_without_new_tables(
+            self, monkeypatch, sqlite_engine):
+        from sqlalchemy import inspect, text
+        from cli.commands.db_commands import db
+        from database.indexes import get_missing_indexes
+
+        # Base créée avant le journal d'audit et l'outbox
+        test_engine = sqlite_engine
+        with test_engine.begin() as conn:
+            conn.execute(text("DROP TABLE audit_log"))
+            conn.execute(text("DROP TABLE outbox"))
+        assert get_missing_indexes(test_engine) == []
+        monkeypatch.setattr("database.database.get_engine",
+                            lambda: test_engine)
+
+        runner = CliRunner()
+        result = runner.invoke(db, ["ensure-indexes", "--dry-run"])
+        assert "Table manquante : audit_log" in result.output
+
+        result = runner.invoke(db, ["ensure-indexes"])
+        assert result.exit_code == 0, result.output
+        assert "Tables créées : audit_log, outbox" in result.output
+        assert "ix_audit_log_entity" in {
+            ix["name"] for ix in inspect(test_engine).get_indexes(
+                "audit_log")}
+
+
+class TestKeysetPagination:
+    """Tests pour la pagination par clé des DAO et des commandes"""
+
+    def test_cursor_roundtrip(self):
+        from datetime import datetime
+        from database.dao.pagination import encode_cursor, decode_cursor
+
+        when = datetime(2025, 6, 1, 14, 30)
+        assert decode_cursor(encode_cursor(when, 42)) == (when, 42)
+        assert decode_cursor(encode_cursor("Dupont", 7)) == ("Dupont", 7)
+        assert decode_cursor(encode_cursor(None, 3)) == (None, 3)
+
+    def test_invalid_cursor(self):
+        from database.dao.pagination import decode_cursor
+
+        with pytest.raises(ValueError):
+            decode_cursor("pas-un-curseur")
+
+    def test_event_pages_cover_all_rows(self, sqlite_engine, add_users):
+        from datetime import datetime, timedelta
+        from sqlalchemy import insert
+        from database.schema import client, contract, event
+        from database.dao.event_dao import EventDAO
+        from database.dao.pagination import next_cursor
+
+        test_engine = sqlite_engine
+        add_users("Gestion")
+        with test_engine.begin() as conn:
+            conn.execute(insert(client).values(fullname="C",
+                                               commercial_id=1))
+            conn.execute(insert(contract).values(client_id=1))
+            # Des dates en double et des dates absentes
+            conn.execute(insert(event), [
+                {"contract_id": 1,
+                 "start_date": (datetime(2025, 1, 1) +
+                                timedelta(days=i % 3)) if i % 4 else None}
+                for i in range(11)
+            ])
+
+        dao = EventDAO(test_engine)
+        expected = [row.id for row in dao.get_all_events()]
+
+        seen, after = [], None
+        while True:
+            rows = dao.get_all_events(limit=4, after=after)
+            seen.extend(row.id for row in rows)
+            after = next_cursor(rows, 4, dao.SORT_KEY)
+            if after is None:
+                break
+
+        assert seen == expected
+        assert sorted(seen) == list(range(1, 12))
+
+    def test_contract_list_prints_next_cursor(self, monkeypatch):
+        from datetime import datetime
+
+        fake_contracts = [
+            type('Contract', (), {
+                'id': i, 'fullname': 'Client', 'title': f'C{i}',
+                'created_at': datetime(2025, 1, i), 'status': True,
+                'amount': 100.0, 'paid_amount': 0.0
+            })()
+            for i in (1, 2)
+        ]
+        calls = []
+
+        def mock_get_contract_list(self, limit=None, after=None):
+            calls.append((limit, after))
+            return True, fake_contracts, "Contrats récupérés"
+
+        mock_authenticated_user(monkeypatch)
+        monkeypatch.setattr(
+            "services.contract_services.ContractService.get_contract_list",
+            mock_get_contract_list)
+
+        runner = CliRunner()
+        result = runner.invoke(contract, ['list', '--limit', '2'])
+        assert result.exit_code == 0
+        assert "Page suivante : --after" in result.output
+        assert calls == [(2, None)]
+
+    def test_contract_list_interactive_pages(self, monkeypatch):
+        from datetime import datetime
+
+        pages = [
+            [type('Contract', (), {
+                'id': i, 'fullname': 'Client', 'title': f'C{i}',
+                'created_at': datetime(2025, 1, i), 'status': False,
+                'amount': 10.0, 'paid_amount': 0.0
+            })() for i in ids]
+            for ids in ((1, 2), (3,))
+        ]
+        calls = []
+
+        def mock_get_contract_list(self, limit=None, after=None):
+            calls.append(after)
+            return True, pages[len(calls) - 1], "Contrats récupérés"
+
+        mock_authenticated_user(monkeypatch)
+        monkeypatch.setattr(
+            "services.contract_services.ContractService.get_contract_list",
+            mock_get_contract_list)
+
+        runner = CliRunner()
+        result = runner.invoke(contract, ['list', '--page', '--limit', '2'],
+                               input='y\n')
+        assert result.exit_code == 0
+        assert "C3" in result.output
+        assert calls[0] is None and calls[1] is not None
+
+
+class TestStreaming:
+    """Tests pour la lecture par lots des listes"""
+
+    def test_iter_all_events_matches_get_all_events(self, sqlite_engine,
+                                                    add_users):
+        from datetime import datetime, timedelta
+        from sqlalchemy import insert
+        from database.schema import client, contract, event as event_table
+        from database.dao.event_dao import EventDAO
+
+        test_engine = sqlite_engine
+        add_users("Gestion")
+        with test_engine.begin() as conn:
+            conn.execute(insert(client).values(fullname="C",
+                                               commercial_id=1))
+            conn.execute(insert(contract).values(client_id=1))
+            conn.execute(insert(event_table), [
+                {"contract_id": 1,
+                 "start_date": datetime(2025, 1, 1) + timedelta(days=i)}
+                for i in range(7)
+            ])
+
+        dao = EventDAO(test_engine)
+        streamed = [row.id for row in dao.iter_all_events(batch_size=2)]
+        assert streamed == [row.id for row in dao.get_all_events()]
+        assert len(streamed) == 7
+
+    def test_event_list_streams_without_pagination(self, monkeypatch):
+        fake_events = [
+            type('Event', (), {
+                'id': i, 'start_date': None, 'end_date': None,
+                'attendees': 10, 'location': f'Lieu{i}'
+            })()
+            for i in (1, 2)
+        ]
+
+        def mock_get_event_list(self, **kwargs):
+            raise AssertionError("la liste complète ne doit pas être chargée")
+
+        mock_authenticated_user(monkeypatch)
+        monkeypatch.setattr(
+            "services.event_services.EventService.iter_event_list",
+            lambda self: iter(fake_events))
+        monkeypatch.setattr(
+            "services.event_services.EventService.get_event_list",
+            mock_get_event_list)
+
+        runner = CliRunner()
+        result = runner.invoke(event, ['list'])
+        assert result.exit_code == 0
+        assert "Lieu1" in result.output and "Lieu2" in result.output
+
+    def test_event_list_empty(self, monkeypatch):
+        mock_authenticated_user(monkeypatch)
+        monkeypatch.setattr(
+            "services.event_services.EventService.iter_event_list",
+            lambda self, **filters: iter(()))
+
+        result = CliRunner().invoke(event, ['list', '--unassigned'])
+        assert result.exit_code == 0
+        assert result.output == "Aucun événement trouvé\n"
+
+    def test_event_list_stream_error(self, monkeypatch):
+        def failing_iter(self):
+            raise RuntimeError("connexion perdue")
+            yield
+
+        mock_authenticated_user(monkeypatch)
+        monkeypatch.setattr(
+            "services.event_services.EventService.iter_event_list",
+            failing_iter)
+
+        runner = CliRunner()
+        result = runner.invoke(event, ['list'])
+        assert result.exit_code == 1
+        assert "Erreur lors de la récupération" in result.output
+
+
+class TestBulkInsert:
+    """Tests pour les créations en masse des DAO"""
+
+    @pytest.fixture
+    def sqlite_engine(self, sqlite_engine, add_users):
+        add_users("Commercial")
+        return sqlite_engine
+
+    def test_create_many_returns_ids_in_order(self, sqlite_engine):
+        from database.dao.client_dao import ClientDAO
+
+        rows = [{"fullname": f"Client {i}", "email": f"c{i}@test.com",
+                 "commercial_id": 1} for i in range(5)]
+        ids, errors = ClientDAO(sqlite_engine).create_many(rows)
+
+        assert errors == []
+        assert ids == [1, 2, 3, 4, 5]
+        assert ClientDAO(sqlite_engine).get_client_by_id(3).fullname \
+            == "Client 2"
+
+    def test_create_many_reports_rejected_rows(self, sqlite_engine):
+        from database.dao.client_dao import ClientDAO
+
+        rows = [
+            {"fullname": "A", "email": "a@test.com", "commercial_id": 1},
+            {"fullname": "B", "email": "a@test.com", "commercial_id": 1},
+            # Colonnes différentes : envoyée dans un autre lot
+            {"fullname": "C", "commercial_id": 1},
+        ]
+        ids, errors = ClientDAO(sqlite_engine).create_many(rows)
+
+        assert ids[0] is not None and ids[2] is not None
+        assert ids[1] is None
+        assert [position for position, _ in errors] == [1]
+        assert len(ClientDAO(sqlite_engine).get_all_clients()) == 2
+
+
+class TestClientImport:
+    """Tests pour l'import de clients"""
+
+    def test_import_merges_on_email(self, sqlite_engine, add_users):
+        from sqlalchemy import insert, select
+        from database.schema import client as client_table
+        from database.dao.client_dao import ClientDAO
+
+        test_engine = sqlite_engine
+        add_users("Commercial")
+        with test_engine.begin() as conn:
+            conn.execute(insert(client_table).values(
+                fullname="Ancien", contact="Jo", email="a@test.com",
+                commercial_id=1))
+
+        rows = [
+            {"line": 2, "fullname": "Nouveau", "contact": None,
+             "email": "a@test.com", "phone_number": "01",
+             "commercial_id": 1},
+            {"line": 3, "fullname": "B", "contact": "Bob",
+             "email": "b@test.com", "phone_number": None,
+             "commercial_id": 1},
+        ]
+        created, updated = ClientDAO(test_engine).import_clients(
+            [rows[:1], rows[1:]])
+
+        assert (created, updated) == (1, 1)
+        with test_engine.connect() as conn:
+            clients = conn.execute(
+                select(client_table).order_by(client_table.c.id)).all()
+        assert [c.fullname for c in clients] == ["Nouveau", "B"]
+        # Un champ absent du fichier ne remplace pas la valeur existante
+        assert clients[0].contact == "Jo"
+
+    def test_import_keeps_other_commercials_clients(self, sqlite_engine,
+                                                    add_users):
+        from sqlalchemy import insert, select
+        from database.dao import outcomes
+        from database.schema import client as client_table
+        from database.dao.client_dao import ClientDAO
+
+        test_engine = sqlite_engine
+        add_users("Commercial", users=(1, 1))
+        with test_engine.begin() as conn:
+            conn.execute(insert(client_table).values(
+                fullname="Client de v", email="a@test.com", commercial_id=2))
+            conn.execute(insert(client_table).values(
+                fullname="Client de u", email="b@test.com", commercial_id=1))
+
+        # Lignes sans commercial_id : le commercial par défaut est celui
+        # qui importe
+        rows = [{"line": 2, "fullname": "Détourné", "contact": None,
+                 "email": "a@test.com", "phone_number": None,
+                 "commercial_id": 1},
+                {"line": 3, "fullname": "Renommé", "contact": None,
+                 "email": "b@test.com", "phone_number": None,
+                 "commercial_id": 1}]
+        rejected = []
+        created, updated = ClientDAO(test_engine).import_clients(
+            [rows], owner_id=1,
+            on_rejected=lambda row, reason: rejected.append(
+                (row["line"], reason)))
+
+        assert (created, updated) == (0, 1)
+        assert rejected == [(2, outcomes.NOT_CLIENT_COMMERCIAL)]
+        with test_engine.connect() as conn:
+            clients = conn.execute(
+                select(client_table.c.fullname, client_table.c.commercial_id)
+                .order_by(client_table.c.id)).all()
+        assert clients == [("Client de v", 2), ("Renommé", 1)]
+
+        # Sans restriction (Gestion), le commercial existant est conservé
+        rows[0]["fullname"] = "Mis à jour"
+        ClientDAO(test_engine).import_clients([rows[:1]])
+        with test_engine.connect() as conn:
+            assert conn.execute(
+                select(client_table.c.fullname, client_table.c.commercial_id)
+                .where(client_table.c.id == 1)).one() == ("Mis à jour", 2)
+
+    def test_import_without_commercial_only_updates(self, sqlite_engine,
+                                                    add_users):
+        from sqlalchemy import insert, select
+        from database.dao import outcomes
+        from database.schema import client as client_table
+        from database.dao.client_dao import ClientDAO
+
+        test_engine = sqlite_engine
+        add_users("Commercial")
+        with test_engine.begin() as conn:
+            conn.execute(insert(client_table).values(
+                fullname="Ancien", email="a@test.com", commercial_id=1))
+
+        # Import de la gestion sans commercial_id ni commercial par défaut
+        rows = [{"line": 2, "fullname": "Renommé", "contact": None,
+                 "email": "a@test.com", "phone_number": None,
+                 "commercial_id": None},
+                {"line": 3, "fullname": "Nouveau", "contact": None,
+                 "email": "b@test.com", "phone_number": None,
+                 "commercial_id": None}]
+        rejected = []
+        created, updated = ClientDAO(test_engine).import_clients(
+            [rows], on_rejected=lambda row, reason: rejected.append(
+                (row["line"], reason)))
+
+        assert (created, updated) == (0, 1)
+        assert rejected == [(3, outcomes.COMMERCIAL_REQUIRED)]
+        with test_engine.connect() as conn:
+            clients = conn.execute(
+                select(client_table.c.fullname, client_table.c.commercial_id)
+                .order_by(client_table.c.id)).all()
+        assert clients == [("Renommé", 1)]
+
+    def test_import_command_writes_rejected_rows(self, monkeypatch,
+                                                 tmp_path):
+        source = tmp_path / "clients.csv"
+        source.write_text("fullname,email\nA,a@test.com\nB,invalide\n")
+
+        def mock_import_clients(self, records, default_commercial_id,
+                                on_error, batch_size=1000, owner_id=None):
+            for line, record in records:
+                if "@" not in record["email"]:
+                    on_error(line, record, "L'email n'est pas valide")
+            return True, {}, "1 clients importés"
+
+        mock_authenticated_user(monkeypatch, {"user_id": 1,
+                                              "departement": "Commercial"})
+        monkeypatch.setattr(
+            "services.client_services.ClientService.import_clients",
+            mock_import_clients)
+
+        runner = CliRunner()
+        result = runner.invoke(client, ['import', str(source)])
+        assert result.exit_code == 0
+        assert "1 clients importés" in result.output
+
+        errors = (tmp_path / "clients.csv.errors.csv").read_text()
+        assert "B,invalide,3,L'email n'est pas valide" in errors
+
+    def test_import_command_default_commercial(self, monkeypatch, tmp_path):
+        source = tmp_path / "clients.csv"
+        source.write_text("fullname,email\nA,a@test.com\n")
+        calls = []
+
+        def mock_import_clients(self, records, default_commercial_id,
+                                on_error, batch_size=1000, owner_id=None):
+            calls.append((default_commercial_id, owner_id))
+            return True, {}, "Import terminé"
+
+        monkeypatch.setattr(
+            "services.client_services.ClientService.import_clients",
+            mock_import_clients)
+        runner = CliRunner()
+
+        mock_authenticated_user(monkeypatch, {"user_id": 1,
+                                              "departement": "Commercial"})
+        runner.invoke(client, ['import', str(source)])
+        # La gestion n'est pas un commercial : pas de commercial par défaut
+        mock_authenticated_user(monkeypatch, {"user_id": 5,
+                                              "departement": "Gestion"})
+        runner.invoke(client, ['import', str(source)])
+        runner.invoke(client, ['import', str(source), '--commercial-id', '2'])
+
+        assert calls == [(1, 1), (None, None), (2, None)]
+
+
+class TestRoleCache:
+    """Tests pour les vérifications de rôle et leur cache"""
+
+    @pytest.fixture
+    def sqlite_engine(self, sqlite_engine, add_users):
+        add_users("Commercial", "Support", users=(1, 2, 1, 2))
+        return sqlite_engine
+
+    @staticmethod
+    def count_queries(engine):
+        from sqlalchemy import event as sa_event
+
+        queries = []
+        sa_event.listen(engine, "before_cursor_execute",
+                        lambda *args: queries.append(args[2]))
+        return queries
+
+    def test_ttl_cache_expires_and_evicts(self):
+        from database.dao.cache import TTLCache
+
+        now = [0.0]
+        cache = TTLCache(maxsize=2, ttl=10, clock=lambda: now[0])
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+
+        now[0] = 11
+        assert cache.get("a") is None
+
+    def test_role_checks_hit_the_cache(self, sqlite_engine):
+        from database.dao.user_dao import UserDAO
+
+        queries = self.count_queries(sqlite_engine)
+        dao = UserDAO(sqlite_engine)
+
+        assert dao.is_commercial(1) is True
+        assert dao.is_support(1) is False
+        assert UserDAO(sqlite_engine).is_commercial(1) is True
+        assert len(queries) == 1
+
+        assert dao.get_roles([1, 2, 3, 99]) == {
+            1: "Commercial", 2: "Support", 3: "Commercial"}
+        assert len(queries) == 2
+
+    def test_update_departement_invalidates_cache(self, sqlite_engine):
+        from database.dao.user_dao import UserDAO
+
+        dao = UserDAO(sqlite_engine)
+        assert dao.is_commercial(1) is True
+        dao.update_user(1, {"departement_id": 2})
+        assert dao.is_support(1) is True
+
+
+class TestGuardedWrites:
+    """Tests pour les écritures validées par la requête elle-même"""
+
+    @pytest.fixture
+    def sqlite_engine(self, sqlite_engine, add_users):
+        from sqlalchemy import insert
+        from database.schema import client as client_table, \
+            contract as contract_table
+
+        test_engine = sqlite_engine
+        add_users("Commercial", "Support", users=(1, 2, 1))
+        with test_engine.begin() as conn:
+            conn.execute(insert(client_table), [
+                {"fullname": "Suivi", "commercial_id": 1},
+                {"fullname": "Libre", "commercial_id": None}])
+            conn.execute(insert(contract_table), [
+                {"client_id": 1, "status": True, "amount": 100.0},
+                {"client_id": 1, "status": False, "amount": 100.0},
+                {"client_id": 2, "status": False, "amount": 100.0}])
+        return test_engine
+
+    def test_create_event_reasons(self, sqlite_engine):
+        from database.dao import outcomes
+        from database.dao.event_dao import EventDAO
+
+        dao = EventDAO(sqlite_engine)
+
+        def create(contract_id, support_id):
+            return dao.create_event({"contract_id": contract_id,
+                                     "location": "Paris",
+                                     "support_contact_id": support_id})[0]
+
+        assert create(99, None) == outcomes.CONTRACT_NOT_FOUND
+        assert create(2, None) == outcomes.CONTRACT_NOT_SIGNED
+        assert create(1, 1) == outcomes.NOT_SUPPORT
+        assert create(1, 2) == outcomes.CREATED
+        assert create(1, None) == outcomes.CREATED
+        assert len(dao.get_all_events()) == 2
+
+        reason, row = dao.create_event({"contract_id": 1,
+                                        "location": "Lyon"})
+        assert reason == outcomes.CREATED
+        assert (row.id, row.fullname) == (3, "Suivi")
+
+    def test_update_contract_reasons(self, sqlite_engine):
+        from database.dao import outcomes
+        from database.dao.client_dao import ClientDAO
+        from database.dao.contract_dao import ContractDAO
+
+        dao = ContractDAO(sqlite_engine)
+
+        assert dao.update_contract(99, {"status": True})[0] \
+            == outcomes.CONTRACT_NOT_FOUND
+        reason, row = dao.update_contract(2, {"status": True}, owner_id=3)
+        assert reason == outcomes.NOT_CLIENT_COMMERCIAL
+        assert row.commercial_id == 1
+        assert dao.update_contract(1, {"paid_amount": 150.0})[0] \
+            == outcomes.AMOUNT_EXCEEDS_CONTRACT
+
+        reason, row = dao.update_contract(2, {"status": True,
+                                              "paid_amount": 50.0},
+                                          owner_id=1)
+        assert reason == outcomes.UPDATED
+        assert (row.fullname, row.amount) == ("Suivi", 100.0)
+
+        # Signature d'un contrat dont le client n'a pas de commercial
+        reason, row = dao.update_contract(3, {"status": True}, owner_id=3)
+        assert reason == outcomes.UPDATED
+        assert ClientDAO(sqlite_engine).get_client_by_id(2).commercial_id \
+            == 3
+
+
+class TestUnitOfWork:
+    """Tests pour la transaction partagée entre les DAO"""
+
+    @pytest.fixture
+    def sqlite_engine(self, sqlite_engine, add_users):
+        add_users("Commercial")
+        return sqlite_engine
+
+    def test_daos_share_one_connection(self, sqlite_engine):
+        from sqlalchemy import event as sa_event
+        from database.unit_of_work import UnitOfWork
+        from database.dao.client_dao import ClientDAO
+        from database.dao.user_dao import UserDAO
+
+        checkouts = []
+        sa_event.listen(sqlite_engine, "checkout",
+                        lambda *args: checkouts.append(1))
+
+        with UnitOfWork(sqlite_engine):
+            assert UserDAO(sqlite_engine).is_commercial(1)
+            ClientDAO(sqlite_engine).create_client(
+                {"fullname": "A", "commercial_id": 1})
+            ClientDAO(sqlite_engine).update_client(1, {"contact": "Jo"})
+        assert len(checkouts) == 1
+        assert ClientDAO(sqlite_engine).get_client_by_id(1).contact == "Jo"
+
+    def test_exception_rolls_back_all_writes(self, sqlite_engine):
+        from database.unit_of_work import UnitOfWork
+        from database.dao.client_dao import ClientDAO
+
+        dao = ClientDAO(sqlite_engine)
+        with pytest.raises(RuntimeError):
+            with UnitOfWork(sqlite_engine):
+                dao.create_client({"fullname": "A", "commercial_id": 1})
+                with UnitOfWork(sqlite_engine):
+                    dao.create_client({"fullname": "B", "commercial_id": 1})
+                raise RuntimeError("échec")
+        assert dao.get_all_clients() == []
+
+    def test_failed_service_result_rolls_back(self, sqlite_engine):
+        from database.unit_of_work import transactional
+        from database.dao.client_dao import ClientDAO
+
+        class Service:
+            engine = sqlite_engine
+            client_dao = ClientDAO(sqlite_engine)
+
+            @transactional
+            def create(self, fullname, ok):
+                self.client_dao.create_client({"fullname": fullname,
+                                               "commercial_id": 1})
+                return ok, "message"
+
+        Service().create("A", True)
+        Service().create("B", False)
+        assert [c.fullname for c in ClientDAO(sqlite_engine)
+                .get_all_clients()] == ["A"]
+
+    def test_savepoint_rolls_back_only_its_block(self, sqlite_engine):
+        from database.unit_of_work import UnitOfWork, transactional
+        from database.dao.client_dao import ClientDAO
+
+        class Service:
+            engine = sqlite_engine
+            client_dao = ClientDAO(sqlite_engine)
+
+            @transactional
+            def create(self, fullname, ok):
+                self.client_dao.create_client({"fullname": fullname,
+                                               "commercial_id": 1})
+                return ok, "message"
+
+        with UnitOfWork(sqlite_engine) as uow:
+            for fullname, ok in (("A", True), ("B", False), ("C", True)):
+                with uow.savepoint():
+                    Service().create(fullname, ok)
+        assert [c.fullname for c in ClientDAO(sqlite_engine)
+                .get_all_clients()] == ["A", "C"]
+
+
+class TestAuthContext:
+    """Tests pour la mémorisation de l'utilisateur connecté"""
+
+    def test_token_decoded_once(self, monkeypatch):
+        import time
+        from services import auth_service
+
+        calls = []
+
+        def mock_jwt_decode(token, key, algorithms):
+            calls.append(token)
+            return {"user_id": 1, "departement": "Gestion",
+                    "exp": time.time() + 3600}
+
+        monkeypatch.setattr("services.auth_service.get_token",
+                            lambda: "fake_token")
+        monkeypatch.setattr("services.auth_service.jwt.decode",
+                            mock_jwt_decode)
+
+        for _ in range(3):
+            assert auth_service.get_current_user_info()["user_id"] == 1
+        assert calls == ["fake_token"]
+
+        auth_service.AuthService().logout()
+        auth_service.get_current_user_info()
+        assert len(calls) == 2
+
+    def test_token_revalidated_near_expiry(self, monkeypatch):
+        import time
+        from services import auth_service
+
+        calls = []
+
+        def mock_jwt_decode(token, key, algorithms):
+            calls.append(token)
+            return {"user_id": 1, "exp": time.time() +
+                    auth_service.AUTH_REVALIDATE_MARGIN / 2}
+
+        monkeypatch.setattr("services.auth_service.get_token",
+                            lambda: "fake_token")
+        monkeypatch.setattr("services.auth_service.jwt.decode",
+                            mock_jwt_decode)
+
+        auth_service.get_current_user_info()
+        auth_service.get_current_user_info()
+        assert len(calls) == 2
+
+
+class TestShell:
+    """Tests pour le shell interactif"""
+
+    def test_complete_commands_and_options(self):
+        from cli.epic import epic
+        from cli.commands.shell_commands import complete
+
+        assert complete(epic, "cl", []) == ["client"]
+        assert "exit" in complete(epic, "", [])
+        assert complete(epic, "get", ["client"]) == ["get-clients"]
+        assert "--limit" in complete(epic, "--", ["event", "list"])
+
+    def test_shell_runs_commands_in_process(self, monkeypatch, tmp_path):
+        from cli.epic import epic
+
+        calls = []
+        monkeypatch.setenv("EPIC_HISTORY_FILE", str(tmp_path / "history"))
+        monkeypatch.setattr(
+            "services.auth_service.AuthService.logout",
+            lambda self: (calls.append("logout") or True, "Deconnexion"))
+
+        runner = CliRunner()
+        result = runner.invoke(
+            epic, ["shell", "--no-warmup"],
+            input="auth logout\nfoo\nshell\nauth logout\nexit\nauth logout\n")
+        assert result.exit_code == 0
+        assert calls == ["logout", "logout"]
+        assert "No such command 'foo'" in result.output
+        assert "déjà dans le shell" in result.output
+
+    def test_shell_survives_unexpected_errors(self, monkeypatch, tmp_path):
+        from cli.epic import epic
+
+        def logout(self):
+            raise RuntimeError("base indisponible")
+
+        logged = []
+        monkeypatch.setenv("EPIC_HISTORY_FILE", str(tmp_path / "history"))
+        monkeypatch.setattr(
+            "services.auth_service.AuthService.logout", logout)
+        monkeypatch.setattr(
+            "services.sentry_service.log_exception",
+            lambda e, context=None: logged.append((e, context)))
+
+        runner = CliRunner()
+        result = runner.invoke(
+            epic, ["shell", "--no-warmup"],
+            input="auth logout\nshell\nexit\n")
+        assert result.exit_code == 0
+        assert "Erreur : base indisponible" in result.stderr
+        assert "déjà dans le shell" in result.stdout
+        assert str(logged[0][0]) == "base indisponible"
+        assert logged[0][1]["command"] == "auth logout"
+
+
+class TestDaemonProtocol:
+    """Tests pour les trames échangées avec le démon"""
+
+    def test_frames_roundtrip(self):
+        import socket
+        from cli.daemon_client import send_frame, recv_frame
+
+        left, right = socket.socketpair()
+        with left, right:
+            send_frame(left, "o", "Évènement\n")
+            send_frame(left, "x", "0")
+            assert recv_frame(right) == ("o", "Évènement\n".encode())
+            assert recv_frame(right) == ("x", b"0")
+
+    def test_remote_prompt_asks_client(self):
+        import socket
+        import threading
+        from cli.daemon_client import send_frame, recv_frame
+        from cli.daemon_server import _remote_prompt
+
+        server, client_sock = socket.socketpair()
+
+        def answer():
+            kind, prompt = recv_frame(client_sock)
+            send_frame(client_sock, "d", f"{kind}:{prompt.decode()}")
+
+        with server, client_sock:
+            thread = threading.Thread(target=answer)
+            thread.start()
+            assert _remote_prompt(server, "p")("Password: ") \
+                == "p:Password: "
+            thread.join()
+
+    def test_forward_without_daemon(self, monkeypatch, tmp_path):
+        from cli.daemon_client import forward
+
+        monkeypatch.delenv("EPIC_NO_DAEMON", raising=False)
+        monkeypatch.setenv("EPIC_DAEMON_SOCKET", str(tmp_path / "absent"))
+        assert forward(["auth", "logout"]) is None
+        assert forward(["shell"]) is None
+
+    def test_default_socket_in_private_directory(self, monkeypatch,
+                                                 tmp_path):
+        import os
+        import stat
+        import cli.daemon_client as daemon_client
+
+        monkeypatch.delenv("EPIC_DAEMON_SOCKET", raising=False)
+        monkeypatch.delenv("XDG_RUNTIME_DIR", raising=False)
+        monkeypatch.setattr(daemon_client.tempfile, "gettempdir",
+                            lambda: str(tmp_path))
+        path = daemon_client.get_socket_path()
+        assert path == str(tmp_path / f"epic-{os.getuid()}" / "daemon.sock")
+
+        daemon_client.prepare_socket_dir(path)
+        assert stat.S_IMODE(os.stat(os.path.dirname(path)).st_mode) == 0o700
+
+        os.chmod(os.path.dirname(path), 0o755)
+        with pytest.raises(PermissionError):
+            daemon_client.prepare_socket_dir(path)
+
+    def test_connect_refuses_untrusted_socket(self, monkeypatch, tmp_path,
+                                              capsys):
+        import os
+        import socket
+        import cli.daemon_client as daemon_client
+
+        # Un fichier ordinaire à la place du socket
+        fake = tmp_path / "fake.sock"
+        fake.write_text("")
+        assert daemon_client.connect(str(fake)) is None
+
+        # Un socket d'un autre utilisateur : la commande s'exécute dans le
+        # processus courant au lieu de lui être envoyée
+        path = str(tmp_path / "epic.sock")
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+            server.bind(path)
+            server.listen(1)
+            sock = daemon_client.connect(path)
+            assert sock is not None
+            sock.close()
+
+            uid = os.getuid()
+            monkeypatch.setattr(daemon_client.os, "getuid", lambda: uid + 1)
+            assert daemon_client.connect(path) is None
+            assert daemon_client.forward(["auth", "logout"], path) is None
+        assert "n'appartient pas" in capsys.readouterr().err
+
+    def test_peer_credentials_checked(self, monkeypatch):
+        import os
+        import socket
+        import cli.daemon_client as daemon_client
+
+        if not hasattr(socket, "SO_PEERCRED"):
+            pytest.skip("SO_PEERCRED indisponible")
+        left, right = socket.socketpair()
+        with left, right:
+            assert daemon_client._peer_is_us(left)
+            uid = os.getuid()
+            monkeypatch.setattr(daemon_client.os, "getuid", lambda: uid + 1)
+            assert not daemon_client._peer_is_us(left)
+
+
+class TestOutputFormats:
+    """Tests pour les formats de sortie des listes"""
+
+    def _contracts(self):
+        from datetime import datetime
+
+        return [type('Contract', (), {
+            'id': i, 'fullname': 'Client', 'title': f'C{i}',
+            'created_at': datetime(2025, 1, i), 'status': i == 1,
+            'amount': 100.0, 'paid_amount': 40.0
+        })() for i in (1, 2)]
+
+    def test_write_records_formats(self):
+        import io
+        import json
+        from cli.output import write_records
+        from cli.commands.contract_commands import CONTRACT_COLUMNS
+
+        out = io.StringIO()
+        assert write_records(iter(self._contracts()), CONTRACT_COLUMNS,
+                             "json", out) == 2
+        records = json.loads(out.getvalue())
+        assert records[0]["created_at"] == "2025-01-01T00:00:00"
+        assert records[1]["balance"] == 60.0
+
+        out = io.StringIO()
+        write_records(iter(self._contracts()), CONTRACT_COLUMNS, "ndjson",
+                      out)
+        lines = out.getvalue().splitlines()
+        assert [json.loads(line)["title"] for line in lines] == ["C1", "C2"]
+
+        out = io.StringIO()
+        write_records(iter(self._contracts()), CONTRACT_COLUMNS, "csv", out)
+        lines = out.getvalue().splitlines()
+        assert lines[0] == ("id,client,title,created_at,status,amount,"
+                            "paid_amount,balance")
+        assert lines[2] == "2,Client,C2,2025-01-02T00:00:00,False,100.0," \
+            "40.0,60.0"
+
+    def test_write_records_empty(self):
+        import io
+        from cli.output import write_records
+        from cli.commands.contract_commands import CONTRACT_COLUMNS
+
+        for output_format, expected in (("json", "[]\n"), ("ndjson", ""),
+                                        ("csv", "id,client,title,"
+                                                "created_at,status,amount,"
+                                                "paid_amount,balance\n")):
+            out = io.StringIO()
+            write_records(iter(()), CONTRACT_COLUMNS, output_format, out)
+            assert out.getvalue() == expected
+
+    def test_list_streams_from_generator(self, monkeypatch):
+        contracts = self._contracts()
+
+        def fail(self, **kwargs):
+            raise AssertionError("la liste complète ne doit pas être lue")
+
+        mock_authenticated_user(monkeypatch)
+        monkeypatch.setattr(
+            "services.contract_services.ContractService.get_contract_list",
+            fail)
+        monkeypatch.setattr(
+            "services.contract_services.ContractService.iter_contract_list",
+            lambda self: iter(contracts))
+
+        result = CliRunner().invoke(contract, ['list', '--format', 'ndjson'])
+        assert result.exit_code == 0
+        assert len(result.stdout.splitlines()) == 2
+
+    def test_paged_list_keeps_messages_out_of_data(self, monkeypatch):
+        import json
+
+        contracts = self._contracts()
+        mock_authenticated_user(monkeypatch)
+        monkeypatch.setattr(
+            "services.contract_services.ContractService.get_contract_list",
+            lambda self, limit=None, after=None: (True, contracts, "ok"))
+
+        result = CliRunner().invoke(
+            contract, ['list', '--format', 'json', '--limit', '2'])
+        assert result.exit_code == 0
+        assert len(json.loads(result.stdout)) == 2
+        assert "Page suivante : --after" in result.stderr
+
+    def test_stream_error_goes_to_stderr(self, monkeypatch):
+        def broken(self):
+            raise RuntimeError("base indisponible")
+            yield
+
+        mock_authenticated_user(monkeypatch)
+        monkeypatch.setattr(
+            "services.client_services.ClientService.iter_clients", broken)
+
+        result = CliRunner().invoke(client, ['get-clients', '--format',
+                                             'csv'])
+        assert "Erreur lors de la récupération" in result.stderr
+        assert result.exit_code == 1
+
+    def test_stream_error_midway_fails_the_command(self, monkeypatch):
+        import json
+
+        contracts = self._contracts()
+
+        def broken(self):
+            yield contracts[0]
+            raise RuntimeError("connexion perdue")
+
+        mock_authenticated_user(monkeypatch)
+        monkeypatch.setattr(
+            "services.contract_services.ContractService.iter_contract_list",
+            broken)
+
+        result = CliRunner().invoke(contract, ['list', '--format', 'json'])
+        # Le tableau JSON reste ouvert : un lecteur ne le prend pas pour
+        # une liste complète, et le code de sortie signale l'échec
+        assert result.exit_code == 1
+        assert result.stdout.startswith("[\n{")
+        with pytest.raises(json.JSONDecodeError):
+            json.loads(result.stdout)
+        assert "Erreur lors de la récupération" in result.stderr
+
+
+class TestTableRenderer:
+    """Tests pour l'affichage incrémental des tableaux"""
+
+    def _columns(self):
+        from cli.output import Column
+
+        return [Column("id", "ID", align=">"), Column("name", "Nom")]
+
+    def _row(self, i, name):
+        return type('Row', (), {'id': i, 'name': name})()
+
+    def test_widths_sampled_from_first_rows(self):
+        from cli.output import table_lines
+
+        rows = [self._row(1, "Alice"), self._row(22, "Bob"),
+                self._row(333, "Un nom beaucoup trop long")]
+        lines = list(table_lines(rows, self._columns(), sample_size=2))
+        assert lines[0] == "+----+-------+\n"
+        assert lines[3] == "|  1 | Alice |\n"
+        # Hors échantillon : texte tronqué, nombre jamais coupé
+        assert lines[7] == "| 333 | Un n… |\n"
+
+    def test_rows_rendered_before_end_of_stream(self):
+        from cli.output import table_lines
+
+        read = []
+
+        def rows():
+            for i in range(1000):
+                read.append(i)
+                yield self._row(i, "x")
+
+        lines = table_lines(rows(), self._columns(), sample_size=10)
+        for _ in range(5):
+            next(lines)
+        assert len(read) == 10
+
+    def test_echo_table_uses_pager(self, monkeypatch):
+        import click
+        import cli.output as output
+
+        paged = []
+        monkeypatch.setattr(output, "_use_pager", lambda: True)
+        monkeypatch.setattr(click, "echo_via_pager",
+                            lambda lines: paged.extend(lines))
+
+        rows = [self._row(i, "x") for i in range(3)]
+        assert output.echo_table(iter(rows), self._columns()) == 3
+        assert len(paged) == 3 + 2 * 3
+
+        paged.clear()
+        assert output.echo_table(iter(()), self._columns()) == 0
+        assert paged == []
+
+
+class TestBatch:
+    """Tests pour l'exécution d'opérations en lot"""
+
+    def test_results_per_operation(self, monkeypatch, sqlite_engine):
+        from services.batch import BatchRunner
+
+        calls = []
+
+        def mock_update_contract(self, contract_id, user_id,
+                                 user_departement, sign=None,
+                                 paid_amount=None):
+            calls.append((contract_id, sign, paid_amount))
+            return paid_amount != 1e9, "Le contrat a été mis à jour"
+
+        monkeypatch.setattr(
+            "services.contract_services.ContractService.update_contract",
+            mock_update_contract)
+
+        runner = BatchRunner({"user_id": 1, "departement": "Gestion"},
+                             transaction_size=2, engine=sqlite_engine)
+        results = list(runner.run([
+            (1, {"op": "sign_contract", "contract_id": "4"}),
+            (2, {"op": "record_payment", "contract_id": 4,
+                 "paid_amount": 1e9}),
+            (3, {"op": "record_payment", "contract_id": 4}),
+            (4, {"op": "create_client", "fullname": "A", "email": "a@b.c"}),
+            (5, {"op": "delete_everything"}),
+            (6, None),
+        ]))
+
+        assert calls == [(4, True, None), (4, None, 1e9)]
+        assert [r["success"] for r in results] == [True] + [False] * 5
+        assert [r["line"] for r in results] == [1, 2, 3, 4, 5, 6]
+        assert results[2]["message"] == "Champ manquant : paid_amount"
+        assert results[3]["message"].startswith("Accès refusé")
+        assert results[4]["message"] == \
+            "Opération inconnue : delete_everything"
+        assert results[5]["message"] == "Ligne illisible"
+
+    def test_update_event_parses_dates(self, monkeypatch, sqlite_engine):
+        from datetime import datetime
+        from services.batch import BatchRunner
+
+        received = {}
+
+        def mock_update_event(self, event_id, **kwargs):
+            received.update(kwargs, event_id=event_id)
+            return True, "Événement mis à jour"
+
+        monkeypatch.setattr(
+            "services.event_services.EventService.update_event",
+            mock_update_event)
+
+        runner = BatchRunner({"user_id": 2, "departement": "Support"},
+                             engine=sqlite_engine)
+        [result] = runner.run([(1, {"op": "update_event", "event_id": 3,
+                                    "start_date": "2025-06-01T18:00:00",
+                                    "location": "Lyon", "notes": ""})])
+        assert result["success"]
+        assert received == {"event_id": 3, "location": "Lyon",
+                            "start_date": datetime(2025, 6, 1, 18)}
+
+    def test_event_support_contact_key(self, monkeypatch, sqlite_engine):
+        from services.batch import BatchRunner
+
+        created, updated = [], []
+        monkeypatch.setattr(
+            "services.event_services.EventService.create_event",
+            lambda self, **kwargs: (created.append(kwargs["support_id"]) or
+                                    (True, "L'évènement a été crée")))
+        monkeypatch.setattr(
+            "services.event_services.EventService.update_event",
+            lambda self, event_id, **kwargs: (
+                updated.append(kwargs["support_contact_id"]) or
+                (True, "Événement mis à jour")))
+
+        event = {"contract_id": 1, "start_date": "2025-06-01T18:00:00",
+                 "attendees": 10, "location": "Lyon"}
+        runner = BatchRunner({"user_id": 1, "departement": "Gestion"},
+                             engine=sqlite_engine)
+        results = list(runner.run([
+            (1, {"op": "create_event", **event, "support_contact_id": 3}),
+            (2, {"op": "create_event", **event, "support_id": 4}),
+            (3, {"op": "update_event", "event_id": 7,
+                 "support_contact_id": 5}),
+            (4, {"op": "update_event", "event_id": 7, "support_id": 6}),
+        ]))
+
+        assert all(result["success"] for result in results)
+        assert (created, updated) == ([3, 4], [5, 6])
+
+    def test_batch_run_command(self, monkeypatch, sqlite_engine):
+        import json
+        from cli.commands.batch_commands import batch
+
+        mock_authenticated_user(monkeypatch)
+        monkeypatch.setattr("database.database._engine", sqlite_engine)
+        monkeypatch.setattr(
+            "services.contract_services.ContractService.create_contract",
+            lambda self, title, client_id, amount: (True, "Le contrat a "
+                                                    "été crée"))
+
+        operations = "\n".join([
+            json.dumps({"op": "create_contract", "title": "T",
+                        "client_id": 1, "amount": 10}),
+            "",
+            "pas du json",
+        ])
+        result = CliRunner().invoke(batch, ['run', '-'], input=operations)
+
+        assert result.exit_code == 1
+        lines = [json.loads(line) for line in result.stdout.splitlines()]
+        assert [line["success"] for line in lines] == [True, False]
+        assert lines[1]["line"] == 3
+        assert "2 opérations : 1 réussies, 1 en échec" in result.stderr
+
+
+class TestListFilters:
+    """Tests pour les filtres des listes appliqués par la base"""
+
+    @pytest.fixture
+    def sqlite_engine(self, sqlite_engine, add_users):
+        from datetime import datetime
+        from sqlalchemy import insert
+        from database.schema import client, contract, event
+
+        test_engine = sqlite_engine
+        add_users("Support")
+        with test_engine.begin() as conn:
+            conn.execute(insert(client), [
+                {"fullname": "A", "commercial_id": 1},
+                {"fullname": "B", "commercial_id": 1}])
+            conn.execute(insert(contract), [
+                {"client_id": 1, "amount": 20000, "paid_amount": 5000,
+                 "created_at": datetime(2025, 1, 10)},
+                {"client_id": 1, "amount": 20000, "paid_amount": 15000,
+                 "created_at": datetime(2025, 2, 10)},
+                {"client_id": 2, "amount": 50000, "paid_amount": 0,
+                 "created_at": datetime(2025, 3, 10)}])
+            conn.execute(insert(event), [
+                {"contract_id": 1, "start_date": datetime(2025, 6, 1),
+                 "support_contact_id": None},
+                {"contract_id": 1, "start_date": datetime(2025, 6, 20),
+                 "support_contact_id": 1},
+                {"contract_id": 3, "start_date": datetime(2025, 8, 1),
+                 "support_contact_id": None}])
+        return test_engine
+
+    def test_event_filters(self, sqlite_engine):
+        from datetime import datetime
+        from database.dao.event_dao import EventDAO
+
+        dao = EventDAO(sqlite_engine)
+        june = {"start_from": datetime(2025, 6, 1),
+                "start_to": datetime(2025, 7, 1)}
+        assert [r.id for r in dao.get_all_events(unassigned=True,
+                                                 **june)] == [1]
+        assert [r.id for r in dao.get_all_events(support_id=1)] == [2]
+        assert [r.id for r in dao.iter_all_events(contract_id=1)] == [1, 2]
+        assert [r.id for r in dao.get_all_events(**june)] == [1, 2]
+
+    def test_contract_filters(self, sqlite_engine):
+        from datetime import datetime
+        from database.dao.contract_dao import ContractDAO
+
+        dao = ContractDAO(sqlite_engine)
+        assert [r.id for r in dao.get_all_contracts(min_balance=10000)] \
+            == [1, 3]
+        assert [r.id for r in dao.get_all_contracts(
+            client_id=1, min_balance=10000)] == [1]
+        assert [r.id for r in dao.iter_all_contracts(
+            created_from=datetime(2025, 2, 1),
+            created_to=datetime(2025, 3, 1))] == [2]
+
+    def test_role_scoped_reads(self, sqlite_engine):
+        from sqlalchemy import insert
+        from database.schema import client, contract
+        from database.dao.client_dao import ClientDAO
+        from database.dao.contract_dao import ContractDAO
+
+        with sqlite_engine.begin() as conn:
+            conn.execute(insert(client).values(fullname="C",
+                                               commercial_id=None))
+            conn.execute(insert(contract).values(client_id=3, amount=100,
+                                                 paid_amount=0))
+
+        # Ses clients, et les contrats des clients sans commercial
+        assert [r.id for r in ClientDAO(sqlite_engine).get_all_clients(
+            commercial_id=1)] == [1, 2]
+        assert ClientDAO(sqlite_engine).get_all_clients(
+            commercial_id=2) == []
+        dao = ContractDAO(sqlite_engine)
+        assert [r.id for r in dao.iter_all_contracts(owner_id=2)] == [4]
+        assert sorted(r.id for r in dao.get_contracts_not_sign(
+            owner_id=1)) == [1, 2, 3, 4]
+
+    def test_commands_pass_only_given_filters(self, monkeypatch):
+        from datetime import datetime
+
+        received = []
+        mock_authenticated_user(monkeypatch)
+        monkeypatch.setattr(
+            "services.event_services.EventService.iter_event_list",
+            lambda self, **filters: received.append(filters) or iter(()))
+        monkeypatch.setattr(
+            "services.contract_services.ContractService.get_contract_list",
+            lambda self, limit=None, after=None, **filters:
+                received.append(filters) or (True, [], "Aucun"))
+
+        runner = CliRunner()
+        runner.invoke(event, ['list', '--unassigned', '--to', '2025-07-01'])
+        runner.invoke(contract, ['list', '--min-balance', '10000',
+                                 '--limit', '20'])
+        assert received == [
+            {"unassigned": True, "start_to": datetime(2025, 7, 1)},
+            {"min_balance": 10000.0}]
+
+        result = runner.invoke(event, ['list', '--unassigned',
+                                       '--support-id', '3'])
+        assert result.exit_code == 2
+
+
+class TestAuditLog:
+    """Tests pour le journal d'audit local"""
+
+    @pytest.fixture
+    def audit_dao(self, sqlite_engine):
+        from database.dao.audit_log_dao import AuditLogDAO
+
+        dao = AuditLogDAO(sqlite_engine)
+        dao.append([
+            {"timestamp": 1735725600.0 + i * 86400, "entity": entity,
+             "entity_id": entity_id, "event_type": "contract_signature",
+             "action": "sign_contract", "actor": actor,
+             "message": f"événement {i}", "details": {"n": i}}
+            for i, (entity, entity_id, actor) in enumerate([
+                ("contract", 42, "gest"), ("contract", 7, "com"),
+                ("user", 42, "admin"), ("contract", 42, "com")])])
+        return dao
+
+    def test_query_by_entity_and_date(self, audit_dao):
+        from datetime import datetime
+
+        rows = list(audit_dao.iter_entries(entity="contract", entity_id=42))
+        assert [(r.actor, r.details["n"]) for r in rows] == \
+            [("gest", 0), ("com", 3)]
+        assert [r.details["n"] for r in audit_dao.iter_entries(
+            since=datetime.fromtimestamp(1735725600.0 + 86400),
+            until=datetime.fromtimestamp(1735725600.0 + 3 * 86400))] \
+            == [1, 2]
+        assert [r.details["n"] for r in audit_dao.iter_entries(
+            actor="com", limit=1)] == [1]
+
+    def test_audit_query_command(self, monkeypatch, audit_dao):
+        from cli.commands.audit_commands import audit
+
+        mock_authenticated_user(monkeypatch)
+        monkeypatch.setattr(
+            "services.audit_services.AuditService.__init__",
+            lambda self: setattr(self, "audit_log_dao", audit_dao))
+
+        runner = CliRunner()
+        result = runner.invoke(audit, ['query', '--entity', 'contract',
+                                       '--id', '42', '--format', 'ndjson'])
+        assert result.exit_code == 0
+        lines = result.stdout.splitlines()
+        assert len(lines) == 2
+        assert '"actor": "gest"' in lines[0]
+
+        result = runner.invoke(audit, ['query', '--id', '42'])
+        assert result.exit_code == 2
+
+
+class TestOutbox:
+    """Tests pour la livraison des effets de bord par l'outbox"""
+
+    def test_rows_written_with_the_transaction(self, monkeypatch,
+                                               sqlite_engine):
+        import services.outbox as outbox
+        from database.unit_of_work import UnitOfWork
+        from database.dao.outbox_dao import OutboxDAO
+
+        woken = []
+        monkeypatch.setattr("database.database._engine", sqlite_engine)
+        monkeypatch.setattr(outbox, "_wake_drainer",
+                            lambda: woken.append(True))
+        destinations = outbox.AUDIT_DESTINATIONS
+
+        with UnitOfWork(sqlite_engine) as uow:
+            outbox.enqueue(destinations, {"n": 1})
+            uow.rollback()
+        assert OutboxDAO(sqlite_engine).pending() == []
+        assert woken == []
+
+        with UnitOfWork(sqlite_engine):
+            outbox.enqueue(destinations, {"n": 2})
+            assert woken == []
+        assert [(r.destination, r.count) for r in
+                OutboxDAO(sqlite_engine).pending()] == \
+            [("audit_log", 1), ("sentry", 1)]
+        assert woken == [True]
+
+    def test_drainer_delivers_in_batches(self, sqlite_engine):
+        from services.outbox import OutboxDrainer
+        from database.dao.outbox_dao import OutboxDAO
+
+        dao = OutboxDAO(sqlite_engine)
+        dao.add([{"destination": d, "payload": {"n": i}}
+                 for i in range(5) for d in ("audit_log", "sentry")])
+        batches = []
+
+        def unreachable(payloads):
+            return False
+
+        drainer = OutboxDrainer(sqlite_engine, {
+            "audit_log": lambda payloads: batches.append(payloads),
+            "sentry": unreachable}, batch_size=2)
+        assert drainer.drain() is False
+
+        assert [[p["n"] for p in batch] for batch in batches] == \
+            [[0, 1], [2, 3], [4]]
+        # Les lignes non livrées restent, avec leur nombre de tentatives
+        assert [(r.destination, r.count, r.max_attempts)
+                for r in dao.pending()] == [("sentry", 5, 1)]
+
+        drainer.destinations["sentry"] = lambda payloads: None
+        assert drainer.drain() is True
+        assert dao.pending() == []
+
+    def test_background_drain_on_close(self, sqlite_engine):
+        from services.outbox import OutboxDrainer
+        from database.dao.outbox_dao import OutboxDAO
+
+        delivered = []
+        drainer = OutboxDrainer(sqlite_engine, {
+            "audit_log": lambda payloads: delivered.extend(payloads)})
+        OutboxDAO(sqlite_engine).add(
+            [{"destination": "audit_log", "payload": {"n": 1}}])
+        drainer.wake()
+        drainer.close(timeout=5)
+
+        assert delivered == [{"n": 1}]
+        assert OutboxDAO(sqlite_engine).pending() == []
+
+    def test_no_sentry_without_dsn(self, monkeypatch, sqlite_engine,
+                                   capsys):
+        import services.outbox as outbox
+        import services.sentry_service as sentry_service
+        from database.unit_of_work import UnitOfWork
+        from database.dao.outbox_dao import OutboxDAO
+
+        monkeypatch.delenv("SENTRY_DSN", raising=False)
+        monkeypatch.setattr(sentry_service, "_initialized", None)
+        monkeypatch.setattr(outbox, "_drainer", None)
+        monkeypatch.setattr(outbox.atexit, "register", lambda *args: None)
+        monkeypatch.setattr("database.database._engine", sqlite_engine)
+
+        with UnitOfWork(sqlite_engine):
+            outbox.enqueue(outbox.active_audit_destinations(), {"n": 1})
+        # Seul le journal local est alimenté
+        assert [r.destination for r in OutboxDAO(sqlite_engine).pending()] \
+            == ["audit_log"]
+
+        drainer = outbox.get_outbox_drainer()
+        drainer.close(timeout=5)
+        assert sentry_service._initialized is None
+        assert "SENTRY_DSN" not in capsys.readouterr().err
+        # Des lignes sentry écrites avec un DSN sont écartées sans bruit
+        assert drainer.destinations["sentry"]([{"n": 2}]) is True
+        assert sentry_service._initialized is None
+
+
+class TestCommandStats:
+    """Tests pour la mesure du temps passé en base (``epic --stats``)"""
+
+    @pytest.fixture
+    def sqlite_engine(self, sqlite_engine):
+        from database import stats
+
+        stats.attach(sqlite_engine)
+        return sqlite_engine
+
+    def test_queries_and_dao_calls_counted(self, sqlite_engine):
+        from database.stats import collect_stats, current_stats
+        from database.dao.departement_dao import DepartementDAO
+
+        dao = DepartementDAO(sqlite_engine)
+        dao.create_departement({"name": "Gestion"})
+        with collect_stats() as stats:
+            for _ in range(3):
+                dao.get_departement_by_id(1)
+            dao.get_all_departements()
+        assert current_stats() is None
+
+        assert stats.dao_calls["DepartementDAO.get_departement_by_id"][0] \
+            == 3
+        assert stats.dao_calls["DepartementDAO.get_all_departements"][0] \
+            == 1
+        assert sum(entry[0] for entry in stats.queries.values()) == 4
+        assert stats.checkouts == 4
+        # Même texte de requête pour les trois lectures : signalée répétée
+        repeated = [line for line in stats.report_lines()
+                    if line.endswith("[répétée]")]
+        assert len(repeated) == 1 and repeated[0].lstrip().startswith("3 x")
+
+    def test_nothing_recorded_without_stats(self, sqlite_engine):
+        from database.stats import collect_stats
+        from database.dao.departement_dao import DepartementDAO
+
+        with collect_stats() as stats:
+            pass
+        DepartementDAO(sqlite_engine).get_all_departements()
+        assert stats.queries == {} and stats.dao_calls == {}
+
+    def test_generator_methods_timed_once(self, sqlite_engine):
+        import time
+        from database.stats import collect_stats
+        from database.dao.audit_log_dao import AuditLogDAO
+
+        dao = AuditLogDAO(sqlite_engine)
+        dao.append([{"event_type": "update", "action": "sign",
+                     "entity": "contract", "entity_id": i,
+                     "timestamp": time.time()} for i in range(5)])
+        with collect_stats() as stats:
+            assert len(list(dao.iter_entries(entity="contract"))) == 5
+        assert stats.dao_calls["AuditLogDAO.iter_entries"][0] == 1
+
+    def test_stats_flag_prints_report(self, monkeypatch, sqlite_engine):
+        from click.testing import CliRunner
+        from cli.epic import epic
+
+        monkeypatch.setattr("database.database._engine", sqlite_engine)
+        result = CliRunner().invoke(epic, ["--stats", "outbox", "status"])
+
+        assert result.exit_code == 0
+        assert "Aucun envoi en attente." in result.stdout
+        assert "Statistiques" not in result.stdout
+        assert "SQL : 1 requêtes" in result.stderr
+        assert "OutboxDAO.pending" in result.stderr
+
+        result = CliRunner().invoke(epic, ["outbox", "status"])
+        assert result.stderr == ""